@@ -1,12 +1,30 @@
-import pickle
-from flask import Flask, request, render_template
+from flask import Flask, request, render_template, jsonify, Response, g, redirect, stream_with_context, url_for
 import numpy as np  
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
 from src.pipeline.predict_pipeline import PredictPipeline, CustomData
+from src.pipeline.model_registry import get_registry
+from src.components.dataset_store import load_dataset
+from src.analytics.customer_360 import (CUSTOMER_SORTS, ContributionExplainer, get_customer_index,
+                                       get_customer_list_index)
+from src.analytics.dashboard import dashboard_view, get_dashboard_aggregates
+from src.analytics.cohorts import COHORT_WIDTHS, CohortConfig, get_cohort_engine
+from src.analytics.retention import RETENTION_SORTS, get_retention_engine
+from src.pipeline.bulk_scoring import risk_scores_for
+from src.pipeline.micro_batcher import MicroBatcher, MicroBatcherConfig
+from src.pipeline.prediction_cache import PredictionCache
+from src.pipeline.batch_scoring import (BatchScoringConfig, iter_csv_chunks, iter_ndjson_chunks,
+                                        iter_record_chunks, score_chunks, stream_scored_csv)
+from src.pipeline.compiled_preprocessor import FeatureValueError
+from src.exception import root_cause
+from src import serving
+from src.metrics import REQUEST_LATENCY, STAGE_LATENCY, format_counters, format_gauges, metrics as latency_metrics, stage_timer
+from src.utils import read_json_cached
+from src.logger import logging
+from src.components.model_evaluation import ModelEvaluationConfig, metrics_path
 from datetime import datetime
+import json
 import os
-import random
+import time
 
 application = Flask(__name__)
 app = application
@@ -18,18 +36,61 @@ def inject_now():
     return {'now': datetime.now}
 
 # ============= LOAD MODEL (IF AVAILABLE) =============
-model = None
-try:
-    # Try to load your trained model
-    model_path = os.path.join('artifacts', 'model.pkl')
-    if os.path.exists(model_path):
-        with open(model_path, 'rb') as f:
-            model = pickle.load(f)
-        print("✅ Model loaded successfully!")
-    else:
-        print("⚠️ Model file not found. Using random risk scores.")
-except Exception as e:
-    print(f"❌ Error loading model: {e}")
+# One resident model per process, shared by every route and hot-reloaded
+# by the registry when artifacts/model.pkl or preprocessor.pkl change.
+# Nothing is unpickled at import: serving.preload() loads it before workers
+# fork, and otherwise the first registry.get() does.
+registry = get_registry()
+
+# Repeated feature vectors are answered from a cache keyed on the model version;
+# PREDICTION_CACHE_PATH points every worker at one shared sqlite store
+prediction_cache = PredictionCache()
+
+# Concurrent /predictdata rows are coalesced into one batched predict call
+batcher = MicroBatcher(
+    PredictPipeline(registry, fast_preprocessor=True, fast_model=True, cache=prediction_cache),
+    MicroBatcherConfig(
+        window_ms=float(os.environ.get('PREDICT_BATCH_WINDOW_MS', 2.0)),
+        max_batch_size=int(os.environ.get('PREDICT_MAX_BATCH_SIZE', 64)),
+    ),
+)
+
+# Per-customer tree-path explanations, cached per (customer, model version)
+explainer = ContributionExplainer(registry)
+
+def warm_up_worker():
+    """Called in every serving worker before it accepts requests (see gunicorn.conf.py)."""
+    serving.warm_up(batcher.pipeline, registry, batcher)
+
+# ============= REQUEST LATENCY =============
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    """Per-endpoint latency histogram (streamed bodies are timed up to the first byte)"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        latency_metrics.observe(REQUEST_LATENCY, 'endpoint', request.endpoint or 'unmatched',
+                                time.perf_counter() - started)
+    return response
+
+# ============= HEALTH / READINESS =============
+@app.route('/healthz')
+def healthz():
+    """Liveness: the process is up"""
+    return jsonify({'status': 'ok'})
+
+@app.route('/readyz')
+def readyz():
+    """Readiness: model loaded and this worker warmed up; reports the served model version"""
+    snapshot = serving.state.snapshot()
+    snapshot['model_version'] = registry.version
+    # without the forest engine predictions go through the model itself
+    # and explanations fall back to occlusion
+    snapshot['fast_paths'] = registry.fast_paths
+    return jsonify(snapshot), (200 if snapshot['ready'] and registry.version else 503)
 
 # ============= HOME PAGE - SINGLE DEFINITION =============
 @app.route('/')
@@ -51,60 +112,189 @@ def predict_page():
 @app.route('/predictdata', methods=['POST'])
 def predict_datapoint():
     try:
-        data = CustomData(
-            age=int(request.form['age']),
-            tenure_months=int(request.form['tenure_months']),
-            monthly_logins=int(request.form['monthly_logins']),
-            weekly_active_days=int(request.form['weekly_active_days']),
-            avg_session_time=float(request.form['avg_session_time']),
-            monthly_fee=float(request.form['monthly_fee']),
-            total_revenue=float(request.form['total_revenue']),
-            payment_failures=int(request.form['payment_failures']),
-            support_tickets=int(request.form['support_tickets']),
-            csat_score=int(request.form['csat_score']),
-            nps_score=int(request.form['nps_score']),
-            gender=request.form['gender'],
-            contract_type=request.form['contract_type'],
-            payment_method=request.form['payment_method'],
-            complaint_type=request.form['complaint_type']
-        )
-
-        pred_df = data.get_data_as_data_frame()
-        pipeline = PredictPipeline()
-        prediction = pipeline.predict(pred_df)[0]
+        with stage_timer("request_parse"):
+            data = CustomData(
+                age=int(request.form['age']),
+                tenure_months=int(request.form['tenure_months']),
+                monthly_logins=int(request.form['monthly_logins']),
+                weekly_active_days=int(request.form['weekly_active_days']),
+                avg_session_time=float(request.form['avg_session_time']),
+                monthly_fee=float(request.form['monthly_fee']),
+                total_revenue=float(request.form['total_revenue']),
+                payment_failures=int(request.form['payment_failures']),
+                support_tickets=int(request.form['support_tickets']),
+                csat_score=int(request.form['csat_score']),
+                nps_score=int(request.form['nps_score']),
+                gender=request.form['gender'],
+                contract_type=request.form['contract_type'],
+                payment_method=request.form['payment_method'],
+                complaint_type=request.form['complaint_type']
+            )
+
+        _, prediction, _ = batcher.predict(data.get_data_as_dict())
 
         result = "Customer Will Churn ❌" if prediction == 1 else "Customer Will Stay ✅"
 
-        return render_template('predict.html', results=result)
+        with stage_timer("render_template"):
+            return render_template('predict.html', results=result)
     except Exception as e:
         return render_template('predict.html', results=str(e))
      
+# ============= BATCH SCORING API =============
+batch_config = BatchScoringConfig()
+# unreadable upload bodies; like bad feature values these are the client's error
+UPLOAD_FORMAT_ERRORS = (pd.errors.ParserError, pd.errors.EmptyDataError, json.JSONDecodeError)
+
+def scoring_error(e):
+    """400 for input the model cannot use (naming the field when known), 500 for anything else"""
+    cause = root_cause(e)
+    if isinstance(cause, FeatureValueError):
+        return jsonify({'error': str(cause), 'field': cause.column}), 400
+    if isinstance(cause, UPLOAD_FORMAT_ERRORS):
+        return jsonify({'error': f'unreadable upload: {cause}'}), 400
+    logging.exception("Batch scoring failed")
+    return jsonify({'error': str(cause)}), 500
+
+@app.route('/api/predict', methods=['POST'])
+def api_predict():
+    """Score a JSON array of customer records (or {"records": [...]})"""
+    payload = request.get_json(silent=True)
+    records = payload.get('records') if isinstance(payload, dict) else payload
+    if not isinstance(records, list) or not records:
+        return jsonify({'error': 'expected a non-empty JSON array of records'}), 400
+    bad = next((i for i, record in enumerate(records) if not isinstance(record, dict)), None)
+    if bad is not None:
+        return jsonify({'error': f'record {bad} is not a JSON object'}), 400
+    if len(records) > batch_config.max_json_records:
+        return jsonify({'error': f'at most {batch_config.max_json_records} records per request, '
+                                 'use /api/predict/upload for larger batches'}), 413
+
+    try:
+        pipeline = PredictPipeline(registry, fast_preprocessor=True, fast_model=True, cache=prediction_cache)
+        predictions = []
+        version = None
+        for result, version in score_chunks(pipeline, iter_record_chunks(records, batch_config.chunk_size)):
+            predictions.extend(result.to_dict('records'))
+        return jsonify({'model_version': version, 'predictions': predictions})
+    except Exception as e:
+        return scoring_error(e)
+
+@app.route('/api/predict/upload', methods=['POST'])
+def api_predict_upload():
+    """
+    Stream a CSV or NDJSON request body back as customer_id,probability,label CSV.
+
+    The file is sent as the raw body (curl --data-binary @customers.csv
+    -H 'Content-Type: text/csv'), so rows are read straight off the socket
+    one chunk at a time instead of being spooled as a multipart upload.
+    The first chunk is scored before the response starts, so a bad file gets
+    a 400; a failure further in ends the CSV with a "# error: ..." line.
+    """
+    fmt = request.args.get('format')
+    if fmt is None:
+        fmt = 'ndjson' if 'ndjson' in (request.content_type or '') else 'csv'
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'error': f'unsupported format: {fmt}'}), 400
+
+    chunk_size = request.args.get('chunk_size', batch_config.chunk_size, type=int)
+    reader = iter_ndjson_chunks if fmt == 'ndjson' else iter_csv_chunks
+    chunks = reader(request.stream, max(1, chunk_size))
+
+    pipeline = PredictPipeline(registry, fast_preprocessor=True, fast_model=True)
+    try:
+        body = stream_scored_csv(pipeline, chunks)
+    except Exception as e:
+        return scoring_error(e)
+    return Response(stream_with_context(body),
+                    mimetype='text/csv',
+                    headers={'X-Model-Version': registry.version or ''})
+
+@app.route('/api/batcher/metrics')
+def batcher_metrics():
+    """Queue depth and batch size statistics of the /predictdata micro-batcher"""
+    return jsonify({'window_ms': batcher.config.window_ms,
+                    'max_batch_size': batcher.config.max_batch_size,
+                    **batcher.metrics.snapshot()})
+
+@app.route('/api/prediction-cache/metrics')
+def prediction_cache_metrics():
+    """Hit/miss counters and size of the prediction cache"""
+    return jsonify(prediction_cache.stats())
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Prometheus scrape endpoint: latency histograms, cache and batcher counters, training gauges"""
+    cache_stats = prediction_cache.stats()
+    batcher_stats = batcher.metrics.snapshot()
+    body = [
+        latency_metrics.render_prometheus(),
+        format_counters('churn_prediction_cache_events', {
+            'local_hit': cache_stats['local_hits'],
+            'shared_hit': cache_stats['shared_hits'],
+            'miss': cache_stats['misses'],
+        }, 'event', 'Prediction cache lookups by outcome'),
+        format_gauges('churn_prediction_cache_entries', cache_stats['entries'],
+                      help_text='Entries in the in-process prediction cache'),
+        format_counters('churn_batcher_requests', batcher_stats['requests'],
+                        help_text='Rows scored by the /predictdata micro-batcher'),
+        format_counters('churn_batcher_batches', batcher_stats['batches'],
+                        help_text='Batched predict calls made by the micro-batcher'),
+    ]
+    report = read_json_cached(PIPELINE_REPORT_PATH)
+    if report:
+        body.append(format_gauges('churn_training_stage_seconds',
+                                  {stage['stage']: stage['seconds'] for stage in report.get('stages', [])},
+                                  'stage', 'Wall time of each stage in the last training run',
+                                  per_process=False))
+    return Response(''.join(body), mimetype='text/plain; version=0.0.4')
+
 # ============= CUSTOMER 360 LIST =============
+def customer_list_query():
+    """Page, sort and filters of the customer list from the query string"""
+    sort = request.args.get('sort', 'risk')
+    return {
+        'page': request.args.get('page', 1, type=int),
+        'page_size': request.args.get('page_size', None, type=int),
+        'sort': sort if sort in CUSTOMER_SORTS else 'risk',
+        'descending': request.args.get('order', 'desc') != 'asc',
+        'gender': request.args.get('gender'),
+        'contract_type': request.args.get('contract'),
+        'customer_segment': request.args.get('segment'),
+        'risk_band': request.args.get('risk'),
+    }
+
+def score_unscored(customers):
+    """Without a risk table, score the page's rows with the real preprocessor + model in one call"""
+    unscored = [customer for customer in customers if customer['risk_score'] is None]
+    if unscored:
+        full_rows = load_dataset().iloc[[get_customer_index().offset(c['customer_id']) for c in unscored]]
+        scores, _, _ = PredictPipeline(registry, fast_preprocessor=True).predict_proba(full_rows)
+        for customer, score in zip(unscored, scores):
+            customer['risk_score'] = round(float(score) * 100, 1)
+    return customers
+
 @app.route('/customers')
 def customer_360_list():
-    """Customer 360 selection page - Shows list of all customers"""
+    """Customer 360 selection page - one server-side page of the customer list"""
+    search = request.args.get('q', '').strip()
+    listing = None
+    filter_values = {}
     try:
-        # Load your customer data
-        df = pd.read_csv(r'F:\DATA-SCIENCE\ML-Project\Notebook\Data\customer_churn_business_dataset.csv')
-        
-        # Get first 100 customers
-        customers_df = df.head(100).copy()
-        
-        # Add risk scores - FIXED: Use model if available, otherwise random
-        if model is not None:
-            try:
-                features = customers_df.select_dtypes(include=[np.number]).fillna(0)
-                probabilities = model.predict_proba(features)[:, 1]
-                customers_df['risk_score'] = (probabilities * 100).round(1)
-            except:
-                customers_df['risk_score'] = [random.randint(20, 80) for _ in range(len(customers_df))]
-        else:
-            customers_df['risk_score'] = [random.randint(20, 80) for _ in range(len(customers_df))]
-        
-        customers = customers_df.to_dict('records')
-        
-    except Exception as e:
-        print(f"Error loading customers: {e}")
+        if search and get_customer_index().offset(search) is not None:
+            return redirect(url_for('customer_360_detail', customer_id=search))
+        # Precomputed sort orders over the dataset store and the offline risk-score table
+        # (python -m src.pipeline.bulk_scoring); only the requested slice is materialized
+        listing = get_customer_list_index().query(**customer_list_query())
+        filter_values = get_customer_list_index().values
+        customers = listing['rows']
+        try:
+            score_unscored(customers)
+        except Exception:
+            # rows left unscored keep risk_score None and are shown as such
+            logging.exception("Error scoring customers")
+
+    except Exception:
+        logging.exception("Error loading customers")
         # Fallback sample data
         customers = [
             {'customer_id': 'CUST-1001', 'age': 32, 'gender': 'Male', 
@@ -115,15 +305,74 @@ def customer_360_list():
              'tenure_months': 6, 'monthly_fee': 29.99, 'risk_score': 72},
         ]
     
-    return render_template('customers.html', customers=customers)
+    return render_template('customers.html', customers=customers, listing=listing,
+                           filter_values=filter_values, search=search)
+
+@app.route('/api/customers')
+def customers_api():
+    """Customer list page as JSON for infinite scroll: same query string as /customers"""
+    if request.args.get('sort', 'risk') not in CUSTOMER_SORTS:
+        return jsonify({'error': f'sort must be one of {list(CUSTOMER_SORTS)}'}), 400
+    listing = get_customer_list_index().query(**customer_list_query())
+    try:
+        score_unscored(listing['rows'])
+    except Exception:
+        logging.exception("Error scoring customers")
+    return jsonify(listing)
 
 # ============= CUSTOMER 360 DETAIL =============
 @app.route('/customer-360/<customer_id>')
 def customer_360_detail(customer_id):
-    """Customer 360 detail view"""
-    # You can expand this later with real customer data
-    return render_template('customer-360.html', 
-                          customer={'customer_id': customer_id, 'risk_score': 35})
+    """Customer 360 detail view (read only: a live score is shown, not recorded)"""
+    customer, explanation, scores = None, None, None
+    try:
+        customer = get_customer_index().lookup(customer_id)
+        if customer is None:
+            return render_template('customer-360.html',
+                                  customer={'customer_id': customer_id}), 404
+        scores = risk_scores_for([customer_id])
+        explanation = explainer.explain(customer_id, customer)
+        if scores is None or np.isnan(scores[0]):
+            probability, _, _ = batcher.predict(customer)
+            scores = [probability]
+    except Exception:
+        logging.exception(f"Error loading customer {customer_id}")
+        if customer is None:
+            return render_template('customer-360.html',
+                                  customer={'customer_id': customer_id}), 500
+
+    if scores is not None and not np.isnan(scores[0]):
+        customer['risk_score'] = round(float(scores[0]) * 100, 1)
+    return render_template('customer-360.html',
+                          customer=customer,
+                          contributions=explanation['contributions'] if explanation else [],
+                          explanation_method=explanation['method'] if explanation else None)
+
+@app.route('/api/customer/<customer_id>/explanation')
+def customer_explanation(customer_id):
+    """Feature contributions behind one customer's churn probability"""
+    customer = get_customer_index().lookup(customer_id)
+    if customer is None:
+        return jsonify({'error': f'unknown customer {customer_id}'}), 404
+    explanation = explainer.explain(customer_id, customer)
+    if explanation is None:
+        return jsonify({'error': 'explanations need the compiled preprocessor, which the loaded '
+                                 'model version could not build'}), 501
+    return jsonify({'customer_id': customer_id, **explanation})
+
+@app.route('/api/customer/<customer_id>/rescore', methods=['POST'])
+def customer_rescore(customer_id):
+    """Score one customer with the live model and record the result in the retention view"""
+    try:
+        customer = get_customer_index().lookup(customer_id)
+        if customer is None:
+            return jsonify({'error': f'unknown customer {customer_id}'}), 404
+        probability, label, version = batcher.predict(customer)
+        get_retention_engine().rescore([customer_id], [probability])
+        return jsonify({'customer_id': customer_id, 'probability': probability,
+                        'label': label, 'model_version': version})
+    except Exception as e:
+        return scoring_error(e)
 
 # ============= DASHBOARD =============
 # ============= DASHBOARD =============
@@ -131,14 +380,9 @@ def customer_360_detail(customer_id):
 def dashboard():
     """Dashboard page with real metrics from your model"""
     
-    # Try to load your customer data
+    # Precomputed summary of the dataset, rebuilt (or incrementally updated) only when it changes
     try:
-        df = pd.read_csv(r'F:\DATA-SCIENCE\ML-Project\Notebook\Data\customer_churn_business_dataset.csv')
-        
-        # Calculate real metrics from your dataset
-        total_customers = len(df)
-        churned = len(df[df['churn'] == 1]) if 'churn' in df.columns else 300
-        active = total_customers - churned
+        summary_metrics, chart_data = dashboard_view(get_dashboard_aggregates().summary())
         
         # Metrics from your model
         metrics = {
@@ -152,30 +396,11 @@ def dashboard():
             'churn_trend': 'down',
             'churn_trend_icon': 'down',
             'churn_trend_percentage': 12,
-            'avg_monthly_fee': df['monthly_fee'].mean() if 'monthly_fee' in df.columns else 64.50,
-            'avg_tenure': df['tenure_months'].mean() if 'tenure_months' in df.columns else 15.3,
-            'total_tickets': df['support_tickets'].sum() if 'support_tickets' in df.columns else '1,284'
-        }
-        
-        # Chart data from your dataset
-        chart_data = {
-            'churned': churned,
-            'active': active,
-            'monthly_contracts': len(df[df['contract_type'] == 'Monthly']) if 'contract_type' in df.columns else 800,
-            'yearly_contracts': len(df[df['contract_type'] == 'Yearly']) if 'contract_type' in df.columns else 400,
-            'payment_card': len(df[df['payment_method'] == 'Card']) if 'payment_method' in df.columns else 500,
-            'payment_paypal': len(df[df['payment_method'] == 'PayPal']) if 'payment_method' in df.columns else 300,
-            'payment_bank': len(df[df['payment_method'] == 'Bank Transfer']) if 'payment_method' in df.columns else 400,
-            'tenure_0_3': len(df[(df['tenure_months'] >= 0) & (df['tenure_months'] <= 3)]) if 'tenure_months' in df.columns else 100,
-            'tenure_4_6': len(df[(df['tenure_months'] >= 4) & (df['tenure_months'] <= 6)]) if 'tenure_months' in df.columns else 200,
-            'tenure_7_12': len(df[(df['tenure_months'] >= 7) & (df['tenure_months'] <= 12)]) if 'tenure_months' in df.columns else 300,
-            'tenure_13_24': len(df[(df['tenure_months'] >= 13) & (df['tenure_months'] <= 24)]) if 'tenure_months' in df.columns else 250,
-            'tenure_25_36': len(df[(df['tenure_months'] >= 25) & (df['tenure_months'] <= 36)]) if 'tenure_months' in df.columns else 150,
-            'tenure_37': len(df[df['tenure_months'] >= 37]) if 'tenure_months' in df.columns else 50
+            **summary_metrics
         }
         
-    except Exception as e:
-        print(f"Error loading dashboard data: {e}")
+    except Exception:
+        logging.exception("Error loading dashboard data")
         # Fallback to sample data
         metrics = {
             'accuracy': 87,
@@ -215,65 +440,162 @@ def dashboard():
                           last_updated='2 minutes ago')
 
 # ============= INSIGHTS =============
-# ============= INSIGHTS =============
-@app.route("/insights")
-def insights():
-    """Model insights page with performance metrics"""
-    
-    # Sample model metrics data - works immediately
-    model_metrics = {
-        'accuracy': 88,
-        'precision': 84,
-        'recall': 81,
-        'f1_score': 82.5,
-        'roc_auc': 94,
-        'log_loss': 0.32,
-        'cv_score': 86.3,
-        'mcc': 0.76,
-        'specificity': 93,
-        'npv': 91,
-        'fpr': 7.1,
-        'fnr': 9.8,
-        'inference_time': 45,
-        'training_time': 124,
-        'model_size': 24.6,
-        'tp': 42,
-        'fp': 7,
-        'fn': 9,
-        'tn': 92,
-        'churn_precision': 84,
-        'churn_recall': 81,
-        'churn_f1': 82.5,
-        'churn_support': 51,
-        'active_precision': 93,
-        'active_recall': 94,
-        'active_f1': 93.5,
-        'active_support': 99,
-        'weighted_precision': 89.9,
-        'weighted_recall': 89.9,
-        'weighted_f1': 89.9,
-        'trained_date': '2026-02-12'
+# written by src/pipeline/train_pipeline.py at the end of every training run
+PIPELINE_REPORT_PATH = os.path.join('artifacts', 'pipeline_report.json')
+model_evaluation_config = ModelEvaluationConfig()
+
+# shown until a training run has written a metrics artifact
+SAMPLE_MODEL_METRICS = {
+    'accuracy': 88,
+    'precision': 84,
+    'recall': 81,
+    'f1_score': 82.5,
+    'roc_auc': 94,
+    'log_loss': 0.32,
+    'cv_score': 86.3,
+    'mcc': 0.76,
+    'specificity': 93,
+    'npv': 91,
+    'fpr': 7.1,
+    'fnr': 9.8,
+    'tp': 42,
+    'fp': 7,
+    'fn': 9,
+    'tn': 92,
+    'churn_precision': 84,
+    'churn_recall': 81,
+    'churn_f1': 82.5,
+    'churn_support': 51,
+    'active_precision': 93,
+    'active_recall': 94,
+    'active_f1': 93.5,
+    'active_support': 99,
+    'weighted_precision': 89.9,
+    'weighted_recall': 89.9,
+    'weighted_f1': 89.9,
+    'trained_date': '2026-02-12'
+}
+SAMPLE_FEATURE_IMPORTANCE = [
+    {'feature': 'contract_type', 'share': 35},
+    {'feature': 'tenure_months', 'share': 28},
+    {'feature': 'monthly_fee', 'share': 17},
+    {'feature': 'complaint_type', 'share': 12},
+    {'feature': 'support_tickets', 'share': 8},
+]
+
+def load_model_report():
+    """The metrics artifact of the served model version, else the latest one written"""
+    report = None
+    if registry.version:
+        report = read_json_cached(metrics_path(model_evaluation_config, registry.version))
+    return report or read_json_cached(os.path.join(model_evaluation_config.metrics_dir, 'current.json'))
+
+_insights_view = (None, None)
+
+def insights_view(report):
+    """Template fields for a metrics artifact, derived once per artifact (read_json_cached keeps the object)"""
+    global _insights_view
+    if _insights_view[0] is report:
+        return _insights_view[1]
+    pct = lambda value: round(100 * value, 1)
+    classes = report['classification_report']
+    churn, active, weighted = classes['churn'], classes['active'], classes['weighted avg']
+    view = {
+        'accuracy': pct(classes['accuracy']),
+        'precision': pct(churn['precision']),
+        'recall': pct(churn['recall']),
+        'f1_score': round(churn['f1-score'], 3),
+        'roc_auc': pct(report['roc_auc']),
+        'log_loss': round(report['log_loss'], 3),
+        'cv_score': pct(report['validation_score']) if report.get('validation_score') is not None else 'n/a',
+        'mcc': round(report['mcc'], 3),
+        'specificity': pct(report['specificity']),
+        'npv': pct(report['npv']),
+        'fpr': pct(report['fpr']),
+        'fnr': pct(report['fnr']),
+        **report['confusion_matrix'],
+        'churn_precision': pct(churn['precision']),
+        'churn_recall': pct(churn['recall']),
+        'churn_f1': pct(churn['f1-score']),
+        'churn_support': int(churn['support']),
+        'active_precision': pct(active['precision']),
+        'active_recall': pct(active['recall']),
+        'active_f1': pct(active['f1-score']),
+        'active_support': int(active['support']),
+        'weighted_precision': pct(weighted['precision']),
+        'weighted_recall': pct(weighted['recall']),
+        'weighted_f1': pct(weighted['f1-score']),
+        'trained_date': report['trained_at'][:10],
+        'model_name': report['model_name'],
+        'model_version': report['model_version'],
+        'training_seconds': report.get('training_seconds'),
+        'predict_ms_per_row': report['predict_ms_per_row'],
     }
-    
-    # Feature importance data
-    feature_importance = {
-        'contract': 35,
-        'tenure': 28,
-        'charges': 17,
-        'complaints': 12,
-        'support': 8
+    _insights_view = (report, (view, report['feature_importance'][:5]))
+    return _insights_view[1]
+
+def measured_model_metrics(report_view):
+    """Inference, training and size figures from live measurements rather than constants"""
+    stages = latency_metrics.snapshot(STAGE_LATENCY)
+    means = [stages[name]['mean_ms'] for name in ('preprocess', 'model_predict') if name in stages]
+    report = read_json_cached(PIPELINE_REPORT_PATH) or {}
+    training_seconds = report_view.get('training_seconds') or report.get('training_seconds')
+    if training_seconds is None:
+        # reports written before training_seconds existed: the best family's uncached stage time
+        training_seconds = next((stage['seconds'] for stage in report.get('stages', [])
+                                 if stage['stage'] == f"train:{report.get('best_model')}"
+                                 and not stage['cache_hit']), None)
+    model_path = registry.config.model_path
+    if means:
+        # mean preprocess + model call in this worker
+        inference_time = f"{sum(means):.2f}ms"
+    elif report_view.get('predict_ms_per_row') is not None:
+        # per row of the batched test-set predict at training time, until this worker has served one
+        inference_time = f"{report_view['predict_ms_per_row']:.3f}ms"
+    else:
+        inference_time = 'n/a'
+    return {
+        'inference_time': inference_time,
+        'training_time': f"{training_seconds:.1f}s" if training_seconds is not None else 'n/a',
+        'model_size': (f"{os.path.getsize(model_path) / 2**20:.1f}MB"
+                       if os.path.exists(model_path) else 'n/a'),
+        'model_name': report_view.get('model_name') or report.get('best_model', 'n/a'),
     }
-    
+
+@app.route("/insights")
+def insights():
+    """Model insights page, read from the train-time metrics artifact (nothing is computed per request)"""
+    report = load_model_report()
+    report_view, feature_importance = insights_view(report) if report else ({}, SAMPLE_FEATURE_IMPORTANCE)
+
+    model_metrics = {**SAMPLE_MODEL_METRICS, **report_view}
+    model_metrics.update(measured_model_metrics(report_view))
+
     return render_template('insights.html', 
                           model_metrics=model_metrics,
                           feature_importance=feature_importance,
-                          last_updated='2 minutes ago')
+                          last_updated=model_metrics['trained_date'])
 
 # ============= COHORT ANALYSIS =============
+def requested_cohort_months():
+    """cohort_months query argument, or None when it is not one of COHORT_WIDTHS."""
+    cohort_months = request.args.get('cohort_months', CohortConfig.cohort_months, type=int)
+    return cohort_months if cohort_months in COHORT_WIDTHS else None
+
 @app.route('/cohort-analysis')
 def cohort_analysis():
     """Cohort analysis page"""
-    return render_template('cohort-analysis.html')
+    cohort_months = requested_cohort_months() or CohortConfig.cohort_months
+    return render_template('cohort_analysis.html', cohorts=get_cohort_engine().view(cohort_months),
+                           widths=COHORT_WIDTHS, dimension='contract_type')
+
+@app.route('/api/cohorts')
+def cohorts_api():
+    """Cohort matrices for the current dataset version, cached until it changes"""
+    cohort_months = requested_cohort_months()
+    if cohort_months is None:
+        return jsonify({'error': f'cohort_months must be one of {list(COHORT_WIDTHS)}'}), 400
+    return jsonify(get_cohort_engine().view(cohort_months))
 
 # ============= ABOUT =============
 @app.route('/about')
@@ -286,24 +608,82 @@ def contact_page():
     return render_template('contact.html')
 
 # ============= RETENTION =============
+def retention_query():
+    """Filters, sort and page of the at-risk list from the query string"""
+    sort = request.args.get('sort', 'risk')
+    return {
+        'tier': request.args.get('tier', 'High') or None,
+        'segment': request.args.get('segment') or None,
+        'contract': request.args.get('contract') or None,
+        'sort': sort if sort in RETENTION_SORTS else 'risk',
+        'page': request.args.get('page', 1, type=int),
+        'page_size': request.args.get('page_size', None, type=int),
+    }
+
 @app.route('/retention')
 def retention_page():
     """Retention center page"""
-    # Sample data for retention page
-    metrics = {
-        'total_at_risk': 284,
-        'high_risk': 45,
-        'medium_risk': 89,
-        'revenue_at_risk': '125K'
-    }
-    high_risk_customers = [
-        {'customer_id': 'CUST-1042', 'risk_score': 78, 'monthly_fee': 89.99, 'tenure_months': 6},
-        {'customer_id': 'CUST-1087', 'risk_score': 72, 'monthly_fee': 129.99, 'tenure_months': 3},
-        {'customer_id': 'CUST-1123', 'risk_score': 68, 'monthly_fee': 49.99, 'tenure_months': 12},
-    ]
+    # Ranking and revenue at risk over the bulk risk table; sample data until it has run
+    engine = get_retention_engine()
+    summary = engine.summary()
+    if summary:
+        tier_counts = summary['tier_counts']
+        metrics = {
+            'total_at_risk': tier_counts['High'] + tier_counts['Medium'],
+            'high_risk': tier_counts['High'],
+            'medium_risk': tier_counts['Medium'],
+            'revenue_at_risk': f"{summary['revenue_at_risk'] / 1000:.1f}K",
+            'high_risk_revenue': f"{summary['revenue_by_tier']['High'] / 1000:.1f}K",
+        }
+        at_risk = engine.page(**retention_query())
+        high_risk_customers = at_risk['rows']
+    else:
+        metrics = {
+            'total_at_risk': 284,
+            'high_risk': 45,
+            'medium_risk': 89,
+            'revenue_at_risk': '125K'
+        }
+        at_risk = None
+        high_risk_customers = [
+            {'customer_id': 'CUST-1042', 'risk_score': 78, 'monthly_fee': 89.99, 'tenure_months': 6},
+            {'customer_id': 'CUST-1087', 'risk_score': 72, 'monthly_fee': 129.99, 'tenure_months': 3},
+            {'customer_id': 'CUST-1123', 'risk_score': 68, 'monthly_fee': 49.99, 'tenure_months': 12},
+        ]
     return render_template('retention.html', 
                           metrics=metrics, 
-                          high_risk_customers=high_risk_customers)
+                          high_risk_customers=high_risk_customers,
+                          at_risk=at_risk,
+                          summary=summary,
+                          segments=getattr(engine, 'segments', []),
+                          contracts=getattr(engine, 'contracts', []))
+
+@app.route('/api/retention/summary')
+def retention_summary_api():
+    """Tier counts and revenue at risk per tier and segment"""
+    summary = get_retention_engine().summary()
+    if summary is None:
+        return jsonify({'error': 'no risk table; run python -m src.pipeline.bulk_scoring'}), 503
+    return jsonify(summary)
+
+@app.route('/api/retention/at-risk')
+def retention_at_risk_api():
+    """One page of at-risk customers: ?tier=&segment=&contract=&sort=risk|revenue&page=&page_size="""
+    engine = get_retention_engine()
+    query = retention_query()
+    if request.args.get('sort', 'risk') not in RETENTION_SORTS:
+        return jsonify({'error': f'sort must be one of {list(RETENTION_SORTS)}'}), 400
+    if 'top' in request.args:
+        top = request.args.get('top', type=int)
+        if top is None or top < 1:
+            return jsonify({'error': 'top must be a positive integer'}), 400
+        # top_k caps it at the engine's max_page_size
+        return jsonify({'rows': engine.top_k(top)})
+    at_risk = engine.page(**query)
+    if at_risk is None:
+        return jsonify({'error': 'no risk table; run python -m src.pipeline.bulk_scoring'}), 503
+    return jsonify(at_risk)
+
 # ============= BENCHMARK PAGE =============
 @app.route('/benchmark')
 def benchmark():
@@ -312,4 +692,7 @@ def benchmark():
 
 # ============= MAIN =============
 if __name__ == "__main__":
+    # development server; production runs under gunicorn -c gunicorn.conf.py
+    serving.preload(registry)
+    warm_up_worker()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,32 @@
+# Production serving: gunicorn -c gunicorn.conf.py app:app
+#
+# The app (model, preprocessor, dataset store, risk table) is imported and
+# preloaded once in the master; workers are forked from it and share those
+# pages copy-on-write. Each worker runs warm-up predictions in post_fork,
+# before it starts accepting connections.
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+# request threads per worker; concurrent /predictdata rows are micro-batched
+threads = int(os.environ.get("THREADS_PER_WORKER", 8))
+worker_class = "gthread"
+preload_app = True
+timeout = 60
+accesslog = None
+
+
+def when_ready(server):
+    from app import registry
+    from src import serving
+
+    serving.preload(registry)
+    server.log.info(f"Preloaded model {registry.version}, forking {workers} workers")
+
+
+def post_fork(server, worker):
+    from app import warm_up_worker
+
+    warm_up_worker()
+    server.log.info(f"Worker {worker.pid} warmed up")
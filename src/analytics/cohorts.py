@@ -0,0 +1,222 @@
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logging
+from src.components.dataset_store import get_dataset_store
+
+
+COHORT_DIMENSIONS = ["customer_segment", "signup_channel", "contract_type"]
+# months since signup shown in the retention matrix
+RETENTION_MONTHS = (1, 3, 6, 12, 24, 36, 48)
+COHORT_WIDTHS = (1, 3, 6, 12)
+
+
+@dataclass
+class CohortConfig:
+    # width of a signup cohort in months; tenure t means the customer signed up t months ago
+    cohort_months: int = 6
+    retention_months: tuple = RETENTION_MONTHS
+
+
+def _codes(series):
+    """Integer codes and labels of a column; missing values get their own "Unknown" code."""
+    if not hasattr(series, "cat"):
+        series = series.astype("category")
+    codes = series.cat.codes.to_numpy().astype(np.int64)
+    labels = [str(value) for value in series.cat.categories]
+    if (codes < 0).any():
+        codes = np.where(codes < 0, len(labels), codes)
+        labels.append("Unknown")
+    return codes, labels
+
+
+def cohort_cube(df, dimensions=COHORT_DIMENSIONS):
+    '''
+    Customers and churned customers per (tenure month, *dimensions) cell.
+
+    This is the one groupby behind every cohort matrix: the columns are
+    folded into a single integer key and counted with two bincounts, so
+    the cost is a few passes over flat arrays whatever the row count.
+    Returns (counts, churned, {dimension: labels}); axis 0 is tenure.
+    '''
+    tenure = pd.to_numeric(df["tenure_months"], errors="coerce").to_numpy(np.float64)
+    valid = ~np.isnan(tenure) & (tenure >= 0)
+    tenure = np.where(valid, tenure, 0).astype(np.int64)
+    shape = [int(tenure.max()) + 1 if len(tenure) else 1]
+    key = tenure
+    labels = {}
+    for dim in dimensions:
+        codes, labels[dim] = _codes(df[dim])
+        key = key * len(labels[dim]) + codes
+        shape.append(len(labels[dim]))
+
+    churn = np.nan_to_num(pd.to_numeric(df["churn"], errors="coerce").to_numpy(np.float64))
+    key, churn = key[valid], churn[valid]
+    size = int(np.prod(shape))
+    counts = np.bincount(key, minlength=size).reshape(shape)
+    churned = np.bincount(key, weights=churn, minlength=size).reshape(shape)
+    return counts, churned, labels
+
+
+def retention_curve(counts, churned):
+    '''
+    Kaplan-Meier retention by month since signup (axis 0 = tenure; other
+    axes are kept). Active customers are censored at their tenure, so a
+    snapshot of current customers still gives an unbiased curve.
+    '''
+    at_risk = counts[::-1].cumsum(axis=0)[::-1]
+    hazard = np.divide(churned, at_risk, out=np.zeros(churned.shape), where=at_risk > 0)
+    return np.cumprod(1.0 - hazard, axis=0)
+
+
+def _rate(numerator, denominator):
+    return np.round(np.divide(numerator, denominator, out=np.zeros(np.shape(numerator)),
+                              where=np.asarray(denominator) > 0), 4)
+
+
+def cohort_view(counts, churned, labels, config=None):
+    '''
+    JSON-able matrices from a cohort_cube: signup cohorts (tenure bands of
+    cohort_months), and for each dimension the cohort x value size and
+    churn-rate matrices plus each value's retention curve.
+    '''
+    config = config or CohortConfig()
+    n_months = counts.shape[0]
+    starts = np.arange(0, n_months, config.cohort_months)
+    cohort_labels = [f"{lo}-{min(lo + config.cohort_months, n_months) - 1} mo ago" for lo in starts]
+    months = [m for m in config.retention_months if m < n_months]
+
+    total_counts = counts.reshape(n_months, -1).sum(axis=1)
+    total_churned = churned.reshape(n_months, -1).sum(axis=1)
+    overall_curve = retention_curve(total_counts, total_churned)
+    cohort_size = np.add.reduceat(total_counts, starts)
+    cohort_churned = np.add.reduceat(total_churned, starts)
+
+    view = {
+        "n_rows": int(total_counts.sum()),
+        "churn_rate": float(_rate(total_churned.sum(), total_counts.sum())),
+        "months": months,
+        "overall": {
+            "retention": np.round(overall_curve[months], 4).tolist(),
+            "curve": np.round(overall_curve, 4).tolist(),
+            # restricted mean lifetime: area under the retention curve
+            "avg_lifetime_months": round(float(overall_curve.sum()), 1),
+        },
+        "cohorts": {
+            "labels": cohort_labels,
+            "size": cohort_size.astype(int).tolist(),
+            "churn_rate": _rate(cohort_churned, cohort_size).tolist(),
+        },
+        "dimensions": {},
+    }
+
+    dims = list(labels)
+    for axis, dim in enumerate(dims, start=1):
+        other = tuple(i for i in range(1, counts.ndim) if i != axis)
+        dim_counts = counts.sum(axis=other)  # (tenure, values)
+        dim_churned = churned.sum(axis=other)
+        curve = retention_curve(dim_counts, dim_churned)
+        size = np.add.reduceat(dim_counts, starts, axis=0)
+        lost = np.add.reduceat(dim_churned, starts, axis=0)
+        view["dimensions"][dim] = {
+            "values": labels[dim],
+            "size": dim_counts.sum(axis=0).astype(int).tolist(),
+            "churn_rate": _rate(dim_churned.sum(axis=0), dim_counts.sum(axis=0)).tolist(),
+            "retention": np.round(curve[months].T, 4).tolist(),
+            "curve": np.round(curve.T, 4).tolist(),
+            "cohort_size": size.astype(int).tolist(),
+            "cohort_churn_rate": _rate(lost, size).tolist(),
+        }
+
+    view["highlights"] = _highlights(view)
+    return view
+
+
+def _highlights(view):
+    """Headline findings for the page; empty cohorts and groups are left out."""
+    cohorts = view["cohorts"]
+    filled = [i for i, size in enumerate(cohorts["size"]) if size]
+    if not filled:
+        return {}
+    best = min(filled, key=lambda i: cohorts["churn_rate"][i])
+    worst = max(filled, key=lambda i: cohorts["churn_rate"][i])
+    groups = [(dim, value, dim_view["churn_rate"][j])
+              for dim, dim_view in view["dimensions"].items()
+              for j, value in enumerate(dim_view["values"]) if dim_view["size"][j]]
+    riskiest = max(groups, key=lambda group: group[2]) if groups else None
+    return {
+        "best_cohort": {"label": cohorts["labels"][best], "churn_rate": cohorts["churn_rate"][best]},
+        "worst_cohort": {"label": cohorts["labels"][worst], "churn_rate": cohorts["churn_rate"][worst]},
+        "riskiest_group": riskiest and {"dimension": riskiest[0], "value": riskiest[1],
+                                        "churn_rate": riskiest[2]},
+    }
+
+
+class CohortEngine:
+    '''
+    Cohort matrices for the current dataset version. The cube is built
+    once per version; views for each cohort width are derived from it and
+    kept until the dataset changes.
+    '''
+    def __init__(self, store=None):
+        self.store = store or get_dataset_store()
+        self._lock = threading.Lock()
+        self._version = None
+        self._cube = None
+        self._views = {}
+
+    def view(self, cohort_months=None):
+        try:
+            config = CohortConfig(cohort_months=cohort_months or CohortConfig.cohort_months)
+            df, metadata = self.store.load()
+            version = metadata["version"]
+            cached = self._views.get((version, config.cohort_months))
+            if cached is not None:
+                return cached
+
+            with self._lock:
+                if self._version != version:
+                    started = time.perf_counter()
+                    self._cube = cohort_cube(df)
+                    self._version, self._views = version, {}
+                    logging.info(f"Cohort cube for dataset {version} built over {len(df)} rows "
+                                 f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+                view = cohort_view(*self._cube, config)
+                view["dataset_version"] = version
+                view["cohort_months"] = config.cohort_months
+                self._views[(version, config.cohort_months)] = view
+                return view
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+_engine = None
+
+
+def get_cohort_engine():
+    """Return the process-wide CohortEngine."""
+    global _engine
+    if _engine is None:
+        _engine = CohortEngine()
+    return _engine
+
+
+if __name__ == "__main__":
+    from src.components.dataset_store import load_dataset
+
+    df = load_dataset()
+    for n_copies in (1, 100, 500):
+        big = pd.concat([df] * n_copies, ignore_index=True) if n_copies > 1 else df
+        started = time.perf_counter()
+        cube = cohort_cube(big)
+        built = time.perf_counter()
+        cohort_view(*cube)
+        print(f"{len(big):>9} rows: cube {(built - started) * 1000:.0f} ms, "
+              f"view {(time.perf_counter() - built) * 1000:.1f} ms")
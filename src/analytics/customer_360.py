@@ -0,0 +1,357 @@
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logging
+from src.components.dataset_store import get_dataset_store
+from src.pipeline.bulk_scoring import RISK_TIER_THRESHOLDS, RISK_TIERS, load_risk_table, risk_scores_for
+from src.utils import LRUCache
+
+
+@dataclass
+class Customer360Config:
+    # explanations kept per process, keyed by (customer_id, model_version)
+    explanation_cache_size: int = 2048
+    top_contributions: int = 8
+    # customer list pages
+    page_size: int = 24
+    max_page_size: int = 200
+    # rows of a precomputed sort order checked per step while filling a filtered page
+    scan_chunk: int = 65_536
+
+
+# sort keys of the customer list and the columns behind them
+CUSTOMER_SORTS = {"risk": "risk", "fee": "monthly_fee", "tenure": "tenure_months"}
+CUSTOMER_FILTERS = ("gender", "contract_type", "customer_segment", "risk_band")
+CUSTOMER_LIST_COLUMNS = ["customer_id", "age", "gender", "tenure_months", "monthly_fee",
+                         "contract_type", "customer_segment"]
+# risk bands as used in the query string; customers not in the risk table are "unscored"
+RISK_BANDS = [tier.lower() for tier in RISK_TIERS] + ["unscored"]
+
+
+class CustomerIndex:
+    '''
+    Hash index from customer_id to row offset in the dataset store, so a
+    detail page reads one row in O(1) instead of scanning the frame.
+    Rebuilt only when the dataset version changes.
+    '''
+    def __init__(self, store=None):
+        self.store = store or get_dataset_store()
+        self._lock = threading.Lock()
+        self._version = None
+        self._offsets = {}
+        self._frame = None
+
+    def _refresh(self):
+        df, metadata = self.store.load()
+        if metadata["version"] == self._version:
+            return
+        with self._lock:
+            if metadata["version"] == self._version:
+                return
+            ids = df["customer_id"].astype(str).tolist()
+            self._offsets = dict(zip(ids, range(len(ids))))
+            self._frame = df
+            self._version = metadata["version"]
+            logging.info(f"Customer index built over {len(ids)} customers")
+
+    def offset(self, customer_id):
+        self._refresh()
+        return self._offsets.get(str(customer_id))
+
+    def lookup(self, customer_id):
+        """The customer's row as a plain dict, or None if unknown."""
+        try:
+            offset = self.offset(customer_id)
+            if offset is None:
+                return None
+            df = self._frame
+            return {col: _to_builtin(df[col].iat[offset]) for col in df.columns}
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def _to_builtin(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, float) and value != value:
+        return None
+    return value
+
+
+class ContributionExplainer:
+    '''
+    Per-customer feature contributions from the trained forest's tree paths
+    (see ForestEngine.contributions), summed from the one-hot output columns
+    back onto the 30 original features. Models the forest engine cannot
+    export (e.g. gradient boosting) get occlusion contributions instead:
+    the drop in probability when one feature is reset to the baseline
+    customer (every column imputed). "method" says which one was used.
+    Results are cached per (customer_id, model_version) in an LRU, so a
+    model swap never serves a stale explanation and repeated page views
+    cost a dict lookup.
+    '''
+    def __init__(self, registry, config=None):
+        self.registry = registry
+        self.config = config or Customer360Config()
+        self.cache = LRUCache(self.config.explanation_cache_size)
+
+    def explain(self, customer_id, record):
+        try:
+            handle = self.registry.get()
+            key = (str(customer_id), handle.version)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+            engine, compiled = handle.forest_engine, handle.compiled_preprocessor
+            if compiled is None:
+                return None
+
+            if engine is not None:
+                bias, contributions = engine.contributions(compiled.transform_records(record))
+                by_feature = pd.Series(contributions[0]).groupby(compiled.output_sources, sort=False).sum()
+                base_rate, probability, method = bias[0], bias[0] + contributions[0].sum(), "tree_path"
+            else:
+                base_rate, probability, by_feature = self._occlusion(handle.model, compiled, record)
+                method = "occlusion"
+            ranked = by_feature.reindex(by_feature.abs().sort_values(ascending=False).index)
+
+            explanation = {
+                "model_version": handle.version,
+                "method": method,
+                "base_rate": round(float(base_rate), 4),
+                "probability": round(float(probability), 4),
+                "contributions": [
+                    {"feature": feature, "value": record.get(feature), "contribution": round(float(c), 4)}
+                    for feature, c in ranked.head(self.config.top_contributions).items()
+                ],
+            }
+            self.cache.put(key, explanation)
+            return explanation
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    @staticmethod
+    def _occlusion(model, compiled, record):
+        '''
+        Model-agnostic contributions: one batch holding the customer, the
+        baseline customer, and the customer with each feature's output
+        columns swapped for the baseline's. Returns (baseline probability,
+        probability, contribution per feature).
+        '''
+        row = compiled.transform_records(record)
+        baseline = compiled.transform_records({})
+        sources = np.asarray(compiled.output_sources)
+        features = list(dict.fromkeys(compiled.output_sources))
+        batch = np.repeat(row, len(features) + 2, axis=0)
+        batch[1] = baseline[0]
+        for i, feature in enumerate(features, start=2):
+            columns = sources == feature
+            batch[i, columns] = baseline[0, columns]
+        churn = model.predict_proba(batch)[:, 1]
+        return churn[1], churn[0], pd.Series(churn[0] - churn[2:], index=features)
+
+
+class CustomerListIndex:
+    '''
+    Server-side paging of the customer list. For every sort key a stable
+    row order is computed once per dataset version and risk table, along
+    with each row's filter group (gender x contract x segment x risk band,
+    one small integer) laid out in that order. A page is then a walk down
+    the precomputed order, a chunk at a time, until enough rows match; the
+    total for the filters is a sum over per-group counts.
+    '''
+    def __init__(self, config=None, store=None):
+        self.config = config or Customer360Config()
+        self.store = store or get_dataset_store()
+        self._lock = threading.Lock()
+        self._version = None
+        self._table = None
+
+    def _build(self, df, version, table):
+        started = time.perf_counter()
+        probability = risk_scores_for(df["customer_id"]) if len(df) else np.empty(0)
+        if probability is None:
+            probability = np.full(len(df), np.nan)
+        band = np.searchsorted(RISK_TIER_THRESHOLDS, probability, side="right")
+        band = np.where(np.isnan(probability), len(RISK_TIERS), band)
+
+        self.values, group, radix = {}, np.zeros(len(df), dtype=np.int64), 1
+        for name in CUSTOMER_FILTERS:
+            if name == "risk_band":
+                codes, values = band, RISK_BANDS
+            else:
+                series = df[name] if hasattr(df[name], "cat") else df[name].astype("category")
+                values = [str(value) for value in series.cat.categories] + ["Unknown"]
+                codes = series.cat.codes.to_numpy().astype(np.int64)
+                codes = np.where(codes < 0, len(values) - 1, codes)
+            self.values[name] = values
+            group = group * len(values) + codes
+            radix *= len(values)
+        self._radix = radix
+        self._group_counts = np.bincount(group, minlength=radix)
+        group_dtype = np.uint8 if radix <= 256 else np.uint16 if radix <= 65_536 else np.int64
+        position_dtype = np.int32 if len(df) < 2**31 else np.int64
+
+        self._orders, self._groups = {}, {}
+        for sort, column in CUSTOMER_SORTS.items():
+            values = probability if column == "risk" else pd.to_numeric(df[column], errors="coerce").to_numpy(np.float64)
+            # ascending and stable, so ties keep dataset order; unscored/missing values sort first
+            order = np.argsort(np.nan_to_num(values, nan=-np.inf), kind="stable").astype(position_dtype)
+            self._orders[sort] = order
+            self._groups[sort] = group[order].astype(group_dtype)
+
+        self._frame, self._probability = df, probability
+        self._version, self._table = version, table
+        logging.info(f"Customer list index built over {len(df)} customers in "
+                     f"{(time.perf_counter() - started) * 1000:.0f} ms")
+
+    def _refresh(self):
+        df, metadata = self.store.load()
+        table, _ = load_risk_table()
+        # the risk table is cached per file, so a rewritten table is a new object
+        if metadata["version"] != self._version or table is not self._table:
+            with self._lock:
+                if metadata["version"] != self._version or table is not self._table:
+                    self._build(df, metadata["version"], table)
+
+    def _allowed(self, filters):
+        """Boolean table over filter groups: True for groups matching every given filter."""
+        allowed = np.ones(self._radix, dtype=bool).reshape([len(self.values[name]) for name in CUSTOMER_FILTERS])
+        for axis, name in enumerate(CUSTOMER_FILTERS):
+            value = filters.get(name)
+            if value:
+                keep = np.array([v.lower() == str(value).lower() for v in self.values[name]])
+                allowed &= keep.reshape([-1 if i == axis else 1 for i in range(len(CUSTOMER_FILTERS))])
+        return allowed.reshape(-1)
+
+    def _rows(self, positions):
+        df = self._frame
+        columns = {col: df[col].iloc[positions].tolist() for col in CUSTOMER_LIST_COLUMNS if col in df.columns}
+        probability = self._probability[positions]
+        risk = [None if np.isnan(p) else round(float(p) * 100, 1) for p in probability]
+        return [dict(zip(columns, values), risk_score=r) for values, r in zip(zip(*columns.values()), risk)]
+
+    def query(self, page=1, page_size=None, sort="risk", descending=True, **filters):
+        '''
+        One page of customers: filters are gender, contract_type,
+        customer_segment and risk_band (high / medium / low / unscored),
+        case-insensitive; sort is "risk", "fee" or "tenure".
+        '''
+        try:
+            if sort not in CUSTOMER_SORTS:
+                raise ValueError(f"sort must be one of {list(CUSTOMER_SORTS)}")
+            page = max(1, page)
+            page_size = min(max(1, page_size or self.config.page_size), self.config.max_page_size)
+            self._refresh()
+
+            order, groups = self._orders[sort], self._groups[sort]
+            if descending:
+                order, groups = order[::-1], groups[::-1]
+            allowed = self._allowed(filters)
+            total = int(self._group_counts[allowed].sum())
+            skip, wanted = (page - 1) * page_size, page_size
+
+            if allowed.all():
+                positions = order[skip:skip + wanted]
+            elif skip >= total:
+                positions = np.empty(0, dtype=np.int64)
+            else:
+                found = []
+                for start in range(0, len(order), self.config.scan_chunk):
+                    hits = np.flatnonzero(allowed[groups[start:start + self.config.scan_chunk]])
+                    if skip >= len(hits):
+                        skip -= len(hits)
+                        continue
+                    hits = hits[skip:skip + wanted]
+                    skip = 0
+                    found.append(order[start + hits])
+                    wanted -= len(hits)
+                    if wanted == 0:
+                        break
+                positions = np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+            pages = max(1, -(-total // page_size))
+            return {
+                "page": page,
+                "page_size": page_size,
+                "total": total,
+                "pages": pages,
+                "next_page": page + 1 if page < pages else None,
+                "sort": sort,
+                "order": "desc" if descending else "asc",
+                "filters": {name: filters.get(name) for name in CUSTOMER_FILTERS},
+                "rows": self._rows(positions),
+            }
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_customer_index():
+    """Return the process-wide CustomerIndex."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = CustomerIndex()
+    return _index
+
+
+_list_index = None
+
+
+def get_customer_list_index():
+    """Return the process-wide CustomerListIndex."""
+    global _list_index
+    if _list_index is None:
+        with _index_lock:
+            if _list_index is None:
+                _list_index = CustomerListIndex()
+    return _list_index
+
+
+if __name__ == "__main__":
+    from src.components.dataset_store import load_dataset
+
+    class _RepeatedStore:
+        """The dataset repeated to n_rows, standing in for a large store."""
+        def __init__(self, n_rows):
+            df = load_dataset()[CUSTOMER_LIST_COLUMNS]
+            self.df = df.iloc[np.arange(n_rows) % len(df)].reset_index(drop=True)
+
+        def load(self):
+            return self.df, {"version": "benchmark"}
+
+    n_rows = 10_000_000
+    index = CustomerListIndex(store=_RepeatedStore(n_rows))
+    started = time.perf_counter()
+    index.query()
+    print(f"{n_rows} rows: index built in {time.perf_counter() - started:.1f}s")
+    for title, query in (("first page by risk", {}),
+                         ("page 200 by fee", {"page": 200, "sort": "fee"}),
+                         ("high risk + female, by tenure", {"risk_band": "high", "gender": "Female", "sort": "tenure"}),
+                         ("yearly SME, page 50", {"contract_type": "Yearly", "customer_segment": "SME", "page": 50}),
+                         ("rarest group, last page", {"risk_band": "medium", "gender": "Female",
+                                                      "contract_type": "Quarterly", "customer_segment": "Enterprise",
+                                                      "page": -1})):
+        if query.get("page") == -1:
+            query["page"] = index.query(**dict(query, page=1))["pages"]
+        timings = []
+        for _ in range(5):
+            started = time.perf_counter()
+            index.query(**query)
+            timings.append(time.perf_counter() - started)
+        print(f"  {title:<32} median {sorted(timings)[2] * 1000:.1f} ms")
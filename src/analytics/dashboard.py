@@ -0,0 +1,224 @@
+import hashlib
+import json
+import os
+import sys
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logging
+from src.components.dataset_store import get_dataset_store
+
+
+@dataclass
+class DashboardAggregatesConfig:
+    summary_path: str = os.path.join('artifacts', 'dashboard_summary.json')
+
+
+# tenure buckets of the dashboard chart: 0-3, 4-6, 7-12, 13-24, 25-36, 37+
+TENURE_EDGES = np.array([0, 4, 7, 13, 25, 37])
+TENURE_KEYS = ["tenure_0_3", "tenure_4_6", "tenure_7_12", "tenure_13_24", "tenure_25_36", "tenure_37"]
+COUNTED_COLUMNS = ["contract_type", "payment_method"]
+SUMMED_COLUMNS = ["monthly_fee", "tenure_months", "support_tickets"]
+
+
+def schema_hash(df):
+    """Hash of column names and dtype kinds; a change forces a full recompute."""
+    schema = [(col, df[col].dtype.kind if hasattr(df[col].dtype, "kind") else "O") for col in df.columns]
+    return hashlib.sha256(json.dumps(schema).encode()).hexdigest()[:12]
+
+
+def _value_counts(series):
+    if hasattr(series, "cat"):
+        # one bincount over the category codes instead of a mask per value
+        codes = series.cat.codes.to_numpy()
+        counts = np.bincount(codes[codes >= 0], minlength=len(series.cat.categories))
+        return {str(cat): int(n) for cat, n in zip(series.cat.categories, counts) if n}
+    return {str(k): int(v) for k, v in series.value_counts().items()}
+
+
+def aggregate(df):
+    '''
+    Every dashboard number for a block of rows in one vectorised pass:
+    category counts, tenure histogram, churn count and column sums. The
+    result is additive, so appended rows can be merged in with merge().
+    '''
+    summary = {"n_rows": int(len(df)), "counts": {}, "sums": {}, "non_null": {}}
+    if "churn" in df.columns:
+        summary["churned"] = int(np.nansum(df["churn"].to_numpy(np.float64)))
+    for col in COUNTED_COLUMNS:
+        if col in df.columns:
+            summary["counts"][col] = _value_counts(df[col])
+    for col in SUMMED_COLUMNS:
+        if col in df.columns:
+            values = df[col].to_numpy(np.float64)
+            summary["sums"][col] = float(np.nansum(values))
+            summary["non_null"][col] = int(np.count_nonzero(~np.isnan(values)))
+    if "tenure_months" in df.columns:
+        tenure = df["tenure_months"].to_numpy(np.float64)
+        buckets = np.digitize(tenure[tenure >= 0], TENURE_EDGES)  # 1..6
+        summary["tenure_histogram"] = np.bincount(buckets, minlength=len(TENURE_EDGES) + 1)[1:].tolist()
+    return summary
+
+
+def merge(base, delta):
+    """Add the aggregates of appended rows onto an existing summary."""
+    merged = json.loads(json.dumps(base))
+    merged["n_rows"] += delta["n_rows"]
+    if "churned" in delta:
+        merged["churned"] = merged.get("churned", 0) + delta["churned"]
+    for col, counts in delta["counts"].items():
+        target = merged["counts"].setdefault(col, {})
+        for value, n in counts.items():
+            target[value] = target.get(value, 0) + n
+    for key in ("sums", "non_null"):
+        for col, value in delta[key].items():
+            merged[key][col] = merged[key].get(col, 0) + value
+    if "tenure_histogram" in delta:
+        old = merged.get("tenure_histogram", [0] * len(TENURE_KEYS))
+        merged["tenure_histogram"] = [a + b for a, b in zip(old, delta["tenure_histogram"])]
+    return merged
+
+
+def _fingerprint(df, n_rows=None):
+    '''
+    Content hash of the first n_rows (default: all): the sum of the row
+    hashes modulo 2**64, so any edited value changes it and the hash of
+    appended rows can be added on (see _extend_fingerprint).
+    '''
+    rows = df if n_rows is None else df.iloc[:n_rows]
+    return str(int(pd.util.hash_pandas_object(rows, index=False).to_numpy().sum(dtype=np.uint64)))
+
+
+def _extend_fingerprint(fingerprint, new_rows):
+    return str((int(fingerprint) + int(_fingerprint(new_rows))) % 2 ** 64)
+
+
+class DashboardAggregates:
+    '''
+    Precomputed dashboard summary keyed by dataset version.
+
+    The summary is stored as a small JSON file. When the dataset version
+    changes but the schema is the same, the table grew and its first n_rows
+    still hash to the stored fingerprint, just the new rows are aggregated
+    and merged; otherwise everything is recomputed.
+    '''
+    def __init__(self, config=None, store=None):
+        self.config = config or DashboardAggregatesConfig()
+        self.store = store or get_dataset_store()
+        # re-entrant: append() reads summary(), which may rebuild under the same lock
+        self._lock = threading.RLock()
+        self._summary = None
+
+    def _read(self):
+        if self._summary is None and os.path.exists(self.config.summary_path):
+            with open(self.config.summary_path) as file_obj:
+                self._summary = json.load(file_obj)
+        return self._summary
+
+    def _write(self, summary):
+        os.makedirs(os.path.dirname(self.config.summary_path), exist_ok=True)
+        tmp_path = f"{self.config.summary_path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w") as file_obj:
+            json.dump(summary, file_obj)
+        os.replace(tmp_path, self.config.summary_path)
+        self._summary = summary
+
+    def summary(self):
+        """Return the summary for the current dataset version, updating it if needed."""
+        try:
+            df, metadata = self.store.load()
+            version = metadata["version"]
+            cached = self._read()
+            if cached is not None and cached.get("dataset_version") == version:
+                return cached
+
+            with self._lock:
+                cached = self._read()
+                if cached is not None and cached.get("dataset_version") == version:
+                    return cached
+
+                schema = schema_hash(df)
+                n_old = cached["n_rows"] if cached else 0
+                appended = (
+                    cached is not None
+                    and cached.get("schema") == schema
+                    and 0 < n_old < len(df)
+                    and cached.get("fingerprint") == _fingerprint(df, n_old)
+                )
+                if appended:
+                    summary = merge(cached, aggregate(df.iloc[n_old:]))
+                    logging.info(f"Dashboard summary updated with {len(df) - n_old} appended rows")
+                else:
+                    summary = aggregate(df)
+                    logging.info(f"Dashboard summary recomputed over {len(df)} rows")
+
+                summary["schema"] = schema
+                summary["dataset_version"] = version
+                summary["fingerprint"] = _fingerprint(df)
+                self._write(summary)
+                return summary
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def append(self, new_rows):
+        '''
+        Merge rows appended outside the store (e.g. streamed in) into the
+        summary. Their hashes are added to the fingerprint, so once the store
+        itself ends with those rows (same columns and dtypes) only what
+        follows them is merged; a store without them no longer matches and
+        is recomputed.
+        '''
+        try:
+            with self._lock:
+                summary = merge(self.summary(), aggregate(new_rows))
+                summary["fingerprint"] = _extend_fingerprint(summary["fingerprint"], new_rows)
+                self._write(summary)
+                return summary
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def dashboard_view(summary):
+    """Turn a summary into the metrics / chart_data values dashboard.html reads."""
+    n_rows = summary["n_rows"]
+    churned = summary.get("churned", 0)
+    contracts = summary["counts"].get("contract_type", {})
+    payments = summary["counts"].get("payment_method", {})
+
+    def mean(col):
+        count = summary["non_null"].get(col, 0)
+        return summary["sums"][col] / count if count else 0.0
+
+    metrics = {
+        'avg_monthly_fee': mean("monthly_fee"),
+        'avg_tenure': mean("tenure_months"),
+        'total_tickets': int(summary["sums"].get("support_tickets", 0)),
+    }
+    chart_data = {
+        'churned': churned,
+        'active': n_rows - churned,
+        'monthly_contracts': contracts.get('Monthly', 0),
+        'yearly_contracts': contracts.get('Yearly', 0),
+        'payment_card': payments.get('Card', 0),
+        'payment_paypal': payments.get('PayPal', 0),
+        'payment_bank': payments.get('Bank Transfer', 0),
+    }
+    chart_data.update(zip(TENURE_KEYS, summary.get("tenure_histogram", [0] * len(TENURE_KEYS))))
+    return metrics, chart_data
+
+
+_aggregates = None
+
+
+def get_dashboard_aggregates():
+    """Return the process-wide DashboardAggregates."""
+    global _aggregates
+    if _aggregates is None:
+        _aggregates = DashboardAggregates()
+    return _aggregates
@@ -0,0 +1,344 @@
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logging
+from src.components.dataset_store import get_dataset_store
+from src.pipeline.bulk_scoring import RISK_TIER_THRESHOLDS, RISK_TIERS, load_risk_table, risk_scores_for
+
+RETENTION_SORTS = ("risk", "revenue")
+
+
+@dataclass
+class RetentionConfig:
+    top_k: int = 20
+    page_size: int = 25
+    max_page_size: int = 200
+    # rows kept as top-K candidates; rescoring only re-ranks the whole table
+    # when fewer than top_k of them are left above the cut-off
+    candidate_factor: int = 8
+    # a new risk table changing more than this fraction of rows is reloaded
+    # instead of applied as individual rescores
+    rebuild_fraction: float = 0.25
+
+
+def top_k_order(values, k, tiebreak=None):
+    '''
+    Positions of the k largest values, in descending order with ties broken
+    by the smallest tiebreak (default: position), so the ranking is
+    deterministic and consecutive pages of it never overlap.
+    np.partition finds the k-th value in O(n); only the k winners are sorted.
+    '''
+    n = len(values)
+    k = min(k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if tiebreak is None:
+        tiebreak = np.arange(n)
+    if k == n:
+        return np.lexsort((tiebreak, -values))
+    kth = np.partition(values, n - k)[n - k]
+    above = np.flatnonzero(values > kth)
+    ties = np.flatnonzero(values == kth)
+    ties = ties[np.argsort(tiebreak[ties], kind="stable")[:k - len(above)]]
+    chosen = np.concatenate([above, ties])
+    return chosen[np.lexsort((tiebreak[chosen], -values[chosen]))]
+
+
+def _codes(series):
+    if not hasattr(series, "cat"):
+        series = series.astype("category")
+    return series.cat.codes.to_numpy().astype(np.int64), [str(value) for value in series.cat.categories]
+
+
+def _code_of(value, names):
+    """Code of a filter value, ignoring case like the customer list does; -2 (no row) if unknown."""
+    lowered = [name.lower() for name in names]
+    value = str(value).lower()
+    return lowered.index(value) if value in lowered else -2
+
+
+class RetentionEngine:
+    '''
+    Risk ranking and revenue at risk over the scored customer base.
+
+    Probabilities come from the bulk risk table, aligned to the dataset
+    rows. Revenue at risk (monthly_fee x probability) is kept per tier x
+    segment, and a candidate set holds every customer above a probability
+    cut-off; rescoring customers adjusts both for those rows only, and a
+    rewritten risk table is applied the same way for the rows it changed.
+    State is per process, like the other serving caches.
+    '''
+    def __init__(self, config=None, store=None):
+        self.config = config or RetentionConfig()
+        self.store = store or get_dataset_store()
+        self._lock = threading.RLock()
+        self._version = None
+        self._table = None
+
+    # ---- building and incremental maintenance ----
+
+    def _build(self, df, version, table):
+        started = time.perf_counter()
+        self._ids = pd.Index(df["customer_id"].astype(str))
+        # equal probabilities rank by customer_id
+        self._id_rank = np.empty(len(self._ids), dtype=np.int64)
+        self._id_rank[self._ids.argsort()] = np.arange(len(self._ids))
+        self._fee = pd.to_numeric(df["monthly_fee"], errors="coerce").fillna(0).to_numpy(np.float64)
+        self._tenure = df["tenure_months"].to_numpy()
+        self._segment, self.segments = _codes(df["customer_segment"])
+        self._contract, self.contracts = _codes(df["contract_type"])
+        self._probability = risk_scores_for(self._ids)
+        self._tier = self._tiers(self._probability)
+
+        scored = self._tier >= 0
+        cells = len(RISK_TIERS) * len(self.segments)
+        key = self._tier * len(self.segments) + self._segment
+        valid = scored & (self._segment >= 0)
+        self._counts = np.bincount(key[valid], minlength=cells).reshape(len(RISK_TIERS), -1)
+        self._revenue = np.bincount(key[valid], weights=self._expected_loss()[valid],
+                                    minlength=cells).reshape(len(RISK_TIERS), -1)
+        self._rebuild_candidates()
+        self._version, self._table = version, table
+        logging.info(f"Retention engine built over {len(df)} customers in "
+                     f"{(time.perf_counter() - started) * 1000:.0f} ms")
+
+    @staticmethod
+    def _tiers(probability):
+        """Tier code per row (index into RISK_TIERS), -1 for unscored rows."""
+        codes = np.searchsorted(RISK_TIER_THRESHOLDS, probability, side="right")
+        return np.where(np.isnan(probability), -1, codes)
+
+    def _expected_loss(self, rows=slice(None)):
+        return np.nan_to_num(self._fee[rows] * self._probability[rows])
+
+    def _rebuild_candidates(self):
+        n_candidates = self.config.top_k * self.config.candidate_factor
+        ranked = top_k_order(np.nan_to_num(self._probability, nan=-1.0), n_candidates, self._id_rank)
+        ranked = ranked[~np.isnan(self._probability[ranked])]
+        self._candidates = set(ranked.tolist())
+        # every customer ranked at or above the cut-off (probability, customer_id rank) is a candidate
+        if len(ranked) == n_candidates:
+            self._cutoff = (float(self._probability[ranked[-1]]), int(self._id_rank[ranked[-1]]))
+        else:
+            self._cutoff = (-1.0, -1)
+
+    def _apply(self, rows, probability):
+        '''
+        Move rows to new probabilities: their old revenue and tier counts
+        are taken out of the aggregates and the new ones added, and the
+        candidate set is updated so top-K stays exact. A row given more than
+        once is moved once, to its last probability.
+        '''
+        rows = np.asarray(rows, dtype=np.int64)
+        probability = np.asarray(probability, dtype=np.float64)
+        _, last = np.unique(rows[::-1], return_index=True)
+        if len(last) < len(rows):
+            keep = len(rows) - 1 - last
+            rows, probability = rows[keep], probability[keep]
+        n_segments = len(self.segments)
+        for sign in (-1, 1):
+            if sign == 1:
+                self._probability[rows] = probability
+                self._tier[rows] = self._tiers(self._probability[rows])
+            valid = (self._tier[rows] >= 0) & (self._segment[rows] >= 0)
+            cells = (self._tier[rows] * n_segments + self._segment[rows])[valid]
+            np.add.at(self._counts.reshape(-1), cells, sign)
+            np.add.at(self._revenue.reshape(-1), cells, sign * self._expected_loss(rows)[valid])
+
+        cutoff, cutoff_rank = self._cutoff
+        for row, p in zip(rows.tolist(), probability.tolist()):
+            if p > cutoff or (p == cutoff and self._id_rank[row] <= cutoff_rank):
+                self._candidates.add(row)
+            else:
+                self._candidates.discard(row)
+        if len(self._candidates) < self.config.top_k:
+            self._rebuild_candidates()
+
+    def _refresh(self):
+        df, metadata = self.store.load()
+        table, _ = load_risk_table()
+        if table is None:
+            return False
+        if metadata["version"] == self._version and table is self._table:
+            return True
+        with self._lock:
+            if metadata["version"] != self._version:
+                self._build(df, metadata["version"], table)
+            elif table is not self._table:
+                probability = risk_scores_for(self._ids)
+                changed = np.flatnonzero(~((probability == self._probability)
+                                           | (np.isnan(probability) & np.isnan(self._probability))))
+                if len(changed) > self.config.rebuild_fraction * len(probability):
+                    self._build(df, metadata["version"], table)
+                else:
+                    self._apply(changed, probability[changed])
+                    self._table = table
+                    logging.info(f"Retention engine applied {len(changed)} rescored customers")
+        return True
+
+    def rescore(self, customer_ids, probabilities):
+        '''
+        Record new churn probabilities for individual customers (e.g. a
+        live prediction) without re-ranking the table. Unknown ids are
+        ignored. Returns the number of customers updated.
+        '''
+        try:
+            if not self._refresh():
+                return 0
+            with self._lock:
+                rows = self._ids.get_indexer(pd.Index(customer_ids).astype(str))
+                known = rows >= 0
+                self._apply(rows[known], np.asarray(probabilities, dtype=np.float64)[known])
+                return int(known.sum())
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    # ---- views ----
+
+    def _rows(self, positions):
+        return [{
+            "customer_id": self._ids[i],
+            "risk_score": round(float(self._probability[i]) * 100, 1),
+            "tier": RISK_TIERS[self._tier[i]],
+            "monthly_fee": float(self._fee[i]),
+            "expected_loss": round(float(self._fee[i] * self._probability[i]), 2),
+            "tenure_months": int(self._tenure[i]),
+            "customer_segment": self.segments[self._segment[i]] if self._segment[i] >= 0 else None,
+            "contract_type": self.contracts[self._contract[i]] if self._contract[i] >= 0 else None,
+        } for i in positions.tolist()]
+
+    def summary(self):
+        '''
+        Tier counts and revenue at risk, overall, per tier and per segment
+        (with each segment's split by tier). None until the bulk scoring
+        job has written a risk table.
+        '''
+        try:
+            if not self._refresh():
+                return None
+            with self._lock:
+                counts, revenue = self._counts.copy(), self._revenue.copy()
+            return {
+                "n_scored": int(counts.sum()),
+                "tier_counts": {tier: int(n) for tier, n in zip(RISK_TIERS, counts.sum(axis=1))},
+                "revenue_at_risk": float(revenue.sum()),
+                "revenue_by_tier": {tier: round(float(v), 2) for tier, v in zip(RISK_TIERS, revenue.sum(axis=1))},
+                "revenue_by_segment": {
+                    segment: {
+                        "customers": int(counts[:, j].sum()),
+                        "revenue_at_risk": round(float(revenue[:, j].sum()), 2),
+                        "by_tier": {tier: round(float(revenue[t, j]), 2) for t, tier in enumerate(RISK_TIERS)},
+                    } for j, segment in enumerate(self.segments)
+                },
+            }
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def top_k(self, k=None):
+        '''
+        The k highest-risk customers (at most max_page_size), ranked within
+        the candidate set; equal probabilities are ordered by customer_id.
+        '''
+        try:
+            k = min(k or self.config.top_k, self.config.max_page_size)
+            if not self._refresh():
+                return []
+            with self._lock:
+                candidates = np.fromiter(self._candidates, dtype=np.int64, count=len(self._candidates))
+                if k > len(candidates):
+                    # asked for more than the candidate set holds: rank the whole table
+                    order = top_k_order(np.nan_to_num(self._probability, nan=-1.0), k, self._id_rank)
+                    order = order[~np.isnan(self._probability[order])]
+                else:
+                    order = candidates[top_k_order(self._probability[candidates], k,
+                                                   self._id_rank[candidates])]
+                return self._rows(order)
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def page(self, page=1, page_size=None, tier=None, segment=None, contract=None, sort="risk"):
+        '''
+        One page of scored customers matching the filters (tier, segment,
+        contract type, matched ignoring case; None means any), ranked by
+        probability ("risk") or expected monthly loss ("revenue"). Only the
+        rows up to the end of the requested page are selected and sorted.
+        '''
+        try:
+            page_size = min(max(1, page_size or self.config.page_size), self.config.max_page_size)
+            page = max(1, page)
+            if sort not in RETENTION_SORTS:
+                raise ValueError(f"sort must be one of {RETENTION_SORTS}")
+            if not self._refresh():
+                return None
+            with self._lock:
+                mask = self._tier >= 0
+                for value, names, codes in ((tier, RISK_TIERS, self._tier),
+                                            (segment, self.segments, self._segment),
+                                            (contract, self.contracts, self._contract)):
+                    if value:
+                        mask &= codes == _code_of(value, names)
+                matches = np.flatnonzero(mask)
+                key = self._probability[matches] if sort == "risk" else self._expected_loss(matches)
+                order = top_k_order(key, page * page_size, self._id_rank[matches])[(page - 1) * page_size:]
+                rows = self._rows(matches[order])
+            return {
+                "page": page,
+                "page_size": page_size,
+                "total": int(len(matches)),
+                "pages": max(1, -(-len(matches) // page_size)),
+                "sort": sort,
+                "filters": {"tier": tier, "segment": segment, "contract": contract},
+                "rows": rows,
+            }
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_retention_engine():
+    """Return the process-wide RetentionEngine."""
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = RetentionEngine()
+    return _engine
+
+
+if __name__ == "__main__":
+    rng = np.random.default_rng(0)
+    n = 10_000_000
+    probability = rng.random(n)
+    started = time.perf_counter()
+    top_k_order(probability, 20)
+    partial = time.perf_counter() - started
+    started = time.perf_counter()
+    np.argsort(-probability, kind="stable")[:20]
+    full = time.perf_counter() - started
+    print(f"top-20 of {n} rows: partial selection {partial * 1000:.0f} ms, full sort {full * 1000:.0f} ms")
+
+    engine = get_retention_engine()
+    if engine.summary() is None:
+        print("no risk table; run python -m src.pipeline.bulk_scoring first")
+    else:
+        ids = engine._ids[:1000]
+        started = time.perf_counter()
+        engine.rescore(ids, rng.random(len(ids)))
+        print(f"rescore 1000 customers: {(time.perf_counter() - started) * 1000:.1f} ms")
+        started = time.perf_counter()
+        engine.top_k()
+        engine.page(page=3, tier="High", sort="revenue")
+        print(f"top-k + filtered page: {(time.perf_counter() - started) * 1000:.1f} ms")
@@ -1,4 +1,6 @@
+import json
 import os
+import shutil
 import sys
 import pandas as pd
 import numpy as np 
@@ -6,35 +8,106 @@ import numpy as np
 from src.exception import CustomException
 from src.logger import logging
 
-from sklearn.model_selection import train_test_split
 from dataclasses import dataclass
 
-from src.components.data_transformation import DataTransformation
-from src.components.data_transformation import DataTransformationConfig
-from src.components.model_trainer import ModelTrainer
+from src.components.dataset_store import DatasetStoreConfig, compact_dtypes, get_dataset_store
+from src.utils import load_columnar, save_columnar
 
 @dataclass
 class DataIngestionConfig:
   train_data_path: str=os.path.join('artifacts','train.csv')
   test_data_path: str=os.path.join('artifacts','test.csv') 
   raw_data_path: str=os.path.join('artifacts','data.csv')
+  # both ingestion modes put a customer on the same side (see is_test_row)
+  test_size: float=0.2
+  # streaming mode: chunked columnar train/test partitions
+  partitions_path: str=os.path.join('artifacts','partitions')
+  chunk_size: int=100_000
+
+# resolution of the hash split: test_size is rounded to 1 / SPLIT_BUCKETS
+SPLIT_BUCKETS = 10_000
+
+
+def is_test_row(customer_ids, test_size):
+    '''
+    Deterministic train/test assignment from a hash of customer_id.
+
+    The same customer always lands on the same side, whatever the chunk
+    boundaries, file order or process, so the split is reproducible without
+    shuffling the whole dataset.
+    '''
+    ids = np.asarray(customer_ids, dtype=object).astype(str).astype(object)
+    buckets = pd.util.hash_array(ids, categorize=False) % SPLIT_BUCKETS
+    return buckets < int(round(test_size * SPLIT_BUCKETS))
+
+
+def read_partition_manifest(partitions_path=None):
+    with open(os.path.join(partitions_path or DataIngestionConfig.partitions_path, "manifest.json")) as file_obj:
+        return json.load(file_obj)
+
+
+def iter_partitions(split, partitions_path=None, columns=None):
+    '''
+    Yield the "train" or "test" partition chunk by chunk as memory-mapped
+    DataFrames, so callers never hold more than one chunk.
+    '''
+    partitions_path = partitions_path or DataIngestionConfig.partitions_path
+    for part in read_partition_manifest(partitions_path)["splits"][split]["parts"]:
+        yield load_columnar(os.path.join(partitions_path, split, part), columns=columns)[0]
+
+
+def _stream_dtypes(source_path, chunk_size):
+    '''
+    One dtype per column for every chunk of a streamed CSV: compact_dtypes
+    of each chunk, widened until all of them fit, with the union of the
+    categories seen. A single chunk can miss categories or hold smaller
+    integers than the rest, so this reads the whole file once.
+    '''
+    dtypes = {}
+    for chunk in pd.read_csv(source_path, chunksize=chunk_size):
+        for col, dtype in compact_dtypes(chunk).dtypes.items():
+            seen = dtypes.get(col)
+            if isinstance(dtype, pd.CategoricalDtype):
+                categories = set(dtype.categories) | (set(seen.categories) if seen is not None else set())
+                dtypes[col] = pd.CategoricalDtype(sorted(categories))
+            elif seen is None or seen == dtype:
+                dtypes[col] = dtype
+            elif isinstance(seen, np.dtype) and isinstance(dtype, np.dtype):
+                dtypes[col] = np.promote_types(seen, dtype)
+            else:
+                dtypes[col] = np.dtype(object)
+    return dtypes
 
 class DataIngestion:
     def __init__(self):
         self.ingestion_config=DataIngestionConfig()
 
-    def initiate_data_ingestion(self):
+    def ingest_raw_data(self):
+        """Write the source dataset to artifacts/data.csv and return its path."""
         logging.info("Entered the data ingestion method")
         try:
-              df=pd.read_csv(r'F:\DATA-SCIENCE\ML-Project\Notebook\Data\customer_churn_business_dataset.csv')
+              df=get_dataset_store().load()[0]
               logging.info('Read the dataset as dataframe')
     
-              os.makedirs(os.path.dirname(self.ingestion_config.train_data_path),exist_ok=True)
+              os.makedirs(os.path.dirname(self.ingestion_config.raw_data_path),exist_ok=True)
     
               df.to_csv(self.ingestion_config.raw_data_path,index=False)
+              return self.ingestion_config.raw_data_path
+        except Exception as e:
+           raise CustomException(e,sys)
+
+    def split_train_test(self, raw_data_path=None):
+        '''
+        Split data.csv into train.csv / test.csv and return both paths.
+        Rows are assigned with is_test_row, so every customer is on the same
+        side as in the streamed partitions.
+        '''
+        try:
+              df=pd.read_csv(raw_data_path or self.ingestion_config.raw_data_path)
               logging.info("Train test split initiated")
     
-              train_set,test_set=train_test_split(df,test_size=0.2,random_state=42)
+              test_mask=is_test_row(df["customer_id"].to_numpy(),self.ingestion_config.test_size)
+              train_set,test_set=df[~test_mask],df[test_mask]
     
               train_set.to_csv(self.ingestion_config.train_data_path,index=False,header=True)
               test_set.to_csv(self.ingestion_config.test_data_path,index=False,header=True)
@@ -47,14 +120,80 @@ class DataIngestion:
               )
         except Exception as e:
            raise CustomException(e,sys) 
+
+    def initiate_data_ingestion(self):
+        return self.split_train_test(self.ingest_raw_data())
+
+    def initiate_streaming_ingestion(self, source_path=None):
+        '''
+        Out-of-core ingestion: read the source CSV chunk_size rows at a time,
+        route every row to train or test with is_test_row, and write each
+        chunk's rows as one columnar part under partitions_path/<split>/.
+
+        Only one chunk is in memory at a time. A first pass over the file
+        fixes the column dtypes (see _stream_dtypes), so every part has the
+        same schema. The partition directory is built next to the target and
+        swapped in at the end, and its manifest.json lists the parts and row
+        counts of each split.
+        '''
+        logging.info("Entered the streaming data ingestion method")
+        try:
+              config=self.ingestion_config
+              source_path=source_path or DatasetStoreConfig().source_path
+              tmp_path=f"{config.partitions_path}.tmp-{os.getpid()}"
+              shutil.rmtree(tmp_path,ignore_errors=True)
+
+              dtypes=_stream_dtypes(source_path,config.chunk_size)
+              splits={"train":{"parts":[],"rows":0},"test":{"parts":[],"rows":0}}
+              for i,chunk in enumerate(pd.read_csv(source_path,chunksize=config.chunk_size)):
+                  chunk=chunk.astype(dtypes)
+                  test_mask=is_test_row(chunk["customer_id"].to_numpy(),config.test_size)
+                  for split,mask in (("train",~test_mask),("test",test_mask)):
+                      if not mask.any():
+                          continue
+                      part=f"part-{i:05d}"
+                      save_columnar(os.path.join(tmp_path,split,part),chunk[mask].reset_index(drop=True))
+                      splits[split]["parts"].append(part)
+                      splits[split]["rows"]+=int(mask.sum())
+                  logging.info(f"Ingested chunk {i}: {len(chunk)} rows")
+
+              os.makedirs(tmp_path,exist_ok=True)
+              with open(os.path.join(tmp_path,"manifest.json"),"w") as file_obj:
+                  json.dump({
+                      "source_path":source_path,
+                      "chunk_size":config.chunk_size,
+                      "test_size":config.test_size,
+                      "splits":splits,
+                  },file_obj)
+
+              old_path=f"{config.partitions_path}.old-{os.getpid()}"
+              if os.path.exists(config.partitions_path):
+                  os.replace(config.partitions_path,old_path)
+              os.replace(tmp_path,config.partitions_path)
+              shutil.rmtree(old_path,ignore_errors=True)
+
+              logging.info(f"Streaming ingestion completed: {splits['train']['rows']} train / {splits['test']['rows']} test rows")
+              return config.partitions_path
+        except Exception as e:
+           raise CustomException(e,sys)
         
 
 if __name__=="__main__": 
-    obj=DataIngestion()
-    train_data,test_data=obj.initiate_data_ingestion()  
-    
-    data_transformation=DataTransformation()
-    train_array,test_arr,_=data_transformation.initiate_data_transformation(train_data,test_data)   
+    import argparse
+
+    parser=argparse.ArgumentParser(description="Run the cached training DAG, or only the streaming ingestion")
+    parser.add_argument("--stream",action="store_true",help="only write chunked train/test partitions")
+    parser.add_argument("--chunk-size",type=int,default=None)
+    parser.add_argument("--force",action="store_true",help="training DAG: rebuild every stage")
+    parser.add_argument("--workers",type=int,default=None,help="training DAG: process pool size")
+    args=parser.parse_args()
 
-    modeltraining=ModelTrainer()    
-    print(modeltraining.initiate_model_trainer(train_array,test_arr))   
\ No newline at end of file
+    if args.stream:
+        obj=DataIngestion()
+        if args.chunk_size:
+            obj.ingestion_config.chunk_size=args.chunk_size
+        print(read_partition_manifest(obj.initiate_streaming_ingestion()))
+    else:
+        # cached, stage-by-stage run; see src/pipeline/train_pipeline.py (--force to rebuild)
+        from src.pipeline.train_pipeline import main
+        main(["--force"]*args.force+(["--workers",str(args.workers)] if args.workers else []))
@@ -12,11 +12,29 @@ from src.exception import CustomException
 from src.logger import logging  
 import os
 
-from src.utils import save_object
+from src.utils import matrix_nbytes, save_object
 
 #from src.components.data_ingestion import DataIngestion
 
 
+# below this fraction of non-zeros the one-hot output is kept as CSR
+SPARSE_DENSITY_THRESHOLD = 0.3
+
+
+def compact_features(X):
+    '''
+    Preprocessor output as float32: CSR when it is sparse enough to pay
+    off, a dense array otherwise. Trees split on float32 anyway, so no
+    model sees a different value.
+    '''
+    if hasattr(X, "tocsr"):
+        density = X.nnz / max(1, X.shape[0] * X.shape[1])
+        if density < SPARSE_DENSITY_THRESHOLD:
+            return X.tocsr().astype(np.float32)
+        X = X.toarray()
+    return np.asarray(X).astype(np.float32, copy=False)
+
+
 @dataclass
 class DataTransformationConfig:
     preprocessor_obj_file_path=os.path.join('artifacts','preprocessor.pkl') 
@@ -24,6 +42,8 @@ class DataTransformationConfig:
 class DataTransformation:
     def __init__(self):
         self.data_transformation_config=DataTransformationConfig()
+        # filled by initiate_data_transformation
+        self.memory_report=None
 
     def get_data_transformer_object(self):
         '''
@@ -137,11 +157,23 @@ class DataTransformation:
                 f"Applying preprocessing object on training and testing datasets."
             )
 
-            input_feature_train_arr=preprocessing_obj.fit_transform(input_feature_train_df)
-            input_feature_test_arr=preprocessing_obj.transform(input_feature_test_df)
+            input_feature_train_arr=compact_features(preprocessing_obj.fit_transform(input_feature_train_df))
+            input_feature_test_arr=compact_features(preprocessing_obj.transform(input_feature_test_df))
+
+            # features and target stay separate: no dense float64 copy with the target glued on
+            train_set=(input_feature_train_arr,target_feature_train_df.to_numpy())
+            test_set=(input_feature_test_arr,target_feature_test_df.to_numpy())
 
-            train_arr=np.c_[input_feature_train_arr,np.array(target_feature_train_df)]
-            test_arr=np.c_[input_feature_test_arr,np.array(target_feature_test_df)]
+            dense_bytes=8*(input_feature_train_arr.shape[0]+input_feature_test_arr.shape[0])*(input_feature_train_arr.shape[1]+1)
+            stored_bytes=sum(matrix_nbytes(X)+y.nbytes for X,y in (train_set,test_set))
+            self.memory_report={
+                "format":type(input_feature_train_arr).__name__,
+                "dtype":str(input_feature_train_arr.dtype),
+                "bytes":stored_bytes,
+                "dense_float64_bytes":dense_bytes,
+                "saved_pct":round(100*(1-stored_bytes/dense_bytes),1),
+            }
+            logging.info(f"Transformed features vs dense float64 with the target column: {self.memory_report}")
 
             logging.info("Saved preprocessing object.")
 
@@ -151,8 +183,8 @@ class DataTransformation:
             )
 
             return(
-                train_arr,
-                test_arr,
+                train_set,
+                test_set,
                 self.data_transformation_config.preprocessor_obj_file_path,
             )
 
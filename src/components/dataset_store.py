@@ -0,0 +1,152 @@
+import os
+import sys
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import load_columnar, read_columnar_manifest, save_columnar
+
+
+@dataclass
+class DatasetStoreConfig:
+    source_path: str = os.environ.get(
+        'CHURN_DATASET_PATH', os.path.join('Notebook', 'Data', 'customer_churn_business_dataset.csv')
+    )
+    store_path: str = os.environ.get('CHURN_DATASET_STORE', os.path.join('artifacts', 'dataset_store'))
+
+
+CATEGORICAL_COLUMNS = [
+    "gender",
+    "country",
+    "city",
+    "customer_segment",
+    "signup_channel",
+    "contract_type",
+    "payment_method",
+    "complaint_type",
+    "survey_response",
+    "discount_applied",
+    "price_increase_last_3m"
+]
+
+
+def compact_dtypes(df):
+    '''
+    Shrink a freshly parsed frame without changing any value: the string
+    feature columns become categories, integers are downcast to the smallest
+    type that holds them, and floats become float32 only where that is exact.
+    '''
+    df = df.copy()
+    for col in df.columns:
+        series = df[col]
+        if col in CATEGORICAL_COLUMNS:
+            df[col] = series.astype("category")
+        elif series.dtype.kind in "iu":
+            df[col] = pd.to_numeric(series, downcast="integer")
+        elif series.dtype.kind == "f":
+            as_float32 = series.to_numpy().astype(np.float32)
+            if np.array_equal(as_float32.astype(np.float64), series.to_numpy(), equal_nan=True):
+                df[col] = as_float32
+    return df
+
+
+class DatasetStore:
+    '''
+    Columnar, memory-mapped copy of the customer dataset.
+
+    The CSV is parsed once into artifacts/dataset_store (see save_columnar);
+    after that every load maps the column files and the frame is cached per
+    process. Both are invalidated when the source CSV's mtime/size change.
+    '''
+    def __init__(self, config=None):
+        self.config = config or DatasetStoreConfig()
+        self._lock = threading.Lock()
+        self._cache = None  # (cache key, frame, metadata)
+
+    def _source_stat(self):
+        st = os.stat(self.config.source_path)
+        return st.st_mtime_ns, st.st_size
+
+    def _store_is_current(self, source_stat):
+        try:
+            metadata = read_columnar_manifest(self.config.store_path)["metadata"]
+        except (OSError, ValueError, KeyError):
+            return False
+        return (metadata.get("source_mtime_ns"), metadata.get("source_size")) == source_stat
+
+    def build(self, force=False):
+        """Convert the source CSV into the columnar store if it is missing or stale."""
+        try:
+            source_stat = self._source_stat()
+            if not force and self._store_is_current(source_stat):
+                return False
+
+            logging.info(f"Building dataset store from {self.config.source_path}")
+            df = compact_dtypes(pd.read_csv(self.config.source_path))
+            save_columnar(self.config.store_path, df, metadata={
+                "source_path": self.config.source_path,
+                "source_mtime_ns": source_stat[0],
+                "source_size": source_stat[1],
+                "version": f"{source_stat[0]:x}-{source_stat[1]:x}",
+                "schema": {col: str(dtype) for col, dtype in df.dtypes.items()},
+            })
+            logging.info(f"Dataset store written: {len(df)} rows, {df.memory_usage(deep=True).sum()} bytes in memory")
+            return True
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def load(self):
+        """Return (frame, metadata); parses nothing unless the source changed."""
+        try:
+            source_stat = self._source_stat()
+            cached = self._cache
+            if cached is not None and cached[0] == source_stat:
+                return cached[1], cached[2]
+
+            with self._lock:
+                cached = self._cache
+                if cached is None or cached[0] != source_stat:
+                    self.build()
+                    df, metadata = load_columnar(self.config.store_path)
+                    cached = (source_stat, df, metadata)
+                    self._cache = cached
+            return cached[1], cached[2]
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def version(self):
+        """Dataset version id (source mtime + size), changes whenever the CSV does."""
+        return self.load()[1]["version"]
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_dataset_store():
+    """Return the process-wide DatasetStore."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = DatasetStore()
+    return _store
+
+
+def load_dataset():
+    """The customer dataset as a (memory-mapped, cached) DataFrame."""
+    return get_dataset_store().load()[0]
+
+
+if __name__ == "__main__":
+    store = get_dataset_store()
+    store.build(force=True)
+    df, metadata = store.load()
+    print(f"{len(df)} rows, version {metadata['version']}")
+    print(df.dtypes)
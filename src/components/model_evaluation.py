@@ -0,0 +1,186 @@
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+from src.pipeline.compiled_preprocessor import compile_preprocessor
+from src.utils import _InlineExecutor, _to_builtin
+
+# sklearn.metrics is imported inside the functions that score: the web app
+# imports this module only for the artifact paths
+METRICS_FORMAT_VERSION = 1
+
+
+@dataclass
+class ModelEvaluationConfig:
+    # one <model version>.json per trained model, plus current.json for the latest
+    metrics_dir: str = os.path.join('artifacts', 'model_metrics')
+    n_repeats: int = 5
+    n_jobs: int = max(1, os.cpu_count() or 1)
+    random_state: int = 42
+
+
+def metrics_path(config, version):
+    return os.path.join(config.metrics_dir, f"{version}.json")
+
+
+def feature_groups(preprocessor):
+    '''
+    {original feature: [output column indices]} for the fitted
+    ColumnTransformer, so the one-hot columns of a category are permuted
+    together. Falls back to one group per output column for layouts the
+    compiled preprocessor does not support.
+    '''
+    try:
+        sources = compile_preprocessor(preprocessor).output_sources
+    except Exception:
+        sources = [str(name) for name in preprocessor.get_feature_names_out()]
+    groups = {}
+    for index, source in enumerate(sources):
+        groups.setdefault(source, []).append(index)
+    return groups
+
+
+# model and test set shared with every importance worker once
+_importance_data = None
+
+
+def _init_importance_worker(model, X, y):
+    global _importance_data
+    X = X.toarray() if hasattr(X, "toarray") else np.array(X)
+    _importance_data = (model, X, y, _roc_auc(model, X, y))
+
+
+def _roc_auc(model, X, y):
+    from sklearn.metrics import roc_auc_score
+
+    return roc_auc_score(y, model.predict_proba(X)[:, 1])
+
+
+def _permutation_drops(columns, n_repeats, seed):
+    '''
+    ROC-AUC drop for each of n_repeats shuffles of one feature's columns,
+    permuted jointly with the same row order.
+    '''
+    model, X, y, baseline = _importance_data
+    rng = np.random.default_rng(seed)
+    X_permuted = X.copy()
+    drops = []
+    for _ in range(n_repeats):
+        X_permuted[:, columns] = X[rng.permutation(len(X))][:, columns]
+        drops.append(baseline - _roc_auc(model, X_permuted, y))
+    return drops
+
+
+def grouped_permutation_importance(model, X, y, groups, n_repeats=5, n_jobs=1, random_state=42):
+    '''
+    Permutation importance per original feature. Every feature is one task
+    on a process pool (the model and test set are sent to each worker
+    once). Returns [{feature, importance_mean, importance_std, share}]
+    sorted by importance, share being the percentage of the total positive
+    importance.
+    '''
+    n_workers = max(1, min(n_jobs, len(groups)))
+    executor = (_InlineExecutor(_init_importance_worker, (model, X, y)) if n_workers == 1
+                else ProcessPoolExecutor(n_workers, initializer=_init_importance_worker, initargs=(model, X, y)))
+    with executor:
+        futures = {feature: executor.submit(_permutation_drops, columns, n_repeats, random_state + i)
+                   for i, (feature, columns) in enumerate(groups.items())}
+        drops = {feature: future.result() for feature, future in futures.items()}
+
+    total = sum(max(0.0, float(np.mean(d))) for d in drops.values()) or 1.0
+    rows = [{
+        "feature": feature,
+        "importance_mean": float(np.mean(d)),
+        "importance_std": float(np.std(d)),
+        "share": round(100 * max(0.0, float(np.mean(d))) / total, 2),
+    } for feature, d in drops.items()]
+    return sorted(rows, key=lambda row: row["importance_mean"], reverse=True)
+
+
+class ModelEvaluation:
+    '''
+    Train-time evaluation of the selected model on the test matrix: the
+    classification report, confusion matrix, ROC-AUC, log loss and timing,
+    plus permutation importance over the original features. Written as a
+    versioned JSON artifact so /insights only reads a file.
+    '''
+    def __init__(self, config=None):
+        self.config = config or ModelEvaluationConfig()
+
+    def evaluate(self, model, X_test, y_test):
+        from sklearn.metrics import (classification_report, confusion_matrix, log_loss,
+                                     matthews_corrcoef, roc_auc_score)
+
+        y_test = np.asarray(y_test).astype(int)
+        started = time.perf_counter()
+        y_proba = model.predict_proba(X_test)[:, 1]
+        predict_seconds = time.perf_counter() - started
+        y_pred = (y_proba >= 0.5).astype(int)
+
+        tn, fp, fn, tp = (int(v) for v in confusion_matrix(y_test, y_pred, labels=[0, 1]).ravel())
+        return {
+            "classification_report": classification_report(
+                y_test, y_pred, labels=[0, 1], target_names=["active", "churn"],
+                output_dict=True, zero_division=0),
+            "confusion_matrix": {"tn": tn, "fp": fp, "fn": fn, "tp": tp},
+            "roc_auc": float(roc_auc_score(y_test, y_proba)),
+            "log_loss": float(log_loss(y_test, y_proba, labels=[0, 1])),
+            "mcc": float(matthews_corrcoef(y_test, y_pred)),
+            "specificity": tn / (tn + fp) if tn + fp else 0.0,
+            "npv": tn / (tn + fn) if tn + fn else 0.0,
+            "fpr": fp / (fp + tn) if fp + tn else 0.0,
+            "fnr": fn / (fn + tp) if fn + tp else 0.0,
+            "n_test": int(len(y_test)),
+            "predict_seconds": predict_seconds,
+            "predict_ms_per_row": 1000 * predict_seconds / max(1, len(y_test)),
+        }
+
+    def initiate_model_evaluation(self, model, preprocessor, X_test, y_test, model_version,
+                                  model_name=None, training_seconds=None, extra=None):
+        '''
+        Evaluate, compute permutation importance and write
+        <metrics_dir>/<model_version>.json and current.json. Returns the
+        report.
+        '''
+        try:
+            started = time.perf_counter()
+            report = {
+                "format_version": METRICS_FORMAT_VERSION,
+                "model_version": model_version,
+                "model_name": model_name or type(model).__name__,
+                "trained_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "training_seconds": training_seconds,
+                **self.evaluate(model, X_test, y_test),
+            }
+
+            importance_started = time.perf_counter()
+            report["feature_importance"] = grouped_permutation_importance(
+                model, X_test, y_test, feature_groups(preprocessor),
+                n_repeats=self.config.n_repeats, n_jobs=self.config.n_jobs,
+                random_state=self.config.random_state,
+            )
+            report["importance_seconds"] = time.perf_counter() - importance_started
+            report.update(extra or {})
+
+            os.makedirs(self.config.metrics_dir, exist_ok=True)
+            for path in (metrics_path(self.config, model_version),
+                         os.path.join(self.config.metrics_dir, "current.json")):
+                tmp_path = f"{path}.tmp-{os.getpid()}"
+                with open(tmp_path, "w") as file_obj:
+                    json.dump(report, file_obj, indent=2, default=_to_builtin)
+                os.replace(tmp_path, path)
+
+            logging.info(f"Model evaluation for {model_version} written in "
+                         f"{time.perf_counter() - started:.1f}s: ROC-AUC {report['roc_auc']:.4f}, "
+                         f"top features {[row['feature'] for row in report['feature_importance'][:5]]}")
+            return report
+
+        except Exception as e:
+            raise CustomException(e, sys)
@@ -1,56 +1,139 @@
+import os
 import sys
+import time
 from dataclasses import dataclass
 
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
-from sklearn.metrics import accuracy_score
 
 from src.exception import CustomException
 from src.logger import logging
-from src.utils import save_object
+from src.components.model_evaluation import ModelEvaluation
+from src.pipeline.model_registry import ModelRegistryConfig, artifact_version
+from src.utils import load_object, save_object, evaluate_models
 
 
 @dataclass
 class ModelTrainerConfig:
     trained_model_file_path = "artifacts/model.pkl"
+    # seconds the search may spend before jumping to its final rung (None = no limit)
+    search_time_budget: float = float(os.environ.get("MODEL_SEARCH_TIME_BUDGET", 600))
+    search_n_jobs: int = max(1, os.cpu_count() or 1)
+    scoring: str = "roc_auc"
+
+
+def candidate_models():
+    '''
+    Models and parameter grids for the search. XGBoost and CatBoost are
+    included when installed. Every model runs single-threaded because the
+    search parallelises across candidates instead.
+    '''
+    models = {
+        "Random Forest": RandomForestClassifier(random_state=42, n_jobs=1),
+    }
+    params = {
+        "Random Forest": {
+            # 'criterion':['squared_error', 'friedman_mse', 'absolute_error', 'poisson'],
+
+            # 'max_features':['sqrt','log2',None],
+            'n_estimators': [8, 16, 32, 64, 128, 256]
+        },
+    }
+
+    try:
+        from xgboost import XGBClassifier
+        models["XGBoost"] = XGBClassifier(n_jobs=1, random_state=42, eval_metric="logloss")
+        params["XGBoost"] = {
+            'learning_rate': [0.05, 0.1],
+            'n_estimators': [100, 300],
+            'max_depth': [3, 6],
+        }
+    except ImportError:
+        logging.info("xgboost not installed, skipping XGBoost")
+
+    try:
+        from catboost import CatBoostClassifier
+        models["CatBoost"] = CatBoostClassifier(verbose=0, allow_writing_files=False,
+                                                thread_count=1, random_seed=42)
+        params["CatBoost"] = {
+            'depth': [4, 6],
+            'learning_rate': [0.05, 0.1],
+            'iterations': [100, 300],
+        }
+    except ImportError:
+        logging.info("catboost not installed, skipping CatBoost")
+
+    return models, params
+
+
+def split_xy(data):
+    '''
+    Features and integer target from an (X, y) pair, or from a legacy
+    array with the target as its last column.
+    '''
+    if isinstance(data, tuple):
+        X, y = data
+        return X, np.asarray(y).astype(int)
+    return data[:, :-1], data[:, -1].astype(int)
 
 
 class ModelTrainer:
+    def __init__(self):
+        self.model_trainer_config = ModelTrainerConfig()
+
+    def search(self, train_array, test_array, names=None, n_jobs=None):
+        '''
+        Run the model search, optionally over a subset of model names.
+        Returns evaluate_models' report keyed by model name.
+        '''
+        X_train, y_train = split_xy(train_array)
+        X_test, y_test = split_xy(test_array)
+
+        models, params = candidate_models()
+        if names is not None:
+            models = {name: models[name] for name in names}
+        logging.info(f"Searching {list(models)}")
+
+        return evaluate_models(
+            X_train, y_train, X_test, y_test, models, params,
+            scoring=self.model_trainer_config.scoring,
+            time_budget=self.model_trainer_config.search_time_budget,
+            n_jobs=n_jobs or self.model_trainer_config.search_n_jobs,
+        )
+
+    @staticmethod
+    def select_best(report):
+        """Name of the model with the best validation score; the test set stays out of selection."""
+        return max(report, key=lambda name: report[name]["validation_score"])
+
     def initiate_model_trainer(self, train_array, test_array):
         try:
             logging.info("Splitting training and test input data")
 
-            X_train, y_train = train_array[:, :-1], train_array[:, -1]
-            X_test, y_test = test_array[:, :-1], test_array[:, -1]
-
-            logging.info("Training Random Forest model")
-
-            model = RandomForestClassifier(
-                n_estimators=200,
-                max_depth=None,
-                random_state=42,
-                n_jobs=1
-            )
-
-            params={
-                  "Random Forest":{
-                    # 'criterion':['squared_error', 'friedman_mse', 'absolute_error', 'poisson'],
-                 
-                    # 'max_features':['sqrt','log2',None],
-                    'n_estimators': [8,16,32,64,128,256]
-                }
-             }
-
-            model.fit(X_train, y_train)
+            started = time.perf_counter()
+            report = self.search(train_array, test_array)
+            training_seconds = time.perf_counter() - started
 
-            y_pred = model.predict(X_test)
-            acc = accuracy_score(y_test, y_pred)
+            best_model_name = self.select_best(report)
+            best = report[best_model_name]
+            acc = best["test_metrics"]["accuracy"]
 
-            logging.info(f"Random Forest accuracy: {acc}")
+            logging.info(f"Best model: {best_model_name} {best['best_params']}, test metrics {best['test_metrics']}")
 
             save_object(
-                file_path=ModelTrainerConfig.trained_model_file_path,
-                obj=model
+                file_path=self.model_trainer_config.trained_model_file_path,
+                obj=best["model"]
+            )
+
+            # versioned metrics artifact for /insights, stamped with the version serving will report
+            registry_config = ModelRegistryConfig(model_path=self.model_trainer_config.trained_model_file_path)
+            X_test, y_test = split_xy(test_array)
+            ModelEvaluation().initiate_model_evaluation(
+                best["model"], load_object(registry_config.preprocessor_path), X_test, y_test,
+                model_version=artifact_version(registry_config)[0],
+                model_name=best_model_name,
+                training_seconds=training_seconds,
+                extra={"validation_score": best["validation_score"]},
             )
 
             return acc
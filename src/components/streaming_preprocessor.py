@@ -0,0 +1,129 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.pipeline.compiled_preprocessor import CompiledPreprocessor
+
+
+class StreamingPreprocessor:
+    '''
+    Learns the statistics of DataTransformation's ColumnTransformer one
+    chunk at a time, with memory independent of the number of rows.
+
+    Numeric columns: the imputation median comes from a fixed-size reservoir
+    sample (approximate), the scaler mean/variance from Chan's parallel
+    merge of per-chunk moments, corrected at the end for the rows the median
+    will fill. Categorical columns: value counts, which give the sorted
+    one-hot vocabulary, the most-frequent fill value and the exact
+    unit-variance scale of every one-hot column.
+
+    compile() returns a CompiledPreprocessor, so the result transforms and
+    serves exactly like a compiled sklearn preprocessor.
+    '''
+    def __init__(self, numerical_columns, categorical_columns, reservoir_size=100_000, random_state=42):
+        self.numerical_columns = list(numerical_columns)
+        self.categorical_columns = list(categorical_columns)
+        self.reservoir_size = reservoir_size
+        self._rng = np.random.default_rng(random_state)
+
+        n_num = len(self.numerical_columns)
+        self.n_rows = 0
+        self.n_observed = np.zeros(n_num, dtype=np.int64)
+        self.mean = np.zeros(n_num)
+        self.m2 = np.zeros(n_num)
+        self.reservoirs = [np.empty(0) for _ in self.numerical_columns]
+        self.category_counts = [pd.Series(dtype=np.int64) for _ in self.categorical_columns]
+
+    def _update_reservoir(self, i, values):
+        reservoir = self.reservoirs[i]
+        seen = int(self.n_observed[i])
+        room = self.reservoir_size - len(reservoir)
+        if room > 0:
+            reservoir = np.concatenate([reservoir, values[:room]])
+            values, seen = values[room:], seen + min(room, len(values))
+        if len(values):
+            # algorithm R, vectorised: item t replaces a random slot with probability k / (t + 1)
+            slots = self._rng.integers(0, seen + np.arange(1, len(values) + 1))
+            keep = slots < self.reservoir_size
+            reservoir[slots[keep]] = values[keep]
+        self.reservoirs[i] = reservoir
+
+    def partial_fit(self, chunk):
+        """Fold one DataFrame chunk into the running statistics."""
+        try:
+            self.n_rows += len(chunk)
+            for i, col in enumerate(self.numerical_columns):
+                values = pd.to_numeric(chunk[col], errors="coerce").to_numpy(np.float64)
+                values = values[~np.isnan(values)]
+                if not len(values):
+                    continue
+                self._update_reservoir(i, values)
+
+                n_a, n_b = self.n_observed[i], len(values)
+                mean_b = values.mean()
+                m2_b = ((values - mean_b) ** 2).sum()
+                delta = mean_b - self.mean[i]
+                n = n_a + n_b
+                self.mean[i] += delta * n_b / n
+                self.m2[i] += m2_b + delta ** 2 * n_a * n_b / n
+                self.n_observed[i] = n
+
+            for j, col in enumerate(self.categorical_columns):
+                counts = chunk[col].astype(object).value_counts(dropna=True)
+                self.category_counts[j] = self.category_counts[j].add(counts, fill_value=0).astype(np.int64)
+            return self
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _numeric_statistics(self):
+        fill = np.array([np.median(r) if len(r) else 0.0 for r in self.reservoirs])
+        n_missing = self.n_rows - self.n_observed
+        # merge the observed moments with n_missing copies of the fill value
+        mean = (self.n_observed * self.mean + n_missing * fill) / max(self.n_rows, 1)
+        m2 = (self.m2 + self.n_observed * (self.mean - mean) ** 2
+              + n_missing * (fill - mean) ** 2)
+        scale = np.sqrt(m2 / max(self.n_rows, 1))
+        scale[scale == 0] = 1.0
+        return fill, mean, scale
+
+    def compile(self, feature_names_in=None):
+        """CompiledPreprocessor with the statistics learned so far."""
+        try:
+            num_fill, num_mean, num_scale = self._numeric_statistics()
+            n_num = len(self.numerical_columns)
+
+            cat_fill, cat_lookups, cat_values = [], [], []
+            for counts in self.category_counts:
+                categories = sorted(counts.index)
+                # SimpleImputer(most_frequent) breaks ties with the smallest value
+                top = counts.max()
+                fill = min(c for c in categories if counts[c] == top)
+                filled = counts.copy()
+                filled[fill] += self.n_rows - counts.sum()
+
+                base = n_num + len(cat_values)
+                cat_fill.append(fill)
+                cat_lookups.append({c: base + k for k, c in enumerate(categories)})
+                for c in categories:
+                    p = filled[c] / self.n_rows
+                    std = np.sqrt(p * (1 - p))
+                    cat_values.append(1.0 / std if std > 0 else 1.0)
+
+            return CompiledPreprocessor(
+                feature_names_in=feature_names_in if feature_names_in is not None
+                else self.numerical_columns + self.categorical_columns,
+                numerical_columns=self.numerical_columns,
+                num_fill=num_fill,
+                num_mean=num_mean,
+                num_scale=num_scale,
+                categorical_columns=self.categorical_columns,
+                cat_fill=cat_fill,
+                cat_lookups=cat_lookups,
+                cat_values=cat_values,
+            )
+
+        except Exception as e:
+            raise CustomException(e, sys)
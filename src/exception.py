@@ -17,6 +17,11 @@ class CustomException(Exception):
         self.error_message = error_message_detail(error_message, error_detail)
 
     def __str__(self):
-        return self.error_message   
-    
-    
\ No newline at end of file
+        return self.error_message
+
+
+def root_cause(error):
+    """The exception a chain of CustomException wrappers was raised for."""
+    while isinstance(error, CustomException) and error.args and isinstance(error.args[0], BaseException):
+        error = error.args[0]
+    return error
@@ -1,28 +1,245 @@
+import atexit
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import time
+from dataclasses import dataclass
 from datetime import datetime
 
 # Base directory of this script
 base_dir = os.path.dirname(os.path.abspath(__file__))
 
-# Create 'logs' folder if it doesn't exist
-log_dir = os.path.join(base_dir, "logs")
-os.makedirs(log_dir, exist_ok=True)
 
-# Log filename
-log_filename = datetime.now().strftime("%Y-%m-%d") + ".log"  # one log per day
-log_file_path = os.path.join(log_dir, log_filename)
+@dataclass
+class LoggerConfig:
+    log_dir: str = os.environ.get('LOG_DIR', os.path.join(base_dir, "logs"))
+    level: str = os.environ.get('LOG_LEVEL', 'INFO')
+    # a day's file is rolled to .1, .2, ... once it grows past max_bytes
+    max_bytes: int = int(os.environ.get('LOG_MAX_BYTES', 50 * 2**20))
+    backup_count: int = int(os.environ.get('LOG_BACKUP_COUNT', 5))
+    # fraction of per-request debug records kept when LOG_LEVEL=DEBUG (see debug_sampled)
+    debug_sample_rate: float = float(os.environ.get('LOG_DEBUG_SAMPLE_RATE', 0.01))
+    queue_size: int = 10_000
 
-# Setup logging
-logging.basicConfig(
-    filename=log_file_path,
-    level=logging.INFO,  # logs info, warning, error, critical
-    format='%(asctime)s - %(levelname)s - %(message)s'
-)
 
-# Example log messages
-logging.info("This is an INFO message")
-logging.error("This is an ERROR message")
-logging.warning("This is a WARNING message")
+# LogRecord attributes that are not user fields passed with extra=
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
 
-print(f"Logging to: {log_file_path}")
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; fields passed with extra= are kept as top-level keys."""
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class DailyRotatingFileHandler(logging.handlers.RotatingFileHandler):
+    '''
+    Writes to <log_dir>/<YYYY-MM-DD>.log, switching to a new file at
+    midnight (time rotation) and rolling the current day's file to .1, .2,
+    ... past max_bytes (size rotation). Several processes append to the
+    same file, so a file renamed by another process's rollover is
+    reopened instead of written to after the move.
+    '''
+    def __init__(self, log_dir, max_bytes=0, backup_count=0):
+        self.log_dir = log_dir
+        self.day = self._today()
+        super().__init__(self._path(self.day), maxBytes=max_bytes, backupCount=backup_count,
+                         encoding="utf-8", delay=True)
+
+    @staticmethod
+    def _today():
+        return time.strftime("%Y-%m-%d")
+
+    def _path(self, day):
+        return os.path.join(self.log_dir, day + ".log")
+
+    def _moved(self):
+        try:
+            return os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def shouldRollover(self, record):
+        if self._today() != self.day:
+            return True
+        if self.stream is not None and self._moved():
+            self.stream.close()
+            self.stream = self._open()
+        return super().shouldRollover(record)
+
+    def doRollover(self):
+        today = self._today()
+        if today != self.day:
+            if self.stream is not None:
+                self.stream.close()
+                self.stream = None
+            self.day = today
+            self.baseFilename = os.path.abspath(self._path(today))
+            return
+        super().doRollover()
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    '''
+    Hands the record to the listener thread unformatted: the listener runs
+    in this process, so the message is merged there rather than in the
+    request thread. A full queue drops the record instead of blocking.
+    '''
+    dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _QueueListener(logging.handlers.QueueListener):
+    def enqueue_sentinel(self):
+        # wait for room: a full queue must still be drained before stopping
+        self.queue.put(self._sentinel)
+
+
+class QueuedLogging:
+    '''
+    Root logger setup: callers only pay for creating a LogRecord and a
+    queue put; JSON formatting and file I/O happen in a QueueListener
+    thread. The listener is restarted in forked children (gunicorn
+    workers, process pools), which would otherwise queue records nobody
+    writes.
+    '''
+    def __init__(self, config=None):
+        self.config = config or LoggerConfig()
+        os.makedirs(self.config.log_dir, exist_ok=True)
+        self.file_handler = DailyRotatingFileHandler(self.config.log_dir, self.config.max_bytes,
+                                                     self.config.backup_count)
+        self.file_handler.setFormatter(JsonFormatter())
+        self.queue_handler = None
+        self.listener = None
+
+    @property
+    def log_file_path(self):
+        return self.file_handler.baseFilename
+
+    def start(self):
+        root = logging.getLogger()
+        if self.queue_handler is not None:
+            root.removeHandler(self.queue_handler)
+        log_queue = queue.Queue(self.config.queue_size)
+        self.queue_handler = _QueueHandler(log_queue)
+        self.listener = _QueueListener(log_queue, self.file_handler, respect_handler_level=True)
+        root.addHandler(self.queue_handler)
+        root.setLevel(self.config.level.upper())
+        self.listener.start()
+
+    def stop(self):
+        """Flush whatever is queued and stop the listener thread."""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+        self.file_handler.close()
+
+    def _after_fork(self):
+        # the parent's listener thread does not exist here; queue a fresh one
+        self.listener = None
+        self.start()
+
+
+_logging = QueuedLogging()
+_logging.start()
+atexit.register(_logging.stop)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_logging._after_fork)
+
+log_dir = _logging.config.log_dir
+log_file_path = _logging.log_file_path
+
+
+def debug_sampled():
+    '''
+    Whether to emit a per-request debug record: True for a
+    debug_sample_rate fraction of calls, and only when DEBUG is enabled.
+    Guard the call site with it so the record's fields are only built
+    when it will be kept.
+    '''
+    return (logging.getLogger().isEnabledFor(logging.DEBUG)
+            and random.random() < _logging.config.debug_sample_rate)
+
+
+def benchmark_logging(n_records=5_000, work=None):
+    '''
+    Per-call cost in µs, in the calling thread, of work() followed by one
+    logging.info record: with a NullHandler, with a plain synchronous
+    FileHandler using the same JSON formatter, and with the queued setup.
+    Files go to a temporary directory. Keep n_records under the queue size
+    so the queued run measures enqueues rather than drops.
+    '''
+    import tempfile
+
+    work = work or (lambda: None)
+    root = logging.getLogger()
+    saved_handlers, saved_level = list(root.handlers), root.level
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        sync_handler = logging.FileHandler(os.path.join(tmp, "sync.log"))
+        sync_handler.setFormatter(JsonFormatter())
+        queued = QueuedLogging(LoggerConfig(log_dir=tmp, level="INFO"))
+        try:
+            for name in ("null_handler", "synchronous", "queued"):
+                for handler in list(root.handlers):
+                    root.removeHandler(handler)
+                root.setLevel(logging.INFO)
+                if name == "null_handler":
+                    root.addHandler(logging.NullHandler())
+                elif name == "synchronous":
+                    root.addHandler(sync_handler)
+                elif name == "queued":
+                    queued.start()
+                started = time.perf_counter()
+                for i in range(n_records):
+                    work()
+                    logging.info("Scored request", extra={"rows": 1, "request": i})
+                results[f"{name}_us_per_call"] = round((time.perf_counter() - started) / n_records * 1e6, 2)
+            results["queued_dropped"] = queued.queue_handler.dropped
+        finally:
+            queued.stop()
+            sync_handler.close()
+            for handler in list(root.handlers):
+                root.removeHandler(handler)
+            for handler in saved_handlers:
+                root.addHandler(handler)
+            root.setLevel(saved_level)
+    return results
+
+
+if __name__ == "__main__":
+    from src.components.dataset_store import load_dataset
+    from src.pipeline.predict_pipeline import PredictPipeline
+
+    print("logging only:", benchmark_logging())
+    sample = load_dataset().head(1).drop(columns=["churn"], errors="ignore")
+    record = sample.astype(object).where(sample.notna(), None).to_dict("records")
+    pipeline = PredictPipeline(fast_preprocessor=True, fast_model=True)
+    pipeline.predict_proba(record)
+    print("single-row prediction + log record:",
+          benchmark_logging(2_000, lambda: pipeline.predict_proba(record)))
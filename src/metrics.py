@@ -0,0 +1,166 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# upper bounds in seconds, Prometheus-style; the +Inf bucket is implicit
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram: constant memory however many samples it sees."""
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds):
+        index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum += seconds
+            self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Estimate from the buckets, interpolating linearly inside the one that holds q."""
+        with self._lock:
+            counts, count, largest = list(self.counts), self.count, self.max
+        if not count:
+            return None
+        rank = q * count
+        seen = 0
+        lower = 0.0
+        for i, n in enumerate(counts):
+            upper = self.buckets[i] if i < len(self.buckets) else largest
+            if n and seen + n >= rank:
+                return min(lower + (upper - lower) * (rank - seen) / n, largest)
+            seen += n
+            lower = upper
+        return largest
+
+    def snapshot(self):
+        with self._lock:
+            count, total, largest = self.count, self.sum, self.max
+        return {
+            'count': count,
+            'mean_ms': round(total / count * 1000, 3) if count else None,
+            'p50_ms': _ms(self.quantile(0.5)),
+            'p95_ms': _ms(self.quantile(0.95)),
+            'p99_ms': _ms(self.quantile(0.99)),
+            'max_ms': round(largest * 1000, 3) if count else None,
+        }
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def _labels(*pairs):
+    """Prometheus label set from (name, value) pairs, skipping None names; '' when empty."""
+    text = ",".join(f'{name}="{value}"' for name, value in pairs if name is not None)
+    return f"{{{text}}}" if text else ""
+
+
+class MetricsRegistry:
+    '''
+    Per-process set of latency histograms keyed by (metric name, label).
+    Rendered in the Prometheus text format by render_prometheus(); under
+    several workers each scrape sees the worker that answered it, so every
+    series carries that worker's pid label and Prometheus keeps one series
+    per worker instead of one that jumps between them. Aggregate with
+    sum without (pid) (...).
+    '''
+    def __init__(self):
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name, label_name, label_value):
+        key = (name, label_name, label_value)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(key, LatencyHistogram())
+        return histogram
+
+    def observe(self, name, label_name, label_value, seconds):
+        self.histogram(name, label_name, label_value).observe(seconds)
+
+    @contextmanager
+    def timer(self, name, label_name, label_value):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, label_name, label_value, time.perf_counter() - started)
+
+    def snapshot(self, name):
+        """{label value: histogram summary} for one metric name."""
+        return {label: h.snapshot() for (metric, _, label), h in list(self._histograms.items())
+                if metric == name}
+
+    def render_prometheus(self):
+        lines = []
+        pid = os.getpid()
+        for name in sorted({key[0] for key in self._histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (metric, label_name, label_value), h in sorted(self._histograms.items()):
+                if metric != name:
+                    continue
+                with h._lock:
+                    counts, count, total = list(h.counts), h.count, h.sum
+                cumulative = 0
+                for bound, n in zip(list(h.buckets) + ["+Inf"], counts):
+                    cumulative += n
+                    lines.append(f'{name}_bucket{_labels(("pid", pid), (label_name, label_value), ("le", bound))} '
+                                 f'{cumulative}')
+                labels = _labels(("pid", pid), (label_name, label_value))
+                lines.append(f'{name}_sum{labels} {total}')
+                lines.append(f'{name}_count{labels} {count}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+STAGE_LATENCY = "churn_stage_latency_seconds"
+REQUEST_LATENCY = "churn_request_latency_seconds"
+
+
+def stage_timer(stage):
+    """Time a hot-path stage (request parsing, preprocessing, model predict, ...)."""
+    return metrics.timer(STAGE_LATENCY, "stage", stage)
+
+
+def _format_samples(name, kind, samples, label_name, help_text, per_process):
+    lines = [f"# HELP {name} {help_text}"] if help_text else []
+    lines.append(f"# TYPE {name} {kind}")
+    pid = ("pid", os.getpid()) if per_process else (None, None)
+    if label_name is None:
+        lines.append(f"{name}{_labels(pid)} {float(samples)}")
+    else:
+        lines.extend(f'{name}{_labels(pid, (label_name, label))} {float(value)}' for label, value in samples.items())
+    return "\n".join(lines) + "\n"
+
+
+def format_gauges(name, samples, label_name=None, help_text=None, per_process=True):
+    '''
+    Prometheus lines for a gauge: samples is {label value: number}, or a
+    single number when label_name is None. per_process adds this worker's
+    pid label (see MetricsRegistry); turn it off for values every worker
+    reads from the same file.
+    '''
+    return _format_samples(name, "gauge", samples, label_name, help_text, per_process)
+
+
+def format_counters(name, samples, label_name=None, help_text=None, per_process=True):
+    '''
+    Prometheus lines for a counter, named name + "_total"; samples as in
+    format_gauges. For values that only grow until the process restarts,
+    so rate() and increase() work on them; the pid label keeps one
+    worker's count from being read as a reset of another's.
+    '''
+    return _format_samples(f"{name}_total", "counter", samples, label_name, help_text, per_process)
@@ -0,0 +1,151 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from dataclasses import dataclass
+
+from src.exception import CustomException
+from src.logger import logging
+
+
+@dataclass
+class ArtifactCacheConfig:
+    cache_dir: str = os.path.join('artifacts', 'cache')
+    # cached entries kept per stage; older ones are deleted after a miss
+    max_entries_per_stage: int = 3
+
+
+def fingerprint(*parts):
+    '''
+    Stable sha256 of JSON-able parts (stage names, upstream keys, file
+    digests, config dicts). Objects JSON cannot encode fall back to repr().
+    '''
+    payload = json.dumps(parts, sort_keys=True, default=repr)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _same_file(a, b):
+    try:
+        sa, sb = os.stat(a), os.stat(b)
+    except OSError:
+        return False
+    if os.path.isdir(a) or os.path.isdir(b):
+        if not (os.path.isdir(a) and os.path.isdir(b)) or sorted(os.listdir(a)) != sorted(os.listdir(b)):
+            return False
+        return all(_same_file(os.path.join(a, name), os.path.join(b, name)) for name in os.listdir(a))
+    return sa.st_size == sb.st_size and sa.st_mtime_ns == sb.st_mtime_ns
+
+
+def _copy(src, dst):
+    """copy2 for files, copytree (replacing dst) for directories."""
+    if os.path.isdir(src):
+        shutil.rmtree(dst, ignore_errors=True)
+        shutil.copytree(src, dst)
+    else:
+        shutil.copy2(src, dst)
+
+
+class ArtifactCache:
+    '''
+    Content-addressed store for training stage outputs.
+
+    A stage is identified by a key built with fingerprint() from its inputs
+    and config; downstream stages include the upstream key in theirs, so a
+    change anywhere invalidates exactly the stages after it. On a miss the
+    stage runs and its output files are copied to cache_dir/<stage>/<key>/
+    together with its JSON result. On a hit the files are copied back to
+    their published paths (skipped when already identical) and the stored
+    result is returned without running the stage.
+    '''
+    def __init__(self, config=None, force=False):
+        self.config = config or ArtifactCacheConfig()
+        self.force = force
+        self.report = []
+
+    def _entry_dir(self, stage, key):
+        return os.path.join(self.config.cache_dir, stage, key)
+
+    def _restore(self, entry_dir, outputs):
+        for path in outputs:
+            cached = os.path.join(entry_dir, os.path.basename(path))
+            if not _same_file(cached, path):
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                _copy(cached, path)
+
+    def store(self, stage, key, outputs, result):
+        """Cache a freshly built stage's output files and result."""
+        entry_dir = self._entry_dir(stage, key)
+        tmp_dir = f"{entry_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        for path in outputs:
+            _copy(path, os.path.join(tmp_dir, os.path.basename(path)))
+        with open(os.path.join(tmp_dir, "result.json"), "w") as file_obj:
+            json.dump({"stage": stage, "key": key, "outputs": list(outputs), "result": result},
+                      file_obj, default=repr)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        os.replace(tmp_dir, entry_dir)
+        self._prune(stage)
+
+    def _prune(self, stage):
+        stage_dir = os.path.join(self.config.cache_dir, stage)
+        entries = sorted(
+            (os.path.join(stage_dir, name) for name in os.listdir(stage_dir) if ".tmp-" not in name),
+            key=os.path.getmtime, reverse=True,
+        )
+        for old in entries[self.config.max_entries_per_stage:]:
+            shutil.rmtree(old, ignore_errors=True)
+
+    def lookup(self, stage, key):
+        """Stored manifest of a cached stage, or None on a miss."""
+        manifest_path = os.path.join(self._entry_dir(stage, key), "result.json")
+        if self.force or not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path) as file_obj:
+            return json.load(file_obj)
+
+    def restore(self, stage, key):
+        '''
+        On a hit, copy the cached outputs back to their published paths and
+        return (True, result); on a miss return (False, None).
+        '''
+        cached = self.lookup(stage, key)
+        if cached is None:
+            return False, None
+        self._restore(self._entry_dir(stage, key), cached["outputs"])
+        return True, cached["result"]
+
+    def record(self, stage, key, hit, seconds, **extra):
+        """Add one row to the run report."""
+        self.report.append({"stage": stage, "key": key[:12], "cache_hit": hit,
+                            "seconds": round(seconds, 3), **extra})
+        logging.info(f"Stage {stage} [{key[:12]}] {'cache hit' if hit else 'built'} in {seconds:.2f}s")
+
+    def run(self, stage, key, build, outputs=()):
+        '''
+        Run build() unless (stage, key) is cached.
+
+        outputs are the file paths build() writes; build() may return a
+        JSON-able result. Returns that result, from the cache on a hit.
+        '''
+        try:
+            started = time.perf_counter()
+            hit, result = self.restore(stage, key)
+            if not hit:
+                result = build()
+                self.store(stage, key, outputs, result)
+            self.record(stage, key, hit, time.perf_counter() - started)
+            return result
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def format_report(self):
+        width = max([12] + [len(row["stage"]) + 2 for row in self.report])
+        lines = [f"{'stage':<{width}}{'key':<14}{'status':<10}seconds"]
+        for row in self.report:
+            status = "hit" if row["cache_hit"] else "built"
+            lines.append(f"{row['stage']:<{width}}{row['key']:<14}{status:<10}{row['seconds']}")
+        return "\n".join(lines)
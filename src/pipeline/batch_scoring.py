@@ -0,0 +1,116 @@
+import io
+import itertools
+import json
+import sys
+from dataclasses import dataclass
+
+import pandas as pd
+
+from src.exception import CustomException, root_cause
+from src.logger import logging
+
+
+@dataclass
+class BatchScoringConfig:
+    # rows scored per transform + predict call; bounds memory per upload
+    chunk_size: int = 5000
+    # hard cap on records accepted in one JSON /api/predict body
+    max_json_records: int = 10000
+
+
+OUTPUT_COLUMNS = ["customer_id", "probability", "label"]
+# last line of a streamed response that failed after the 200 status was sent
+ERROR_MARKER = "# error: "
+
+
+def records_frame(records):
+    """One row per record, even for records with no keys (from_records drops those)."""
+    return pd.DataFrame(records, index=range(len(records)))
+
+
+def iter_csv_chunks(stream, chunk_size):
+    """Yield DataFrames of at most chunk_size rows from a binary CSV stream."""
+    reader = pd.read_csv(stream, chunksize=chunk_size)
+    for chunk in reader:
+        yield chunk
+
+
+def iter_ndjson_chunks(stream, chunk_size):
+    """Yield DataFrames of at most chunk_size rows from a binary NDJSON stream."""
+    records = []
+    for line in iter(stream.readline, b""):
+        line = line.strip()
+        if not line:
+            continue
+        records.append(json.loads(line))
+        if len(records) >= chunk_size:
+            yield records_frame(records)
+            records = []
+    if records:
+        yield records_frame(records)
+
+
+def iter_record_chunks(records, chunk_size):
+    """Yield DataFrames of at most chunk_size rows from a list of dicts."""
+    for start in range(0, len(records), chunk_size):
+        yield records_frame(records[start:start + chunk_size])
+
+
+def score_chunks(pipeline, chunks):
+    '''
+    Run every chunk through PredictPipeline.predict_proba.
+
+    Yields one small result frame per chunk (customer_id, probability, label)
+    plus the model version that produced it, so at most one chunk of input
+    and output is alive at a time.
+    '''
+    offset = 0
+    for chunk in chunks:
+        if "customer_id" in chunk.columns:
+            customer_ids = chunk["customer_id"].to_numpy()
+        else:
+            # no id column: fall back to the row number within the upload
+            customer_ids = range(offset, offset + len(chunk))
+        offset += len(chunk)
+
+        probability, labels, version = pipeline.predict_proba(chunk)
+        result = pd.DataFrame({
+            "customer_id": customer_ids,
+            "probability": probability.round(6),
+            "label": labels.astype(int),
+        })
+        yield result, version
+
+
+def stream_scored_csv(pipeline, chunks):
+    '''
+    Score the first chunk now and return a generator of the CSV text:
+    header, that chunk, then the rest one piece per chunk.
+
+    An unreadable upload or bad values in the first chunk raise here,
+    before the caller has committed a response. Once streaming has started
+    the status is already sent, so a later failure ends the body with an
+    ERROR_MARKER line instead of a silently truncated file.
+    '''
+    scored = score_chunks(pipeline, chunks)
+    try:
+        first = next(scored, None)
+    except Exception as e:
+        raise CustomException(e, sys)
+
+    def body():
+        yield ",".join(OUTPUT_COLUMNS) + "\n"
+        n_rows = 0
+        try:
+            for result, _ in itertools.chain([first] if first else [], scored):
+                buffer = io.StringIO()
+                result.to_csv(buffer, header=False, index=False)
+                n_rows += len(result)
+                yield buffer.getvalue()
+        except Exception as e:
+            logging.exception(f"Batch scoring failed after {n_rows} rows")
+            yield ERROR_MARKER + " ".join(str(root_cause(e)).split()) + "\n"
+            return
+        logging.info(f"Streamed batch scores for {n_rows} rows")
+
+    return body()
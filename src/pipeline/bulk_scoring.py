@@ -0,0 +1,220 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logging
+from src.components.dataset_store import DatasetStore, DatasetStoreConfig
+from src.pipeline.model_registry import ModelRegistry, ModelRegistryConfig, artifact_version
+from src.pipeline.predict_pipeline import PredictPipeline
+from src.utils import load_columnar, save_columnar
+
+
+@dataclass
+class BulkScoringConfig:
+    risk_table_path: str = os.path.join('artifacts', 'risk_scores')
+    chunk_size: int = 5000
+    n_workers: int = max(1, (os.cpu_count() or 1))
+    registry_config: ModelRegistryConfig = field(default_factory=ModelRegistryConfig)
+    dataset_config: DatasetStoreConfig = field(default_factory=DatasetStoreConfig)
+
+
+# same cut-offs the customer templates use for their risk badges (>= 60%, >= 30%)
+RISK_TIERS = ("Low", "Medium", "High")
+RISK_TIER_THRESHOLDS = (0.3, 0.6)
+
+
+def risk_tier(probability):
+    """Map churn probabilities to Low / Medium / High tier labels (categorical)."""
+    codes = np.searchsorted(RISK_TIER_THRESHOLDS, np.asarray(probability), side="right")
+    return pd.Categorical.from_codes(codes, categories=list(RISK_TIERS))
+
+
+def row_hashes(df):
+    """Stable per-row hash of every feature column, used to detect changed customers."""
+    return pd.util.hash_pandas_object(df.drop(columns=["churn"], errors="ignore"), index=False).to_numpy()
+
+
+# ---- worker side: one resident pipeline per process ----
+_worker_pipeline = None
+
+
+def _init_worker(registry_config):
+    global _worker_pipeline
+    _worker_pipeline = PredictPipeline(ModelRegistry(registry_config), fast_preprocessor=True)
+
+
+def _score_chunk(chunk):
+    probability, _, version = _worker_pipeline.predict_proba(chunk)
+    return probability.astype(np.float32), version
+
+
+class BulkScoringJob:
+    '''
+    Scores the whole customer dataset offline and writes the risk-score table
+    (customer_id, probability, tier, model_version, row_hash) that the web
+    pages read instead of scoring per request.
+
+    Chunks are scored across a process pool, each worker holding its own
+    model. In incremental mode only customers whose feature hash changed,
+    who are new, or who were scored by another model version are rescored.
+    '''
+    def __init__(self, config=None):
+        self.config = config or BulkScoringConfig()
+
+    def _load_previous(self):
+        if not os.path.exists(self.config.risk_table_path):
+            return None
+        table, _ = load_columnar(self.config.risk_table_path, mmap=False)
+        table = table.set_index("customer_id")
+        # duplicated ids cannot be matched reliably: rescore everything
+        return table if table.index.is_unique else None
+
+    def _iter_chunks(self):
+        df, _ = DatasetStore(self.config.dataset_config).load()
+        for start in range(0, len(df), self.config.chunk_size):
+            yield df.iloc[start:start + self.config.chunk_size]
+
+    @staticmethod
+    def _summarize(table, top_n=20):
+        """Per-tier counts, revenue at risk and the top at-risk customers for the pages."""
+        expected_loss = table["monthly_fee"].to_numpy(np.float64) * table["probability"].to_numpy(np.float64)
+        top = table.nlargest(top_n, "probability")
+        return {
+            "tier_counts": {tier: int(n) for tier, n in table["tier"].value_counts().items()},
+            "revenue_at_risk": float(expected_loss.sum()),
+            "top_at_risk": [
+                {"customer_id": row.customer_id, "risk_score": round(float(row.probability) * 100, 1),
+                 "monthly_fee": float(row.monthly_fee), "tenure_months": int(row.tenure_months)}
+                for row in top.itertuples()
+            ],
+        }
+
+    def run(self, incremental=True):
+        try:
+            started = time.perf_counter()
+            version, _ = artifact_version(self.config.registry_config)
+            previous = self._load_previous() if incremental else None
+            logging.info(f"Bulk scoring with model {version}, incremental={previous is not None}")
+
+            parts = []
+            pending = []  # (part index, row positions, rows to score)
+            for chunk in self._iter_chunks():
+                chunk = chunk.reset_index(drop=True)
+                part = pd.DataFrame({
+                    "customer_id": chunk["customer_id"].astype(str).to_numpy(),
+                    "probability": np.full(len(chunk), np.nan, dtype=np.float32),
+                    "model_version": np.full(len(chunk), version, dtype=object),
+                    "row_hash": row_hashes(chunk),
+                    # only used for the summary below, not stored in the table
+                    "monthly_fee": chunk["monthly_fee"].to_numpy(np.float32),
+                    "tenure_months": chunk["tenure_months"].to_numpy(),
+                })
+
+                stale = np.ones(len(chunk), dtype=bool)
+                if previous is not None:
+                    found = previous.index.get_indexer(part["customer_id"])
+                    known = np.flatnonzero(found >= 0)
+                    old = previous.iloc[found[known]]
+                    fresh = (
+                        (old["row_hash"].to_numpy() == part["row_hash"].to_numpy()[known])
+                        & (old["model_version"].astype(object).to_numpy() == version)
+                    )
+                    stale[known[fresh]] = False
+                    part.loc[known[fresh], "probability"] = old["probability"].to_numpy()[fresh]
+
+                if stale.any():
+                    positions = np.flatnonzero(stale)
+                    pending.append((len(parts), positions, chunk.iloc[positions]))
+                parts.append(part)
+
+            n_scored = sum(len(positions) for _, positions, _ in pending)
+            if pending:
+                n_workers = min(self.config.n_workers, len(pending))
+                with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                         initargs=(self.config.registry_config,)) as pool:
+                    results = pool.map(_score_chunk, [rows for _, _, rows in pending])
+                    for (index, positions, _), (probability, used_version) in zip(pending, results):
+                        parts[index].loc[positions, "probability"] = probability
+                        parts[index].loc[positions, "model_version"] = used_version
+
+            table = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(
+                columns=["customer_id", "probability", "model_version", "row_hash"])
+            table["tier"] = risk_tier(table["probability"].to_numpy())
+            table["model_version"] = table["model_version"].astype("category")
+            summary = self._summarize(table)
+            table = table[["customer_id", "probability", "tier", "model_version", "row_hash"]]
+
+            save_columnar(self.config.risk_table_path, table, metadata={
+                "model_version": version,
+                "scored_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "n_rescored": int(n_scored),
+                **summary,
+            })
+            elapsed = time.perf_counter() - started
+            logging.info(f"Risk table written: {len(table)} rows, {n_scored} rescored in {elapsed:.1f}s")
+            return {"rows": int(len(table)), "rescored": int(n_scored), "model_version": version,
+                    "seconds": round(elapsed, 2)}
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+_risk_table_cache = {}
+
+
+def _cached_risk_table(path):
+    path = path or BulkScoringConfig.risk_table_path
+    manifest_path = os.path.join(path, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return None
+    mtime = os.stat(manifest_path).st_mtime_ns
+    cached = _risk_table_cache.get(path)
+    if cached is None or cached[0] != mtime:
+        table, metadata = load_columnar(path)
+        cached = (mtime, table, metadata, pd.Index(table["customer_id"]))
+        _risk_table_cache[path] = cached
+    return cached
+
+
+def load_risk_table(path=None):
+    '''
+    Return (risk table, metadata), re-reading only when the table on disk
+    was rewritten. Returns (None, {}) if the bulk job has not run yet.
+    '''
+    cached = _cached_risk_table(path)
+    if cached is None:
+        return None, {}
+    return cached[1], cached[2]
+
+
+def risk_scores_for(customer_ids, path=None):
+    """Churn probabilities for the given ids (NaN if unscored), or None without a table."""
+    cached = _cached_risk_table(path)
+    if cached is None:
+        return None
+    _, table, _, index = cached
+    found = index.get_indexer(pd.Index(customer_ids).astype(str))
+    probability = table["probability"].to_numpy(np.float64)
+    return np.where(found >= 0, probability[found], np.nan)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score the full customer dataset into the risk-score table")
+    parser.add_argument("--full", action="store_true", help="rescore every row instead of only changed ones")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size")
+    parser.add_argument("--chunk-size", type=int, default=None, help="rows per scoring task")
+    args = parser.parse_args()
+
+    config = BulkScoringConfig()
+    if args.workers:
+        config.n_workers = args.workers
+    if args.chunk_size:
+        config.chunk_size = args.chunk_size
+    print(BulkScoringJob(config).run(incremental=not args.full))
@@ -0,0 +1,290 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logging
+
+# frames up to this many rows are unpacked with a single to_numpy() call
+SMALL_FRAME_ROWS = 256
+
+
+class CompiledPreprocessor:
+    '''
+    Flat NumPy version of the fitted ColumnTransformer from
+    DataTransformation.get_data_transformer_object.
+
+    Numeric block:     (fillna(median) - mean) / scale
+    Categorical block: one-hot via per-column dict lookups, already divided
+                       by the unit-variance scale of each output column.
+
+    The output columns are laid out exactly like preprocessor.transform.
+    '''
+    def __init__(self, feature_names_in, numerical_columns, num_fill, num_mean, num_scale,
+                 categorical_columns, cat_fill, cat_lookups, cat_values):
+        self.feature_names_in_ = np.asarray(feature_names_in, dtype=object)
+        self.numerical_columns = list(numerical_columns)
+        self.num_fill = np.asarray(num_fill, dtype=np.float64)
+        self.num_mean = np.asarray(num_mean, dtype=np.float64)
+        self.num_scale = np.asarray(num_scale, dtype=np.float64)
+
+        self.categorical_columns = list(categorical_columns)
+        self.cat_fill = list(cat_fill)
+        # one dict per categorical column: category -> absolute output column
+        self.cat_lookups = list(cat_lookups)
+        # value written in that output column (1 / scale of the one-hot column)
+        self.cat_values = np.asarray(cat_values, dtype=np.float64)
+
+        self.n_numerical = len(self.numerical_columns)
+        self.n_features_out = self.n_numerical + len(self.cat_values)
+
+        # original feature behind every output column, e.g. for contributions
+        self.output_sources = list(self.numerical_columns)
+        for col, lookup in zip(self.categorical_columns, self.cat_lookups):
+            self.output_sources.extend([col] * len(lookup))
+
+    def _numeric_block(self, values):
+        values = np.array(values, dtype=np.float64).reshape(-1, self.n_numerical)
+        missing = np.isnan(values)
+        if missing.any():
+            values[missing] = np.broadcast_to(self.num_fill, values.shape)[missing]
+        values -= self.num_mean
+        values /= self.num_scale
+        return values
+
+    def _fill_categorical(self, out, column_values):
+        n_rows = out.shape[0]
+        for j, values in enumerate(column_values):
+            lookup = self.cat_lookups[j]
+            fill = self.cat_fill[j]
+            idx = np.fromiter(
+                (lookup.get(fill if _is_missing(v) else v, -1) for v in values),
+                dtype=np.intp, count=n_rows,
+            )
+            known = idx >= 0
+            # unknown categories stay all-zero (handle_unknown="ignore")
+            out[np.flatnonzero(known), idx[known]] = self.cat_values[idx[known] - self.n_numerical]
+
+    def transform_records(self, records):
+        """Transform a list of dicts (or a single dict) without building a DataFrame."""
+        try:
+            if isinstance(records, dict):
+                records = [records]
+            nan = float("nan")
+            out = np.zeros((len(records), self.n_features_out), dtype=np.float64)
+            rows = [[_as_float(r.get(c, nan)) for c in self.numerical_columns] for r in records]
+            try:
+                out[:, :self.n_numerical] = self._numeric_block(rows)
+            except (TypeError, ValueError):
+                # rerun column by column so the error names the offending one
+                for i, col in enumerate(self.numerical_columns):
+                    _to_float(np.array([row[i] for row in rows], dtype=object), col)
+                raise
+            self._fill_categorical(
+                out, [[r.get(c) for r in records] for c in self.categorical_columns]
+            )
+            return out
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def transform(self, X):
+        """Transform a DataFrame (or a dict of column arrays); missing columns are imputed."""
+        try:
+            if isinstance(X, (list, dict)) and not _is_column_dict(X):
+                return self.transform_records(X)
+
+            # counted up front: a frame without columns still has its rows
+            n_rows = len(X) if isinstance(X, pd.DataFrame) else len(next(iter(X.values()), []))
+            if isinstance(X, pd.DataFrame) and n_rows <= SMALL_FRAME_ROWS:
+                # one to_numpy() call is far cheaper than 30 Series lookups
+                X = dict(zip(X.columns, X.to_numpy().T))
+            missing = np.full(n_rows, np.nan)
+            out = np.zeros((n_rows, self.n_features_out), dtype=np.float64)
+
+            numeric = np.empty((n_rows, self.n_numerical), dtype=np.float64)
+            for i, col in enumerate(self.numerical_columns):
+                if col not in X:
+                    numeric[:, i] = missing
+                    continue
+                values = np.asarray(X[col])
+                numeric[:, i] = _to_float(values, col)
+            out[:, :self.n_numerical] = self._numeric_block(numeric)
+
+            self._fill_categorical(
+                out, [X[col] if col in X else [None] * n_rows for col in self.categorical_columns]
+            )
+            return out
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+class FeatureValueError(ValueError):
+    """A feature value that cannot be used, e.g. text in a numeric column; .column names the feature."""
+    def __init__(self, column, message):
+        super().__init__(message)
+        self.column = column
+
+
+def _is_missing(value):
+    return value is None or (isinstance(value, float) and value != value)
+
+
+def _to_float(values, column):
+    '''
+    A numeric column as float64: None, NaN and "" are missing (imputed
+    later), anything else that is not a number raises ValueError naming the
+    column, as preprocessor.transform would.
+    '''
+    if values.dtype.kind in "biuf":
+        return values
+    try:
+        return values.astype(np.float64)
+    except (TypeError, ValueError):
+        pass
+    out = np.full(len(values), np.nan)
+    for i, value in enumerate(values):
+        if _is_missing(value) or value is pd.NA or value == "":
+            continue
+        try:
+            out[i] = float(value)
+        except (TypeError, ValueError):
+            raise FeatureValueError(column, f"column {column!r}: cannot convert {value!r} to a number") from None
+    return out
+
+
+def _as_float(value):
+    return np.nan if value is None or value == "" else value
+
+
+def _is_column_dict(X):
+    return isinstance(X, dict) and bool(X) and all(
+        isinstance(v, (list, tuple, np.ndarray, pd.Series)) for v in X.values()
+    )
+
+
+def _steps(pipeline):
+    return [step for _, step in pipeline.steps] if hasattr(pipeline, "steps") else [pipeline]
+
+
+def compile_preprocessor(preprocessor):
+    '''
+    Read the fitted statistics out of the ColumnTransformer into flat arrays.
+
+    Supports the layout DataTransformation builds: a numeric
+    [SimpleImputer, StandardScaler] branch followed by a categorical
+    [SimpleImputer, OneHotEncoder, StandardScaler(with_mean=False)] branch.
+    Anything else raises, so callers can fall back to preprocessor.transform.
+    '''
+    # only needed when compiling from the pickle, which has loaded sklearn already
+    from sklearn.impute import SimpleImputer
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    try:
+        numerical_columns, num_fill, num_mean, num_scale = [], [], [], []
+        categorical_columns, cat_fill, cat_lookups, cat_values = [], [], [], []
+        n_numeric_out = None
+
+        for name, pipeline, columns in preprocessor.transformers_:
+            if pipeline == "drop" or name == "remainder":
+                continue
+            steps = _steps(pipeline)
+            encoders = [s for s in steps if isinstance(s, OneHotEncoder)]
+
+            if not encoders:
+                if categorical_columns:
+                    raise ValueError("numeric branch after the categorical branch is not supported")
+                imputer, scaler = _unpack(steps, (SimpleImputer, StandardScaler))
+                numerical_columns.extend(columns)
+                num_fill.extend(_imputer_fill(imputer, len(columns)))
+                num_mean.extend(_scaler_mean(scaler, len(columns)))
+                num_scale.extend(_scaler_scale(scaler, len(columns)))
+                continue
+
+            imputer, encoder, scaler = _unpack(steps, (SimpleImputer, OneHotEncoder, StandardScaler))
+            if encoder.drop is not None or getattr(encoder, "_infrequent_enabled", False):
+                raise ValueError("OneHotEncoder with drop/infrequent categories is not supported")
+            if scaler is not None and scaler.with_mean:
+                raise ValueError("centered scaling of one-hot columns is not supported")
+
+            if n_numeric_out is None:
+                n_numeric_out = len(numerical_columns)
+            n_out = sum(len(c) for c in encoder.categories_)
+            scale = _scaler_scale(scaler, n_out)
+            base = n_numeric_out + len(cat_values)
+            fill = _imputer_fill(imputer, len(columns))
+
+            offset = 0
+            for col, categories, fill_value in zip(columns, encoder.categories_, fill):
+                categorical_columns.append(col)
+                cat_fill.append(fill_value)
+                cat_lookups.append({cat: base + offset + k for k, cat in enumerate(categories)})
+                offset += len(categories)
+            cat_values.extend(1.0 / np.asarray(scale, dtype=np.float64))
+
+        compiled = CompiledPreprocessor(
+            feature_names_in=preprocessor.feature_names_in_,
+            numerical_columns=numerical_columns,
+            num_fill=num_fill,
+            num_mean=num_mean,
+            num_scale=num_scale,
+            categorical_columns=categorical_columns,
+            cat_fill=cat_fill,
+            cat_lookups=cat_lookups,
+            cat_values=cat_values,
+        )
+        logging.info(f"Compiled preprocessor: {compiled.n_features_out} output columns")
+        return compiled
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def _unpack(steps, kinds):
+    if len(steps) > len(kinds) or any(not isinstance(s, kinds) for s in steps):
+        raise ValueError(f"unsupported pipeline steps: {steps}")
+    found = []
+    for kind in kinds:
+        matches = [s for s in steps if isinstance(s, kind)]
+        found.append(matches[0] if matches else None)
+    # keep the original order requirement: steps must appear in `kinds` order
+    if [s for s in found if s is not None] != steps:
+        raise ValueError(f"unsupported pipeline step order: {steps}")
+    return found
+
+
+def _imputer_fill(imputer, n_columns):
+    if imputer is None:
+        return [np.nan] * n_columns
+    return list(imputer.statistics_)
+
+
+def _scaler_mean(scaler, n_columns):
+    if scaler is None or not scaler.with_mean:
+        return np.zeros(n_columns)
+    return scaler.mean_
+
+
+def _scaler_scale(scaler, n_columns):
+    if scaler is None or scaler.scale_ is None:
+        return np.ones(n_columns)
+    return scaler.scale_
+
+
+def max_abs_difference(preprocessor, compiled, features):
+    """Largest absolute difference between preprocessor.transform and the compiled transform."""
+    expected = preprocessor.transform(features.reindex(columns=list(preprocessor.feature_names_in_)))
+    if hasattr(expected, "toarray"):
+        expected = expected.toarray()
+    return float(np.max(np.abs(np.asarray(expected, dtype=np.float64) - compiled.transform(features))))
+
+
+if __name__ == "__main__":
+    from src.utils import load_object
+
+    preprocessor = load_object("artifacts/preprocessor.pkl")
+    compiled = compile_preprocessor(preprocessor)
+    test_df = pd.read_csv("artifacts/test.csv").drop(columns=["churn"])
+    print("max |sklearn - compiled| on test.csv:", max_abs_difference(preprocessor, compiled, test_df))
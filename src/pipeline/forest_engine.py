@@ -0,0 +1,281 @@
+import sys
+import time
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+
+
+# PredictPipeline uses the engine for batches of fewer than this many rows and
+# sklearn from here on. The level-by-level NumPy walk costs about as much per
+# row as sklearn's compiled one but skips its fixed per-call overhead, so it
+# only wins on small batches: 256 rows was break-even to slightly slower
+# (33 ms vs 25 ms in one run), and it was ~4x slower at 10k rows (1104 ms vs
+# 260 ms). Re-measure with `python -m src.pipeline.forest_engine` after
+# changing the model's size; the benchmark prints the batch size where the
+# engine stops being faster.
+FOREST_ENGINE_MAX_ROWS = 256
+
+
+class ForestEngine:
+    '''
+    All trees of a fitted forest flattened into contiguous node arrays.
+
+    feature / threshold / left / right / value are indexed by a global node id;
+    roots[t] is the root of tree t and leaves point left and right at
+    themselves. A batch is pushed down every tree one level at a time with
+    plain fancy indexing, dropping (tree, row) pairs once they reach a leaf;
+    there is no per-tree Python loop.
+
+    float32=True stores thresholds and leaf values in float32. Thresholds are
+    rounded down, so X32 <= threshold32 gives the same split as sklearn's
+    X32 <= threshold64 and leaf routing stays exact.
+
+    Meant for small batches only (fewer than FOREST_ENGINE_MAX_ROWS rows);
+    on large ones sklearn's compiled tree walk is several times faster. Only
+    sklearn forests can be exported (see export_forest): when the search
+    picks XGBoost or CatBoost, serving runs without the engine.
+    '''
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth,
+                 classes, n_features_in, float32=False):
+        dtype = np.float32 if float32 else np.float64
+        self.float32 = float32
+        self.feature = np.ascontiguousarray(feature, dtype=np.int32)
+        self.threshold = _round_down(threshold, dtype)
+        self.left = np.ascontiguousarray(left, dtype=np.int32)
+        self.right = np.ascontiguousarray(right, dtype=np.int32)
+        self.value = np.ascontiguousarray(value, dtype=dtype)
+        self.roots = np.ascontiguousarray(roots, dtype=np.int32)
+        self.max_depth = int(max_depth)
+        self.classes_ = np.asarray(classes)
+        self.n_features_in_ = int(n_features_in)
+        self.is_leaf = self.left == np.arange(len(self.left))
+        # children[2 * node + go_left]: right child at even, left child at odd slots
+        self.children = np.stack([self.right, self.left], axis=1).ravel()
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def n_nodes(self):
+        return len(self.feature)
+
+    def as_float32(self):
+        """Return a float32 copy of this engine."""
+        return ForestEngine(self.feature, self.threshold, self.left, self.right, self.value,
+                            self.roots, self.max_depth, self.classes_, self.n_features_in_,
+                            float32=True)
+
+    def apply(self, X):
+        """Leaf node id reached by every row in every tree, shape (n_trees, n_rows)."""
+        X = self._check_input(X)
+        n_rows = X.shape[0]
+        flat_X = X.ravel()
+
+        # one entry per (tree, row) pair still on an internal node; every tree
+        # advances one level per iteration and finished pairs are dropped
+        nodes = np.repeat(self.roots, n_rows)
+        position = np.arange(nodes.size, dtype=np.int32)
+        row_offset = np.tile(np.arange(n_rows, dtype=np.int32) * X.shape[1], self.n_trees)
+        leaves = nodes.copy()
+
+        while nodes.size:
+            go_left = flat_X[row_offset + self.feature[nodes]] <= self.threshold[nodes]
+            nodes = self.children[2 * nodes + go_left]
+            done = self.is_leaf[nodes]
+            if done.any():
+                leaves[position[done]] = nodes[done]
+                keep = ~done
+                nodes, position, row_offset = nodes[keep], position[keep], row_offset[keep]
+        return leaves.reshape(self.n_trees, n_rows)
+
+    def predict_proba(self, X, batch_size=2048):
+        """Average of the per-tree leaf class distributions, like RandomForestClassifier.predict_proba."""
+        try:
+            if hasattr(X, "toarray"):
+                X = X.toarray()
+            X = np.asarray(X)
+            out = np.empty((X.shape[0], self.value.shape[1]), dtype=self.value.dtype)
+            # bounded working set: (n_trees, batch_size) node ids per step
+            for start in range(0, X.shape[0], batch_size):
+                leaves = self.apply(X[start:start + batch_size])
+                out[start:start + batch_size] = self.value[leaves].mean(axis=0)
+            return out
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def predict(self, X):
+        return self.classes_.take(self.predict_proba(X).argmax(axis=1))
+
+    def contributions(self, X, class_index=1):
+        '''
+        Per-feature contributions to predict_proba[:, class_index], read off
+        the tree paths: every split adds value[child] - value[parent] to the
+        feature it splits on, averaged over trees.
+
+        Returns (bias, contributions) with bias + contributions.sum(axis=1)
+        equal to the predicted probability of each row.
+        '''
+        try:
+            X = self._check_input(X)
+            n_rows = X.shape[0]
+            flat_X = X.ravel()
+            node_value = self.value[:, class_index].astype(np.float64)
+
+            contributions = np.zeros(n_rows * self.n_features_in_)
+            nodes = np.repeat(self.roots, n_rows)
+            rows = np.tile(np.arange(n_rows, dtype=np.int32), self.n_trees)
+            bias = np.full(n_rows, node_value[self.roots].mean())
+
+            active = ~self.is_leaf[nodes]
+            nodes, rows = nodes[active], rows[active]
+            while nodes.size:
+                feature = self.feature[nodes]
+                go_left = flat_X[rows * X.shape[1] + feature] <= self.threshold[nodes]
+                children = self.children[2 * nodes + go_left]
+                np.add.at(contributions, rows * self.n_features_in_ + feature,
+                          node_value[children] - node_value[nodes])
+                keep = ~self.is_leaf[children]
+                nodes, rows = children[keep], rows[keep]
+
+            return bias, contributions.reshape(n_rows, self.n_features_in_) / self.n_trees
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _check_input(self, X):
+        X = np.asarray(X)
+        if X.ndim != 2 or X.shape[1] != self.n_features_in_:
+            raise ValueError(f"expected {self.n_features_in_} features, got shape {X.shape}")
+        # sklearn trees compare float32 inputs, so do the same before splitting
+        X = X.astype(np.float32, copy=False)
+        return np.ascontiguousarray(X)
+
+
+def _round_down(threshold, dtype):
+    threshold = np.asarray(threshold, dtype=np.float64)
+    cast = threshold.astype(dtype)
+    if dtype is np.float32:
+        over = cast.astype(np.float64) > threshold
+        cast[over] = np.nextafter(cast[over], np.float32(-np.inf))
+    return np.ascontiguousarray(cast)
+
+
+def export_forest(model, float32=False):
+    '''
+    Flatten a fitted RandomForestClassifier / ExtraTreesClassifier.
+
+    Raises ValueError for anything that is not a single-output forest of
+    sklearn decision trees, so callers can fall back to model.predict_proba.
+    '''
+    try:
+        estimators = getattr(model, "estimators_", None)
+        if not estimators or not all(hasattr(est, "tree_") for est in estimators):
+            raise ValueError(f"{type(model).__name__} is not a forest of decision trees")
+        if getattr(model, "n_outputs_", 1) != 1:
+            raise ValueError("multi-output forests are not supported")
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        max_depth = 0
+        n_classes = len(model.classes_)
+
+        for est in estimators:
+            tree = est.tree_
+            n_nodes = tree.node_count
+            is_leaf = tree.children_left == -1
+            node_ids = np.arange(offset, offset + n_nodes)
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold))
+            lefts.append(np.where(is_leaf, node_ids, tree.children_left + offset))
+            rights.append(np.where(is_leaf, node_ids, tree.children_right + offset))
+
+            value = tree.value[:, 0, :].astype(np.float64)
+            if value.shape[1] != n_classes:
+                # bootstrap sample missed a class: map tree classes onto the forest's
+                mapped = np.zeros((n_nodes, n_classes))
+                mapped[:, est.classes_.astype(int)] = value
+                value = mapped
+            values.append(value / value.sum(axis=1, keepdims=True))
+
+            roots.append(offset)
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        engine = ForestEngine(
+            feature=np.concatenate(features),
+            threshold=np.concatenate(thresholds),
+            left=np.concatenate(lefts),
+            right=np.concatenate(rights),
+            value=np.concatenate(values),
+            roots=np.asarray(roots),
+            max_depth=max_depth,
+            classes=model.classes_,
+            n_features_in=model.n_features_in_,
+            float32=float32,
+        )
+        logging.info(f"Exported forest: {engine.n_trees} trees, {engine.n_nodes} nodes, depth {max_depth}")
+        return engine
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def benchmark_against_sklearn(model, X, batch_sizes=(1, 16, 64, 256, 1024, 4096, 10000), repeats=5):
+    '''
+    Time sklearn predict_proba against the exported engine (float64 and float32).
+
+    Rows of X are tiled up to the largest batch size. Returns (rows,
+    crossover): one dict per batch size with best-of-`repeats` milliseconds
+    and the max abs probability difference from sklearn, and per engine the
+    smallest batch size at which it is no faster than sklearn (None if it
+    won at every size), to check FOREST_ENGINE_MAX_ROWS against.
+    '''
+    engines = {"engine_f64": export_forest(model), "engine_f32": export_forest(model, float32=True)}
+    X = np.asarray(X.toarray() if hasattr(X, "toarray") else X)
+    X = np.resize(X, (max(batch_sizes), X.shape[1]))
+
+    def best_of(fn, batch):
+        best = float("inf")
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = fn(batch)
+            best = min(best, time.perf_counter() - start)
+        return best * 1000, result
+
+    results = []
+    for size in batch_sizes:
+        batch = X[:size]
+        row = {"batch_size": size}
+        row["sklearn_ms"], expected = best_of(model.predict_proba, batch)
+        for name, engine in engines.items():
+            row[f"{name}_ms"], proba = best_of(engine.predict_proba, batch)
+            row[f"{name}_max_diff"] = float(np.abs(proba - expected).max())
+        results.append(row)
+
+    crossover = {name: next((row["batch_size"] for row in results
+                             if row[f"{name}_ms"] >= row["sklearn_ms"]), None)
+                 for name in engines}
+    logging.info(f"Forest engine stops beating sklearn at batch sizes {crossover} "
+                 f"(FOREST_ENGINE_MAX_ROWS={FOREST_ENGINE_MAX_ROWS})")
+    return results, crossover
+
+
+if __name__ == "__main__":
+    import pandas as pd
+    from src.utils import load_object
+
+    model = load_object("artifacts/model.pkl")
+    preprocessor = load_object("artifacts/preprocessor.pkl")
+    X_test = preprocessor.transform(pd.read_csv("artifacts/test.csv").drop(columns=["churn"]))
+
+    rows, crossover = benchmark_against_sklearn(model, X_test)
+    for row in rows:
+        print(row)
+    for name, size in crossover.items():
+        print(f"{name}: " + (f"no faster than sklearn from {size} rows" if size else "faster at every batch size")
+              + f" (FOREST_ENGINE_MAX_ROWS={FOREST_ENGINE_MAX_ROWS})")
@@ -0,0 +1,145 @@
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+from src.exception import CustomException
+from src.logger import logging
+
+
+@dataclass
+class MicroBatcherConfig:
+    # how long the first queued row waits for company before the batch runs
+    window_ms: float = 2.0
+    max_batch_size: int = 64
+    # how long a caller waits for its own result before giving up
+    result_timeout: float = 10.0
+
+
+# upper bounds of the batch-size histogram buckets (last bucket is open-ended)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class BatcherMetrics:
+    """Constant-memory counters for tuning the batching window."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.batches = 0
+        self.errors = 0
+        self.max_queue_depth = 0
+        self.last_queue_depth = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.batch_size_counts = [0] * (len(BATCH_SIZE_BUCKETS) + 1)
+
+    def record_batch(self, size, queue_depth, waits_ms, failed=False):
+        bucket = next((i for i, bound in enumerate(BATCH_SIZE_BUCKETS) if size <= bound),
+                      len(BATCH_SIZE_BUCKETS))
+        with self._lock:
+            self.requests += size
+            self.batches += 1
+            self.errors += int(failed)
+            self.last_queue_depth = queue_depth
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+            self.total_wait_ms += sum(waits_ms)
+            self.max_wait_ms = max(self.max_wait_ms, max(waits_ms))
+            self.batch_size_counts[bucket] += 1
+
+    def snapshot(self):
+        with self._lock:
+            labels = [f"<={bound}" for bound in BATCH_SIZE_BUCKETS] + [f">{BATCH_SIZE_BUCKETS[-1]}"]
+            return {
+                'requests': self.requests,
+                'batches': self.batches,
+                'errors': self.errors,
+                'avg_batch_size': self.requests / self.batches if self.batches else 0.0,
+                'last_queue_depth': self.last_queue_depth,
+                'max_queue_depth': self.max_queue_depth,
+                'avg_wait_ms': self.total_wait_ms / self.requests if self.requests else 0.0,
+                'max_wait_ms': self.max_wait_ms,
+                # list of [bucket, count] pairs so JSON output keeps bucket order
+                'batch_size_histogram': [list(pair) for pair in zip(labels, self.batch_size_counts)],
+            }
+
+
+class MicroBatcher:
+    '''
+    Coalesces concurrent single-row predictions into one batched call.
+
+    Request threads submit() a feature record and block on their own Future.
+    One background thread takes the first queued row, keeps collecting until
+    window_ms has passed or max_batch_size rows are queued, runs a single
+    PredictPipeline.predict_proba over the batch and hands every caller its
+    own (probability, label, model_version).
+    '''
+    def __init__(self, pipeline, config=None):
+        self.pipeline = pipeline
+        self.config = config or MicroBatcherConfig()
+        self.metrics = BatcherMetrics()
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self):
+        # started lazily so a preloading parent process never forks with a live thread
+        if self._thread is None or not self._thread.is_alive():
+            with self._start_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+                    self._thread.start()
+
+    def submit(self, record):
+        """Queue one feature record (dict); returns a Future of (probability, label, version)."""
+        future = Future()
+        # cache hits are answered right away instead of waiting out the batching window
+        cached = self.pipeline.cached_result(record) if getattr(self.pipeline, "cache", None) else None
+        if cached is not None:
+            future.set_result(cached)
+            return future
+        self._ensure_started()
+        self._queue.put((record, future, time.perf_counter()))
+        return future
+
+    def predict(self, record):
+        """Submit one record and wait for its result."""
+        try:
+            return self.submit(record).result(timeout=self.config.result_timeout)
+        except Exception as e:
+            raise CustomException(e, sys)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.config.window_ms / 1000.0
+        while len(batch) < self.config.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            queue_depth = self._queue.qsize()
+            records = [record for record, _, _ in batch]
+            started = time.perf_counter()
+            waits_ms = [(started - queued_at) * 1000.0 for _, _, queued_at in batch]
+
+            try:
+                probability, labels, version = self.pipeline.predict_proba(records)
+            except Exception as e:
+                logging.error(f"Micro-batch of {len(batch)} rows failed: {e}")
+                for _, future, _ in batch:
+                    future.set_exception(e)
+                self.metrics.record_batch(len(batch), queue_depth, waits_ms, failed=True)
+                continue
+
+            for i, (_, future, _) in enumerate(batch):
+                future.set_result((float(probability[i]), int(labels[i]), version))
+            self.metrics.record_batch(len(batch), queue_depth, waits_ms)
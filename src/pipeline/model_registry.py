@@ -0,0 +1,282 @@
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from src.exception import CustomException
+from src.logger import logging
+from src.pipeline.compiled_preprocessor import compile_preprocessor, max_abs_difference
+from src.pipeline.forest_engine import export_forest
+from src.utils import file_digest, load_artifact, load_object, read_artifact_manifest, save_artifact
+
+
+@dataclass
+class ModelRegistryConfig:
+    model_path: str = os.path.join('artifacts', 'model.pkl')
+    preprocessor_path: str = os.path.join('artifacts', 'preprocessor.pkl')
+    # seconds between two stat() checks of the artifacts on the hot path
+    check_interval: float = 1.0
+    # store the exported forest's thresholds/leaf values in float32
+    forest_float32: bool = False
+    # memory-mappable copy of the pickles above (see export_model_store)
+    store_path: str = os.path.join('artifacts', 'model_store')
+
+
+@dataclass(frozen=True)
+class ModelVersion:
+    """Immutable reference to one loaded model + preprocessor pair."""
+    version: str
+    model: object
+    preprocessor: object
+    loaded_at: float
+    # NumPy fast path for the preprocessor, None if it could not be compiled
+    compiled_preprocessor: object = None
+    # array-backed copy of the forest, None if the model is not a tree forest
+    forest_engine: object = None
+
+
+def artifact_version(config=None):
+    """
+    Version id of the artifacts currently on disk, without loading them.
+
+    Returns (version, digests); the registry uses the same id, so offline
+    jobs can stamp their output with the version serving will report.
+    """
+    config = config or ModelRegistryConfig()
+    digests = (
+        file_digest(config.model_path),
+        file_digest(config.preprocessor_path),
+    )
+    return hashlib.sha256("".join(digests).encode()).hexdigest()[:12], digests
+
+
+def schema_hash(preprocessor, model):
+    """Hash of the input columns and model width an artifact pair was built for."""
+    schema = {
+        "features_in": [str(c) for c in getattr(preprocessor, "feature_names_in_", [])],
+        "model_features_in": int(getattr(model, "n_features_in_", -1)),
+    }
+    return hashlib.sha256(json.dumps(schema).encode()).hexdigest()[:12]
+
+
+STORE_PARTS = ("model", "preprocessor", "compiled_preprocessor", "forest_engine")
+
+
+def export_model_store(config=None):
+    '''
+    Write the current pickles, plus the compiled preprocessor and forest
+    engine built from them, as memory-mappable artifacts under
+    config.store_path (see save_artifact).
+
+    The store's manifest records the pickles' digests; the registry only
+    uses it while they still match, so a stale store is simply ignored.
+    '''
+    try:
+        config = config or ModelRegistryConfig()
+        registry = ModelRegistry(config)
+        version, digests = artifact_version(config)
+        model = load_object(config.model_path)
+        preprocessor = load_object(config.preprocessor_path)
+        handle = registry._build(version, model, preprocessor)
+
+        tmp_path = f"{config.store_path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        schema = schema_hash(preprocessor, model)
+        parts = {}
+        for name in STORE_PARTS:
+            obj = getattr(handle, name)
+            if obj is not None:
+                save_artifact(os.path.join(tmp_path, name), obj, metadata={"schema_hash": schema})
+                parts[name] = name
+        with open(os.path.join(tmp_path, "manifest.json"), "w") as file_obj:
+            json.dump({"version": version, "digests": list(digests), "schema_hash": schema,
+                       "forest_float32": config.forest_float32, "parts": parts}, file_obj)
+
+        old_path = f"{config.store_path}.old-{os.getpid()}"
+        if os.path.exists(config.store_path):
+            os.replace(config.store_path, old_path)
+        os.replace(tmp_path, config.store_path)
+        shutil.rmtree(old_path, ignore_errors=True)
+        logging.info(f"Model store written for version {version}: {sorted(parts)}")
+        return version
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+class ModelRegistry:
+    '''
+    Process-wide holder of the serving artifacts.
+
+    Each artifact is loaded once, from the memory-mapped model store when it
+    matches the pickles (workers then share its pages and skip compiling and
+    exporting), else from the pickles. Callers get a ModelVersion and keep using
+    it for the whole request; when the files on disk change (mtime/size, then
+    content hash) a single thread loads the new pair and swaps the reference,
+    while every other thread keeps serving the version it already has.
+    '''
+    def __init__(self, config=None):
+        self.config = config or ModelRegistryConfig()
+        self._current = None
+        self._stats = None
+        self._digests = None
+        self._last_check = 0.0
+        self._reload_lock = threading.Lock()
+
+    def _stat(self):
+        stats = []
+        for path in (self.config.model_path, self.config.preprocessor_path):
+            st = os.stat(path)
+            stats.append((st.st_mtime_ns, st.st_size))
+        return tuple(stats)
+
+    def _load(self, stats):
+        version, digests = artifact_version(self.config)
+        if self._current is not None and digests == self._digests:
+            # touched but identical content: keep the resident objects
+            self._stats = stats
+            return
+
+        self._current = self._load_store(version, digests) or self._build(
+            version,
+            load_object(file_path=self.config.model_path),
+            load_object(file_path=self.config.preprocessor_path),
+        )
+        self._stats = stats
+        self._digests = digests
+        logging.info(f"Model registry loaded version {version}")
+
+    def _build(self, version, model, preprocessor):
+        return ModelVersion(
+            version=version,
+            model=model,
+            preprocessor=preprocessor,
+            loaded_at=time.time(),
+            compiled_preprocessor=self._compile(preprocessor),
+            forest_engine=self._export(model, preprocessor),
+        )
+
+    def _load_store(self, version, digests):
+        """ModelVersion from the model store, or None if it is missing, stale or unreadable."""
+        store_path = self.config.store_path
+        try:
+            with open(os.path.join(store_path, "manifest.json")) as file_obj:
+                manifest = json.load(file_obj)
+            if (manifest["digests"] != list(digests)
+                    or manifest.get("forest_float32") != self.config.forest_float32):
+                return None
+            parts = {}
+            for name, directory in manifest["parts"].items():
+                part_path = os.path.join(store_path, directory)
+                if read_artifact_manifest(part_path)["metadata"].get("schema_hash") != manifest["schema_hash"]:
+                    raise ValueError(f"schema hash mismatch in {part_path}")
+                parts[name] = load_artifact(part_path)
+            handle = ModelVersion(version=version, loaded_at=time.time(), **{
+                name: parts.get(name) for name in STORE_PARTS
+            })
+            logging.info(f"Model registry mapped version {version} from {store_path}")
+            return handle
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logging.warning(f"Ignoring model store at {store_path}: {e}")
+            return None
+
+    @staticmethod
+    def _compile(preprocessor):
+        try:
+            compiled = compile_preprocessor(preprocessor)
+            # probe with an all-missing row: exercises every imputer fill value
+            probe = pd.DataFrame([{col: np.nan for col in preprocessor.feature_names_in_}])
+            diff = max_abs_difference(preprocessor, compiled, probe)
+            if diff > 1e-9:
+                raise ValueError(f"compiled output differs from preprocessor.transform by {diff}")
+            return compiled
+        except Exception as e:
+            logging.warning(f"Serving without compiled preprocessor: {e}")
+            return None
+
+    def _export(self, model, preprocessor):
+        try:
+            engine = export_forest(model, float32=self.config.forest_float32)
+            probe = preprocessor.transform(
+                pd.DataFrame([{col: np.nan for col in preprocessor.feature_names_in_}])
+            )
+            diff = float(np.abs(engine.predict_proba(probe) - model.predict_proba(probe)).max())
+            if diff > 1e-6:
+                raise ValueError(f"forest engine differs from predict_proba by {diff}")
+            return engine
+        except Exception as e:
+            logging.warning(f"Serving without forest engine: {e}")
+            return None
+
+    def refresh(self, force=False):
+        '''
+        Reload the artifacts if they changed on disk.
+
+        Only one thread reloads at a time; the others return immediately and
+        keep the version they hold, unless nothing has been loaded yet.
+        '''
+        try:
+            blocking = self._current is None
+            if not self._reload_lock.acquire(blocking=blocking):
+                return self._current
+            try:
+                self._last_check = time.monotonic()
+                stats = self._stat()
+                if force or self._current is None or stats != self._stats:
+                    self._load(stats)
+            finally:
+                self._reload_lock.release()
+            return self._current
+
+        except Exception as e:
+            if self._current is not None:
+                # a half-written artifact must not take serving down
+                logging.error(f"Model registry reload failed, keeping {self._current.version}: {e}")
+                return self._current
+            raise CustomException(e, sys)
+
+    def get(self):
+        """Return the current ModelVersion, checking the artifacts at most every check_interval seconds."""
+        current = self._current
+        if current is None or time.monotonic() - self._last_check >= self.config.check_interval:
+            current = self.refresh()
+        return current
+
+    @property
+    def version(self):
+        return self._current.version if self._current is not None else None
+
+    @property
+    def fast_paths(self):
+        """Which of the compiled preprocessor and forest engine the loaded version has."""
+        current = self._current
+        return {name: current is not None and getattr(current, name) is not None
+                for name in ("compiled_preprocessor", "forest_engine")}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_registry():
+    """Return the process-wide ModelRegistry."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
+
+
+if __name__ == "__main__":
+    print(f"model store written for version {export_model_store()}")
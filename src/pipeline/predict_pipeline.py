@@ -1,41 +1,133 @@
 import sys
+import numpy as np
 import pandas as pd
 from src.exception import CustomException
-from src.utils import load_object   
+from src.logger import debug_sampled, logging
+from src.metrics import stage_timer
+from src.pipeline.forest_engine import FOREST_ENGINE_MAX_ROWS
+from src.pipeline.model_registry import get_registry
+from src.pipeline.prediction_cache import cached_predict_proba
 
 class PredictPipeline:
-    def __init__(self):
-        pass
+    def __init__(self, registry=None, fast_preprocessor=False, fast_model=False, cache=None):
+        self.registry = registry or get_registry()
+        # optional PredictionCache for record lists and small frames
+        self.cache = cache
+        # use the compiled NumPy preprocessor when the loaded version has one
+        self.fast_preprocessor = fast_preprocessor
+        # use the array-backed forest engine for small batches
+        self.fast_model = fast_model
+
+    @staticmethod
+    def align_features(features, preprocessor):
+        """
+        Reorder a frame to the columns the preprocessor was fitted on.
+
+        Done once for a whole frame; missing columns come back as NaN so the
+        fitted imputers fill them (median / most frequent).
+        """
+        expected_cols = list(preprocessor.feature_names_in_)
+        return features.reindex(columns=expected_cols)
+
+    def transform(self, features, handle):
+        """Align and preprocess a frame (or a list of dict records) with the given ModelVersion."""
+        if self.fast_preprocessor and handle.compiled_preprocessor is not None:
+            # the compiled path looks columns up by name and imputes missing ones
+            with stage_timer("preprocess"):
+                return handle.compiled_preprocessor.transform(features)
+        with stage_timer("align_features"):
+            if isinstance(features, list):
+                features = pd.DataFrame.from_records(features)
+            features = self.align_features(features, handle.preprocessor)
+        with stage_timer("preprocess"):
+            return handle.preprocessor.transform(features)
+
+    def model_proba(self, data_scaled, handle):
+        """Class probabilities from the forest engine (small batches) or the sklearn model."""
+        engine = handle.forest_engine
+        with stage_timer("model_predict"):
+            if self.fast_model and engine is not None and data_scaled.shape[0] < FOREST_ENGINE_MAX_ROWS:
+                return engine.predict_proba(data_scaled)
+            return handle.model.predict_proba(data_scaled)
 
     def predict(self, features):
         try:
-            model_path = "artifacts/model.pkl"
-            preprocessor_path = "artifacts/preprocessor.pkl"
+            # resident artifacts, reloaded by the registry only when they change
+            handle = self.registry.get()
+            model = handle.model
+            preprocessor = handle.preprocessor
+
+            if debug_sampled():
+                logging.debug("Predict columns", extra={
+                    "expected_columns": list(preprocessor.feature_names_in_),
+                    "received_columns": list(features.columns),
+                })
+
+            # 🔥 column alignment happens in transform (before preprocessing)
+            data_scaled = self.transform(features, handle)
+            if self.fast_model:
+                preds = model.classes_.take(self.model_proba(data_scaled, handle).argmax(axis=1))
+            else:
+                with stage_timer("model_predict"):
+                    preds = model.predict(data_scaled)
 
-            model = load_object(file_path=model_path)
-            preprocessor = load_object(file_path=preprocessor_path)
-
-            # 🔥 ADD EXACTLY HERE (before transform)
-            expected_cols = list(preprocessor.feature_names_in_)
-
-            for col in expected_cols:
-                if col not in features.columns:
-                    features[col] = 0
-
-            features = features[expected_cols]
+            return preds
 
-            # (temporary debug – remove later)
-            print("Expected columns:", expected_cols)
-            print("Received columns:", list(features.columns))
+        except Exception as e:
+            raise CustomException(e, sys)
 
-            data_scaled = preprocessor.transform(features)
-            preds = model.predict(data_scaled)
+    def predict_proba(self, features):
+        """
+        Score a whole frame (one chunk) in a single transform + predict call.
 
-            return preds
+        Returns (churn_probability, label, model_version); labels are taken
+        from the same probabilities, so they agree with predict().
+        """
+        try:
+            handle = self.registry.get()
+
+            if self.cache is not None:
+                records = features
+                if isinstance(features, pd.DataFrame):
+                    if len(features) > self.cache.config.max_rows:
+                        records = None
+                    elif len(features.columns):
+                        records = features.to_dict("records")
+                    else:
+                        # to_dict("records") returns [] for a frame without columns, whatever its length
+                        records = [{}] * len(features)
+                if records is not None:
+                    churn_proba, labels = cached_predict_proba(
+                        self.cache, records, handle, lambda misses: self._score(misses, handle)
+                    )
+                    return churn_proba, labels, handle.version
+
+            churn_proba, labels = self._score(features, handle)
+            return churn_proba, labels, handle.version
 
         except Exception as e:
             raise CustomException(e, sys)
 
+    def cached_result(self, record):
+        """(probability, label, model_version) for one record if the cache has it, else None."""
+        if self.cache is None:
+            return None
+        handle = self.registry.get()
+        key = self.cache.keys([record], handle)[0]
+        # a miss here is looked up (and counted) again when the batch runs
+        value = self.cache.get_many([key], count_miss=False).get(key)
+        return None if value is None else (float(value[0]), int(value[1]), handle.version)
+
+    def _score(self, features, handle):
+        model = handle.model
+        data_scaled = self.transform(features, handle)
+
+        proba = self.model_proba(data_scaled, handle)
+        classes = list(model.classes_)
+        labels = np.asarray(model.classes_).take(proba.argmax(axis=1))
+        churn_proba = proba[:, classes.index(1)] if 1 in classes else np.zeros(len(proba))
+        return churn_proba, labels
+
       
 class CustomData:
     def __init__(self,
@@ -106,42 +198,50 @@ class CustomData:
         self.marketing_click_rate = marketing_click_rate
         self.referral_count = referral_count
 
+    def get_data_as_dict(self):
+        """Flat record of all 30 features, for paths that skip the DataFrame."""
+        try:
+            return {
+                "gender": self.gender,
+                "country": self.country,
+                "city": self.city,
+                "customer_segment": self.customer_segment,
+                "signup_channel": self.signup_channel,
+                "contract_type": self.contract_type,
+                "payment_method": self.payment_method,
+                "complaint_type": self.complaint_type,
+                "survey_response": self.survey_response,
+                "discount_applied": self.discount_applied,
+                "price_increase_last_3m": self.price_increase_last_3m,
+
+                "age": self.age,
+                "tenure_months": self.tenure_months,
+                "monthly_logins": self.monthly_logins,
+                "weekly_active_days": self.weekly_active_days,
+                "avg_session_time": self.avg_session_time,
+                "features_used": self.features_used,
+                "usage_growth_rate": self.usage_growth_rate,
+                "last_login_days_ago": self.last_login_days_ago,
+                "monthly_fee": self.monthly_fee,
+                "total_revenue": self.total_revenue,
+                "payment_failures": self.payment_failures,
+                "support_tickets": self.support_tickets,
+                "avg_resolution_time": self.avg_resolution_time,
+                "csat_score": self.csat_score,
+                "escalations": self.escalations,
+                "email_open_rate": self.email_open_rate,
+                "marketing_click_rate": self.marketing_click_rate,
+                "nps_score": self.nps_score,
+                "referral_count": self.referral_count,
+            }
+        except Exception as e:
+            raise CustomException(e, sys)
+
     def get_data_as_data_frame(self):
         try:
-            custom_data_input_dict = {
-                "gender":[self.gender],
-                "country":[self.country],
-                "city":[self.city],
-                "customer_segment":[self.customer_segment],
-                "signup_channel":[self.signup_channel],
-                "contract_type":[self.contract_type],
-                "payment_method":[self.payment_method],
-                "complaint_type":[self.complaint_type],
-                "survey_response":[self.survey_response],
-                "discount_applied":[self.discount_applied],
-                "price_increase_last_3m":[self.price_increase_last_3m],
-
-                "age":[self.age],
-                "tenure_months":[self.tenure_months],
-                "monthly_logins":[self.monthly_logins],
-                "weekly_active_days":[self.weekly_active_days],
-                "avg_session_time":[self.avg_session_time],
-                "features_used":[self.features_used],
-                "usage_growth_rate":[self.usage_growth_rate],
-                "last_login_days_ago":[self.last_login_days_ago],
-                "monthly_fee":[self.monthly_fee],
-                "total_revenue":[self.total_revenue],
-                "payment_failures":[self.payment_failures],
-                "support_tickets":[self.support_tickets],
-                "avg_resolution_time":[self.avg_resolution_time],
-                "csat_score":[self.csat_score],
-                "escalations":[self.escalations],
-                "email_open_rate":[self.email_open_rate],
-                "marketing_click_rate":[self.marketing_click_rate],
-                "nps_score":[self.nps_score],
-                "referral_count":[self.referral_count],
-}
-            df = pd.DataFrame(custom_data_input_dict)
+            with stage_timer("build_features"):
+                custom_data_input_dict = {key: [value] for key, value in self.get_data_as_dict().items()}
+                df = pd.DataFrame(custom_data_input_dict)
             return df
         except Exception as e:
             raise CustomException(e, sys)
\ No newline at end of file
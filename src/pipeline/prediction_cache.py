@@ -0,0 +1,229 @@
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+from src.utils import LRUCache
+
+
+@dataclass
+class PredictionCacheConfig:
+    max_entries: int = int(os.environ.get('PREDICTION_CACHE_SIZE', 50_000))
+    ttl_seconds: float = float(os.environ.get('PREDICTION_CACHE_TTL', 3600))
+    # optional sqlite file shared by every worker on the host (None = per-process only)
+    shared_path: str = os.environ.get('PREDICTION_CACHE_PATH') or None
+    max_shared_entries: int = 1_000_000
+    # frames larger than this (bulk uploads) bypass the cache
+    max_rows: int = 1000
+
+
+def _canonical(value, numeric):
+    '''
+    One feature value as the preprocessor will see it. Missing values
+    (None, NaN, and "" in numeric columns) all impute the same way; numbers
+    compare as floats so 5, 5.0 and "5" share a key. Category strings are
+    kept verbatim: "Male" and "Male " are different one-hot columns.
+    '''
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if numeric:
+        if isinstance(value, str) and value == "":
+            return None
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return ("str", str(value))
+        return None if value != value else value + 0.0  # folds -0.0 into 0.0
+    return str(value)
+
+
+class SharedPredictionStore:
+    '''
+    sqlite table of cached predictions in WAL mode, so every worker process
+    on the host reads and writes the same entries. Connections are opened
+    lazily per thread (and therefore per forked process). Expired rows are
+    purged, and the table is trimmed to max_entries, every few hundred writes.
+    '''
+    PURGE_EVERY = 500
+
+    def __init__(self, path, ttl, max_entries):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS predictions ("
+                         "key TEXT PRIMARY KEY, probability REAL, label INTEGER, expires REAL)")
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        rows = self._connection().execute(
+            f"SELECT key, probability, label FROM predictions "
+            f"WHERE expires > ? AND key IN ({','.join('?' * len(keys))})",
+            (time.time(), *keys),
+        ).fetchall()
+        return {key: (probability, label) for key, probability, label in rows}
+
+    def put_many(self, items):
+        expires = time.time() + self.ttl
+        conn = self._connection()
+        conn.executemany("INSERT OR REPLACE INTO predictions VALUES (?, ?, ?, ?)",
+                         [(key, probability, label, expires) for key, (probability, label) in items])
+        self._writes += len(items)
+        if self._writes >= self.PURGE_EVERY:
+            self._writes = 0
+            conn.execute("DELETE FROM predictions WHERE expires <= ?", (time.time(),))
+            conn.execute("DELETE FROM predictions WHERE key IN (SELECT key FROM predictions "
+                         "ORDER BY expires DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+
+class PredictionCache:
+    '''
+    Cache of (churn probability, label) per canonical feature vector.
+
+    The key hashes the model version and the canonicalised values of the
+    features the preprocessor reads, in its column order, so extra fields
+    such as customer_id do not split entries and a model swap never serves
+    a stale score. A bounded LRU with TTL sits in front of an optional
+    sqlite store shared by all workers.
+    '''
+    def __init__(self, config=None):
+        self.config = config or PredictionCacheConfig()
+        self.local = LRUCache(self.config.max_entries, ttl=self.config.ttl_seconds)
+        self.shared = None
+        if self.config.shared_path:
+            self.shared = SharedPredictionStore(self.config.shared_path, self.config.ttl_seconds,
+                                                self.config.max_shared_entries)
+        self._layout = (None, None)  # (model version, [(column, numeric)])
+        self._lock = threading.Lock()
+        self.shared_hits = 0
+        self.shared_errors = 0
+
+    def _feature_layout(self, handle):
+        version, layout = self._layout
+        if version != handle.version:
+            # only the columns the transformers read: the remainder (customer_id) is dropped
+            compiled = handle.compiled_preprocessor
+            if compiled is not None:
+                layout = ([(col, True) for col in compiled.numerical_columns]
+                          + [(col, False) for col in compiled.categorical_columns])
+            else:
+                layout = [(col, name == "num_pipeline")
+                          for name, transformer, cols in handle.preprocessor.transformers_
+                          if name != "remainder" and transformer != "drop" for col in cols]
+            self._layout = (handle.version, layout)
+        return layout
+
+    def keys(self, records, handle):
+        """One cache key per record (dict) for the given ModelVersion."""
+        layout = self._feature_layout(handle)
+        prefix = handle.version.encode()
+        return [
+            hashlib.blake2b(prefix + repr(tuple(_canonical(r.get(col), numeric) for col, numeric in layout)).encode(),
+                            digest_size=16).hexdigest()
+            for r in records
+        ]
+
+    def get_many(self, keys, count_miss=True):
+        '''
+        {key: (probability, label)} for the keys found locally or in the
+        shared store. count_miss=False is for a peek that will be followed by
+        a counted lookup of the same keys.
+        '''
+        found = {}
+        missing = []
+        for key in keys:
+            value = self.local.get(key, count_miss=count_miss)
+            if value is None:
+                missing.append(key)
+            else:
+                found[key] = value
+        if missing and self.shared is not None:
+            try:
+                shared = self.shared.get_many(list(dict.fromkeys(missing)))
+            except sqlite3.Error as e:
+                self.shared_errors += 1
+                logging.warning(f"Shared prediction cache read failed: {e}")
+                shared = {}
+            for key, value in shared.items():
+                self.local.put(key, value)
+            found.update(shared)
+            with self._lock:
+                hits = sum(1 for key in missing if key in shared)
+                self.shared_hits += hits
+                if not count_miss:
+                    # shared hits are reported out of the counted local misses
+                    self.local.misses += hits
+        return found
+
+    def put_many(self, items):
+        for key, value in items:
+            self.local.put(key, value)
+        if self.shared is not None and items:
+            try:
+                self.shared.put_many(items)
+            except sqlite3.Error as e:
+                self.shared_errors += 1
+                logging.warning(f"Shared prediction cache write failed: {e}")
+
+    def clear(self):
+        self.local.clear()
+
+    def stats(self):
+        hits, misses = self.local.hits, self.local.misses
+        return {
+            'entries': len(self.local),
+            'max_entries': self.config.max_entries,
+            'ttl_seconds': self.config.ttl_seconds,
+            'local_hits': hits,
+            'shared_hits': self.shared_hits,
+            'misses': misses - self.shared_hits,
+            'hit_rate': (hits + self.shared_hits) / (hits + misses) if hits + misses else 0.0,
+            'shared_backend': self.config.shared_path,
+            'shared_errors': self.shared_errors,
+        }
+
+
+def cached_predict_proba(cache, records, handle, score):
+    '''
+    Serve what the cache has and score only the misses with score(records),
+    which must return (churn_probability, labels) arrays. Returns the same
+    pair for all records, in order.
+    '''
+    try:
+        keys = cache.keys(records, handle)
+        found = cache.get_many(keys)
+        miss = [i for i, key in enumerate(keys) if key not in found]
+
+        probability = np.empty(len(records), dtype=np.float64)
+        labels = np.empty(len(records), dtype=np.asarray(handle.model.classes_).dtype)
+        if miss:
+            miss_proba, miss_labels = score([records[i] for i in miss])
+            probability[miss] = miss_proba
+            labels[miss] = miss_labels
+            cache.put_many([(keys[i], (float(p), int(l))) for i, p, l in zip(miss, miss_proba, miss_labels)])
+        for i, key in enumerate(keys):
+            if key in found:
+                probability[i], labels[i] = found[key]
+        return probability, labels
+
+    except Exception as e:
+        raise CustomException(e, sys)
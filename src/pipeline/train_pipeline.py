@@ -0,0 +1,293 @@
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+
+
+from src.exception import CustomException
+from src.logger import logging
+from src.components.data_ingestion import DataIngestion
+from src.components.data_transformation import DataTransformation
+from src.components.dataset_store import DatasetStoreConfig
+from src.components.model_evaluation import ModelEvaluation, ModelEvaluationConfig, metrics_path
+from src.components.model_trainer import ModelTrainer, ModelTrainerConfig, candidate_models
+from src.pipeline.artifact_cache import ArtifactCache, fingerprint
+from src.pipeline.model_registry import ModelRegistryConfig, export_model_store
+from src.utils import file_digest, load_feature_matrix, load_object, save_feature_matrix, save_object
+
+
+@dataclass
+class TrainPipelineConfig:
+    train_matrix_path: str = os.path.join('artifacts', 'transformed', 'train')
+    test_matrix_path: str = os.path.join('artifacts', 'transformed', 'test')
+    candidates_dir: str = os.path.join('artifacts', 'candidates')
+    report_path: str = os.path.join('artifacts', 'pipeline_report.json')
+    n_workers: int = max(1, os.cpu_count() or 1)
+
+
+@dataclass
+class Stage:
+    '''
+    One node of the training DAG.
+
+    build produces the stage's output files and returns a JSON-able result.
+    Pool stages run build(*args) in a worker process, so it must be a
+    module-level function; main-process stages run build(stage, *args) and
+    can read their deps' results from stage.results.
+    '''
+    name: str
+    key: str
+    build: object
+    args: tuple = ()
+    deps: tuple = ()
+    outputs: tuple = ()
+    in_pool: bool = False
+    results: dict = field(default_factory=dict)
+
+
+def candidate_path(config, name):
+    return os.path.join(config.candidates_dir, name.lower().replace(" ", "_") + ".pkl")
+
+
+def _train_candidate(name, train_matrix_path, test_matrix_path, model_path, n_jobs=1):
+    '''
+    Pool stage: search one model family on the shared arrays.
+
+    The arrays are opened memory-mapped, so every worker reads the same
+    page-cached file instead of receiving a pickled copy.
+    '''
+    train_set = load_feature_matrix(train_matrix_path)
+    test_set = load_feature_matrix(test_matrix_path)
+    # the families run in parallel; n_jobs is this family's share of the cores
+    started = time.perf_counter()
+    report = ModelTrainer().search(train_set, test_set, names=[name], n_jobs=n_jobs)[name]
+    report["train_seconds"] = round(time.perf_counter() - started, 3)
+    save_object(model_path, report.pop("model"))
+    return report
+
+
+class DagRunner:
+    '''
+    Runs stages in dependency order. A stage starts once all its deps are
+    done; pool stages whose deps are met run concurrently on a process pool
+    while the main process keeps scheduling. Every stage goes through the
+    artifact cache first, and its wall time and start offset are recorded.
+    '''
+    def __init__(self, cache, n_workers):
+        self.cache = cache
+        self.n_workers = n_workers
+
+    def run(self, stages):
+        started = time.perf_counter()
+        pending = {stage.name: stage for stage in stages}
+        results = {}
+        running = {}
+
+        def finish(stage, result, hit, stage_started, where):
+            if not hit:
+                self.cache.store(stage.name, stage.key, stage.outputs, result)
+            results[stage.name] = result
+            self.cache.record(stage.name, stage.key, hit, time.perf_counter() - stage_started,
+                              started_at=round(stage_started - started, 3), where=where)
+
+        with ProcessPoolExecutor(max_workers=self.n_workers) as pool:
+            while pending or running:
+                ready = [stage for stage in pending.values() if all(dep in results for dep in stage.deps)]
+                for stage in ready:
+                    del pending[stage.name]
+                    stage_started = time.perf_counter()
+                    stage.results = {dep: results[dep] for dep in stage.deps}
+                    hit, result = self.cache.restore(stage.name, stage.key)
+                    if hit:
+                        finish(stage, result, True, stage_started, "cache")
+                    elif stage.in_pool:
+                        running[pool.submit(stage.build, *stage.args)] = (stage, stage_started)
+                    else:
+                        finish(stage, stage.build(stage, *stage.args), False, stage_started, "main")
+
+                if ready:
+                    # finished main-process stages may have unblocked others
+                    continue
+                if not running:
+                    raise RuntimeError(f"unsatisfiable dependencies: {sorted(pending)}")
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, stage_started = running.pop(future)
+                    finish(stage, future.result(), False, stage_started, "pool")
+
+        return results
+
+
+class TrainPipeline:
+    '''
+    Training as a DAG:
+
+        ingest -> split -> transform -> train:<model> (one per family) -> evaluate -> report
+
+    evaluate copies the winner to model.pkl and writes the memory-mappable
+    model store the web workers load from; report writes the winner's
+    versioned metrics artifact (see ModelEvaluation) that /insights reads.
+
+    The per-family searches only depend on the transformed arrays, so they
+    run concurrently. Stage keys chain like the artifact cache expects:
+    ingest hashes the source CSV, every later key hashes its upstream keys
+    plus its own config, so a grid change reruns only that family's search.
+    '''
+    def __init__(self, config=None, force=False, cache=None):
+        self.config = config or TrainPipelineConfig()
+        self.cache = cache or ArtifactCache(force=force)
+        self.ingestion = DataIngestion()
+        self.transformation = DataTransformation()
+        self.trainer_config = ModelTrainerConfig()
+        self.registry_config = ModelRegistryConfig()
+        self.evaluation_config = ModelEvaluationConfig(n_jobs=self.config.n_workers)
+
+    def _ingest(self, stage):
+        self.ingestion.ingest_raw_data()
+
+    def _split(self, stage):
+        return list(self.ingestion.split_train_test(self.ingestion.ingestion_config.raw_data_path))
+
+    def _transform(self, stage):
+        ingestion_config = self.ingestion.ingestion_config
+        (X_train, y_train), (X_test, y_test), _ = self.transformation.initiate_data_transformation(
+            ingestion_config.train_data_path, ingestion_config.test_data_path
+        )
+        save_feature_matrix(self.config.train_matrix_path, X_train, y_train)
+        save_feature_matrix(self.config.test_matrix_path, X_test, y_test)
+        return {"train_shape": list(X_train.shape), "test_shape": list(X_test.shape),
+                "memory": self.transformation.memory_report}
+
+    def _evaluate(self, stage):
+        reports = {dep.split(":", 1)[1]: report for dep, report in stage.results.items()}
+        best_name = ModelTrainer.select_best(reports)
+        shutil.copy2(candidate_path(self.config, best_name), self.trainer_config.trained_model_file_path)
+        logging.info(f"Best model: {best_name} {reports[best_name]['best_params']}")
+        return {
+            "best_model": best_name,
+            "model_version": export_model_store(self.registry_config),
+            "accuracy": reports[best_name]["test_metrics"]["accuracy"],
+            # measured when the candidate was actually trained, so a cache hit keeps the real figure
+            "training_seconds": reports[best_name].get("train_seconds"),
+            "models": {name: {"best_params": r["best_params"], "validation_score": r["validation_score"],
+                              "test_metrics": r["test_metrics"], "train_seconds": r.get("train_seconds")}
+                       for name, r in reports.items()},
+        }
+
+    def _report(self, stage):
+        evaluation = stage.results["evaluate"]
+        X_test, y_test = load_feature_matrix(self.config.test_matrix_path)
+        report = ModelEvaluation(self.evaluation_config).initiate_model_evaluation(
+            load_object(self.trainer_config.trained_model_file_path),
+            load_object(self.transformation.data_transformation_config.preprocessor_obj_file_path),
+            X_test, y_test,
+            model_version=evaluation["model_version"],
+            model_name=evaluation["best_model"],
+            training_seconds=evaluation.get("training_seconds"),
+            extra={"validation_score": evaluation["models"][evaluation["best_model"]]["validation_score"]},
+        )
+        return {"metrics_path": metrics_path(self.evaluation_config, evaluation["model_version"]),
+                "roc_auc": report["roc_auc"],
+                "importance_seconds": round(report["importance_seconds"], 3)}
+
+    def stages(self):
+        """The DAG for the current source data and configs."""
+        ingestion_config = self.ingestion.ingestion_config
+        preprocessor = self.transformation.get_data_transformer_object()
+
+        ingest_key = fingerprint("ingest", file_digest(DatasetStoreConfig().source_path))
+        split_key = fingerprint("split", ingest_key, asdict(ingestion_config))
+        transform_key = fingerprint("transform", split_key, preprocessor.get_params(deep=True))
+
+        stages = [
+            Stage("ingest", ingest_key, self._ingest, outputs=(ingestion_config.raw_data_path,)),
+            Stage("split", split_key, self._split, deps=("ingest",),
+                  outputs=(ingestion_config.train_data_path, ingestion_config.test_data_path)),
+            Stage("transform", transform_key, self._transform, deps=("split",), outputs=(
+                self.transformation.data_transformation_config.preprocessor_obj_file_path,
+                self.config.train_matrix_path,
+                self.config.test_matrix_path,
+            )),
+        ]
+
+        os.makedirs(self.config.candidates_dir, exist_ok=True)
+        models, params = candidate_models()
+        # every family gets an equal share of the workers for its own search
+        jobs_per_family = max(1, self.config.n_workers // len(models))
+        # search_n_jobs only sets how many workers run the search (this stage
+        # picks its own); search_time_budget stays in the key because a budget
+        # that stops the search early can change which candidate wins
+        trainer_params = {k: v for k, v in asdict(self.trainer_config).items() if k != "search_n_jobs"}
+        train_keys = []
+        for name, model in models.items():
+            key = fingerprint("train", transform_key, trainer_params, params.get(name),
+                              type(model).__name__, model.get_params())
+            model_path = candidate_path(self.config, name)
+            stages.append(Stage(
+                f"train:{name}", key, _train_candidate, deps=("transform",), in_pool=True,
+                args=(name, self.config.train_matrix_path, self.config.test_matrix_path, model_path,
+                      jobs_per_family),
+                outputs=(model_path,),
+            ))
+            train_keys.append(key)
+
+        stages.append(Stage(
+            "evaluate", fingerprint("evaluate", train_keys, asdict(self.registry_config)), self._evaluate,
+            deps=tuple(f"train:{name}" for name in models),
+            outputs=(self.trainer_config.trained_model_file_path, self.registry_config.store_path),
+        ))
+        # n_jobs only changes how fast the report is computed, not what it holds
+        evaluation_params = {k: v for k, v in asdict(self.evaluation_config).items() if k != "n_jobs"}
+        stages.append(Stage(
+            "report", fingerprint("report", stages[-1].key, evaluation_params), self._report,
+            deps=("evaluate",), outputs=(self.evaluation_config.metrics_dir,),
+        ))
+        return stages
+
+    def run(self):
+        """Run the DAG; returns {"accuracy", "best_model", "stages": timing/cache report}."""
+        try:
+            started = time.perf_counter()
+            results = DagRunner(self.cache, self.config.n_workers).run(self.stages())
+            evaluation = results["evaluate"]
+            report = {
+                "accuracy": evaluation["accuracy"],
+                "best_model": evaluation["best_model"],
+                "training_seconds": evaluation.get("training_seconds"),
+                "metrics_path": results["report"]["metrics_path"],
+                "models": evaluation["models"],
+                "total_seconds": round(time.perf_counter() - started, 3),
+                "stages": self.cache.report,
+            }
+            with open(self.config.report_path, "w") as file_obj:
+                json.dump(report, file_obj, indent=2)
+            return report
+
+        except Exception as e:
+            raise CustomException(e, sys)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the training DAG, reusing cached stages")
+    parser.add_argument("--force", action="store_true", help="ignore the artifact cache and rebuild every stage")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size for parallel stages")
+    args = parser.parse_args(argv)
+
+    config = TrainPipelineConfig()
+    if args.workers:
+        config.n_workers = args.workers
+    pipeline = TrainPipeline(config, force=args.force)
+    result = pipeline.run()
+    print(pipeline.cache.format_report())
+    print(f"best model: {result['best_model']}, accuracy: {result['accuracy']}, "
+          f"total {result['total_seconds']}s")
+    logging.info(f"Training pipeline finished: {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.exception import CustomException
+from src.logger import logging
+
+
+@dataclass
+class ServingConfig:
+    # rows taken from the dataset head for each worker's warm-up predictions
+    warmup_rows: int = 64
+    warmup_rounds: int = 3
+
+
+class ServingState:
+    """Per-process readiness, reported by /readyz."""
+    def __init__(self):
+        self.ready = False
+        self.preloaded = False
+        self.model_version = None
+        self.warmup_ms = None
+        self.warmed_at = None
+
+    def snapshot(self):
+        return {
+            'ready': self.ready,
+            'pid': os.getpid(),
+            'preloaded': self.preloaded,
+            'model_version': self.model_version,
+            'warmup_ms': self.warmup_ms,
+            'warmed_at': self.warmed_at,
+        }
+
+
+state = ServingState()
+
+
+def preload(registry):
+    '''
+    Load everything read-mostly before workers fork: model artifacts, the
+    dataset store, the customer index and list sort orders, the risk table
+    and its ranking, the dashboard summary and the cohort matrices.
+    gc.freeze() then moves all of it into the permanent generation, so
+    collections in the workers do not write to (and copy) the shared pages.
+    '''
+    try:
+        from src.analytics.cohorts import get_cohort_engine
+        from src.analytics.customer_360 import get_customer_index, get_customer_list_index
+        from src.analytics.dashboard import get_dashboard_aggregates
+        from src.analytics.retention import get_retention_engine
+        from src.components.dataset_store import load_dataset
+        from src.pipeline.bulk_scoring import load_risk_table
+
+        started = time.perf_counter()
+        registry.refresh()
+        df = load_dataset()
+        if len(df):
+            get_customer_index().offset(df["customer_id"].iat[0])
+        get_customer_list_index().query()
+        load_risk_table()
+        get_retention_engine().summary()
+        get_dashboard_aggregates().summary()
+        get_cohort_engine().view()
+
+        gc.collect()
+        gc.freeze()
+        state.preloaded = True
+        state.model_version = registry.version
+        logging.info(f"Preloaded serving state in {(time.perf_counter() - started) * 1000:.0f} ms "
+                     f"(model {registry.version})")
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def warm_up(pipeline, registry, batcher=None, config=None):
+    '''
+    Run a few real predictions in this worker before it takes traffic:
+    single rows and a full batch through the pipeline (fast paths and page
+    faults on the mapped arrays), plus one row through the micro-batcher so
+    its thread is running. Marks the worker ready when done.
+    '''
+    try:
+        from src.components.dataset_store import load_dataset
+
+        config = config or ServingConfig()
+        started = time.perf_counter()
+        sample = load_dataset().head(config.warmup_rows).drop(columns=["churn"], errors="ignore")
+        records = sample.astype(object).where(sample.notna(), None).to_dict("records")
+
+        for _ in range(config.warmup_rounds):
+            pipeline.predict_proba(records[:1])
+            pipeline.predict_proba(records)
+        if batcher is not None and records:
+            batcher.predict(records[0])
+
+        state.model_version = registry.version
+        state.warmup_ms = round((time.perf_counter() - started) * 1000, 1)
+        state.warmed_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        state.ready = True
+        logging.info(f"Worker {os.getpid()} warmed up in {state.warmup_ms} ms")
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def run_benchmark(url, n_requests=2000, concurrency=16, rows_per_request=1):
+    '''
+    Closed-loop throughput benchmark against a running server's
+    /api/predict: `concurrency` client threads send n_requests POSTs of
+    rows_per_request dataset rows each. Returns req/s and latency
+    percentiles in ms.
+    '''
+    from src.components.dataset_store import load_dataset
+
+    sample = load_dataset().head(rows_per_request).drop(columns=["churn"], errors="ignore")
+    records = sample.astype(object).where(sample.notna(), None).to_dict("records")
+    body = json.dumps(records, default=str).encode()
+    endpoint = url.rstrip("/") + "/api/predict"
+
+    def one(_):
+        request = urllib.request.Request(endpoint, data=body, headers={"Content-Type": "application/json"})
+        started = time.perf_counter()
+        with urllib.request.urlopen(request) as response:
+            response.read()
+        return (time.perf_counter() - started) * 1000
+
+    with urllib.request.urlopen(url.rstrip("/") + "/readyz") as response:
+        readiness = json.loads(response.read())
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = np.fromiter(pool.map(one, range(n_requests)), dtype=np.float64, count=n_requests)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "model_version": readiness.get("model_version"),
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "rows_per_request": rows_per_request,
+        "requests_per_second": round(n_requests / elapsed, 1),
+        "p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 2),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 2),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Throughput benchmark for a running prediction server")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rows", type=int, default=1, help="records per /api/predict request")
+    args = parser.parse_args()
+    print(run_benchmark(args.url, args.requests, args.concurrency, args.rows))
@@ -0,0 +1,133 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from dataclasses import dataclass
+
+from src.exception import CustomException
+
+
+@dataclass
+class StartupBudget:
+    # cold `import app` in a fresh interpreter
+    import_seconds: float = float(os.environ.get('STARTUP_IMPORT_BUDGET', 1.5))
+    # loading the model and scoring one row, after the import
+    first_prediction_seconds: float = float(os.environ.get('STARTUP_FIRST_PREDICTION_BUDGET', 5.0))
+    # training-only dependencies that importing the app must not pull in;
+    # unpickling the model imports the ones it needs later
+    lazy_modules: tuple = ("sklearn", "scipy", "dill", "xgboost", "catboost")
+
+
+# written to the importtime log between the import and the first prediction
+_PHASE_MARKER = "-- import app done --"
+
+# runs in a fresh interpreter so nothing is already imported or cached
+_PROBE = '''
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+sys.stderr.write(sys.argv[2] + "\\n")
+sys.stderr.flush()
+loaded = sorted({name.split(".")[0] for name in sys.modules} & set(sys.argv[1].split(",")))
+
+from src.components.dataset_store import load_dataset
+sample = load_dataset().head(1).drop(columns=["churn"], errors="ignore")
+record = sample.astype(object).where(sample.notna(), None).to_dict("records")
+predict_started = time.perf_counter()
+app.batcher.pipeline.predict_proba(record)
+predicted = time.perf_counter()
+print(json.dumps({
+    "import_seconds": imported - started,
+    "first_prediction_seconds": predicted - predict_started,
+    "lazy_modules_loaded_by_import": loaded,
+}))
+'''
+
+
+def _import_breakdown(importtime_log, top):
+    '''
+    Self time of every module in a -X importtime log, summed per top-level
+    package. Returns the `top` largest as [(package, ms)].
+    '''
+    totals = defaultdict(int)
+    for line in importtime_log.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, _, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if self_us.isdigit():
+            totals[name.split(".")[0]] += int(self_us)
+    ranked = sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [(package, round(us / 1000, 1)) for package, us in ranked]
+
+
+def profile_startup(budget=None, top=12):
+    '''
+    Cold-start profile of the serving process: `import app` wall time with
+    a per-package import-time breakdown, which lazy (training-only) modules
+    the import loaded, and the time to the first prediction, which includes
+    loading the model and the imports unpickling it triggers.
+    '''
+    try:
+        budget = budget or StartupBudget()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _PROBE, ",".join(budget.lazy_modules), _PHASE_MARKER],
+            capture_output=True, text=True, check=True,
+        )
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        result["import_seconds"] = round(result["import_seconds"], 3)
+        result["first_prediction_seconds"] = round(result["first_prediction_seconds"], 3)
+        import_log, _, prediction_log = completed.stderr.partition(_PHASE_MARKER)
+        result["import_breakdown_ms"] = _import_breakdown(import_log, top)
+        result["first_prediction_imports_ms"] = _import_breakdown(prediction_log, top)
+        return result
+
+    except subprocess.CalledProcessError as e:
+        raise CustomException(RuntimeError(e.stderr[-2000:]), sys)
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def check_budget(result, budget=None):
+    """Human-readable budget violations of a profile_startup() result (empty when within budget)."""
+    budget = budget or StartupBudget()
+    violations = []
+    if result["import_seconds"] > budget.import_seconds:
+        violations.append(f"import app took {result['import_seconds']}s (budget {budget.import_seconds}s)")
+    if result["first_prediction_seconds"] > budget.first_prediction_seconds:
+        violations.append(f"first prediction took {result['first_prediction_seconds']}s "
+                          f"(budget {budget.first_prediction_seconds}s)")
+    if result["lazy_modules_loaded_by_import"]:
+        violations.append("import app loaded training-only modules: "
+                          + ", ".join(result["lazy_modules_loaded_by_import"]))
+    return violations
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start profile of the serving app, checked against a budget")
+    parser.add_argument("--import-budget", type=float, default=None, help="seconds allowed for `import app`")
+    parser.add_argument("--first-prediction-budget", type=float, default=None,
+                        help="seconds allowed from the end of the import to the first prediction")
+    parser.add_argument("--top", type=int, default=12, help="packages to show in the import breakdown")
+    args = parser.parse_args()
+
+    budget = StartupBudget()
+    if args.import_budget is not None:
+        budget.import_seconds = args.import_budget
+    if args.first_prediction_budget is not None:
+        budget.first_prediction_seconds = args.first_prediction_budget
+
+    result = profile_startup(budget, args.top)
+    print(f"import app:        {result['import_seconds']}s (budget {budget.import_seconds}s)")
+    print(f"first prediction:  {result['first_prediction_seconds']}s (budget {budget.first_prediction_seconds}s)")
+    for title, key in (("import app", "import_breakdown_ms"), ("first prediction", "first_prediction_imports_ms")):
+        print(f"{title}: import self time by package (ms)")
+        for package, ms in result[key]:
+            print(f"  {package:<24}{ms:>9}")
+
+    violations = check_budget(result, budget)
+    for violation in violations:
+        print(f"FAIL: {violation}")
+    sys.exit(1 if violations else 0)
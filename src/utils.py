@@ -1,14 +1,23 @@
+import hashlib
+import json
+import math
 import os
+import shutil
 import sys
+import threading
+import time
+from collections import OrderedDict
 
 import numpy as np 
 import pandas as pd
-import dill
 import pickle
-from sklearn.metrics import r2_score
-from sklearn.model_selection import GridSearchCV
+from concurrent.futures import Future
+
+# sklearn is imported inside the training helpers below: serving imports this
+# module for the artifact loaders and must not pay for the training stack
 
 from src.exception import CustomException
+from src.logger import logging
 
 def save_object(file_path, obj):
     try:
@@ -22,41 +31,537 @@ def save_object(file_path, obj):
     except Exception as e:
         raise CustomException(e, sys)
     
-def evaluate_models(X_train, y_train,X_test,y_test,models,param):
-    try:
-        report = {}
+def classification_metrics(y_true, y_pred, y_proba=None):
+    """Accuracy, precision, recall, F1 (positive class = churn) and ROC-AUC when probabilities exist."""
+    from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score, roc_auc_score
+
+    metrics = {
+        "accuracy": float(accuracy_score(y_true, y_pred)),
+        "precision": float(precision_score(y_true, y_pred, zero_division=0)),
+        "recall": float(recall_score(y_true, y_pred, zero_division=0)),
+        "f1": float(f1_score(y_true, y_pred, zero_division=0)),
+    }
+    if y_proba is not None and len(np.unique(y_true)) > 1:
+        metrics["roc_auc"] = float(roc_auc_score(y_true, y_proba))
+    return metrics
+
+
+# data shared with every search worker once, instead of pickled into each task
+_search_data = None
+
+
+def _init_search_worker(X_fit, y_fit, X_val, y_val):
+    global _search_data
+    _search_data = (X_fit, y_fit, X_val, y_val)
+
+
+def _fit_candidate(model, params, n_samples, scoring):
+    from sklearn.base import clone
+
+    X_fit, y_fit, X_val, y_val = _search_data
+    model = clone(model).set_params(**params)
+
+    start = time.perf_counter()
+    model.fit(X_fit[:n_samples], y_fit[:n_samples])
+    fit_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    y_pred = model.predict(X_val)
+    y_proba = model.predict_proba(X_val)[:, 1] if hasattr(model, "predict_proba") else None
+    predict_time = time.perf_counter() - start
+
+    metrics = classification_metrics(y_val, y_pred, y_proba)
+    score = metrics.get(scoring, metrics["f1"])
+    # only the scores go back: the winner is refit on all of train anyway
+    return score, metrics, fit_time, predict_time
+
 
-        for i in range(len(list(models))):
-            model = list(models.values())[i]
-            para=param[list(models.keys())[i]]
+def _refit_candidate(model, params):
+    """Fit the chosen parameters on every training row: the fit split plus the validation split."""
+    import scipy.sparse
+    from sklearn.base import clone
 
-            gs = GridSearchCV(model,para,cv=3)
-            gs.fit(X_train,y_train)
+    X_fit, y_fit, X_val, y_val = _search_data
+    model = clone(model).set_params(**params)
+    # compact_features keeps sparse enough matrices as CSR
+    X = scipy.sparse.vstack([X_fit, X_val], format="csr") if scipy.sparse.issparse(X_fit) \
+        else np.concatenate([X_fit, X_val])
+    start = time.perf_counter()
+    model.fit(X, np.concatenate([y_fit, y_val]))
+    return model, time.perf_counter() - start
 
-            model.set_params(**gs.best_params_)
-            model.fit(X_train,y_train)
 
-            #model.fit(X_train, y_train)  # Train model
+class _InlineExecutor:
+    """Executor stand-in that runs tasks immediately, for single-worker searches."""
+    def __init__(self, initializer=None, initargs=()):
+        if initializer is not None:
+            initializer(*initargs)
 
-            y_train_pred = model.predict(X_train)
+    def __enter__(self):
+        return self
 
-            y_test_pred = model.predict(X_test)
+    def __exit__(self, *exc):
+        return False
 
-            train_model_score = r2_score(y_train, y_train_pred)
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
 
-            test_model_score = r2_score(y_test, y_test_pred)
 
-            report[list(models.keys())[i]] = test_model_score
+def evaluate_models(X_train, y_train, X_test, y_test, models, param,
+                    scoring="roc_auc", eta=3, time_budget=None, n_jobs=None,
+                    validation_size=0.2, random_state=42):
+    '''
+    Successive-halving search over every model's parameter grid.
 
+    A stratified validation split is held out of the training data. Each
+    rung fits the surviving candidates on a growing prefix of the shuffled
+    fit split across a process pool, then keeps the best 1/eta per model.
+    Every model's last rung uses the whole fit split; its winner is then
+    refit on the full training data (fit and validation rows).
+
+    When time_budget (seconds) runs out, the remaining intermediate rungs
+    are skipped and each model's current leader goes straight to the final
+    rung. Returns {model name: report}; each report holds the fitted
+    "model", "best_params", validation and test metrics, and per-candidate
+    fit/predict wall-time.
+    '''
+    from concurrent.futures import ProcessPoolExecutor
+    from sklearn.model_selection import ParameterGrid, train_test_split
+
+    try:
+        started = time.perf_counter()
+        X_fit, X_val, y_fit, y_val = train_test_split(
+            X_train, y_train, test_size=validation_size, stratify=y_train, random_state=random_state
+        )
+        n_fit = len(y_fit)
+
+        brackets = {}
+        for name, model in models.items():
+            candidates = [dict(p) for p in ParameterGrid(param.get(name, {}))] or [{}]
+            n_rungs = max(1, math.ceil(math.log(len(candidates), eta)) + 1) if len(candidates) > 1 else 1
+            brackets[name] = {"model": model, "alive": candidates, "n_rungs": n_rungs, "history": []}
+        max_rungs = max(b["n_rungs"] for b in brackets.values())
+
+        n_workers = n_jobs or os.cpu_count() or 1
+        initargs = (X_fit, y_fit, X_val, y_val)
+        # a single worker fits in this process, which also lets a pool worker run its own search
+        executor = _InlineExecutor(_init_search_worker, initargs) if n_workers == 1 else ProcessPoolExecutor(
+            max_workers=n_workers, initializer=_init_search_worker, initargs=initargs)
+        with executor as pool:
+            for rung in range(max_rungs):
+                final = rung == max_rungs - 1
+                over_budget = time_budget is not None and time.perf_counter() - started > time_budget
+                if over_budget and not final:
+                    logging.info(f"Search time budget of {time_budget}s used up, skipping to final rung")
+                    for bracket in brackets.values():
+                        bracket["alive"] = bracket["alive"][:1]
+                    rung, final = max_rungs - 1, True
+
+                futures = {}
+                for name, bracket in brackets.items():
+                    # brackets with fewer rungs start later so every model ends on the full fit split
+                    local_rung = rung - (max_rungs - bracket["n_rungs"])
+                    if local_rung < 0:
+                        continue
+                    n_samples = n_fit if final else max(
+                        min(n_fit, 2 * len(np.unique(y_fit))),
+                        int(n_fit / eta ** (bracket["n_rungs"] - 1 - local_rung)),
+                    )
+                    for params in bracket["alive"]:
+                        future = pool.submit(_fit_candidate, bracket["model"], params, n_samples, scoring)
+                        futures[future] = (name, params, n_samples)
+
+                results = {name: [] for name in brackets}
+                for future, (name, params, n_samples) in futures.items():
+                    score, metrics, fit_time, predict_time = future.result()
+                    results[name].append((score, params))
+                    brackets[name]["history"].append({
+                        "params": params, "n_samples": n_samples, "score": score,
+                        "fit_time": round(fit_time, 4), "predict_time": round(predict_time, 4),
+                        "validation_metrics": metrics,
+                    })
+
+                for name, scored in results.items():
+                    if not scored:
+                        continue
+                    scored.sort(key=lambda item: item[0], reverse=True)
+                    bracket = brackets[name]
+                    if final:
+                        bracket["best"] = scored[0]
+                    else:
+                        keep = max(1, len(scored) // eta)
+                        bracket["alive"] = [params for _, params in scored[:keep]]
+                if final:
+                    break
+
+            # the winners were chosen on the fit split; the served model sees all of train
+            refits = {name: pool.submit(_refit_candidate, bracket["model"], bracket["best"][1])
+                      for name, bracket in brackets.items()}
+            refits = {name: future.result() for name, future in refits.items()}
+
+        report = {}
+        for name, bracket in brackets.items():
+            score, params = bracket["best"]
+            fitted, refit_time = refits[name]
+            start = time.perf_counter()
+            y_test_pred = fitted.predict(X_test)
+            y_test_proba = fitted.predict_proba(X_test)[:, 1] if hasattr(fitted, "predict_proba") else None
+            test_predict_time = time.perf_counter() - start
+            report[name] = {
+                "model": fitted,
+                "best_params": params,
+                "validation_score": score,
+                "test_metrics": classification_metrics(y_test, y_test_pred, y_test_proba),
+                "test_predict_time": round(test_predict_time, 4),
+                "refit_time": round(refit_time, 4),
+                "candidates": bracket["history"],
+            }
+            logging.info(f"{name}: best {params}, validation {scoring}={score:.4f}, "
+                         f"test {report[name]['test_metrics']}")
+
+        logging.info(f"Model search finished in {time.perf_counter() - started:.1f}s")
         return report
 
     except Exception as e:
         raise CustomException(e, sys)
     
 def load_object(file_path):
+    '''
+    Load a plain pickle, or a directory written by save_artifact (whose
+    numeric buffers are memory-mapped instead of read).
+    '''
     try:
+        if os.path.isdir(file_path):
+            return load_artifact(file_path)
         with open(file_path, "rb") as file_obj:
             return pickle.load(file_obj)
 
     except Exception as e:
-        raise CustomException(e, sys)
\ No newline at end of file
+        raise CustomException(e, sys)
+
+
+ARTIFACT_MANIFEST = "manifest.json"
+ARTIFACT_FORMAT_VERSION = 1
+# buffer offsets in buffers.bin are aligned for any numpy dtype
+_BUFFER_ALIGNMENT = 64
+
+
+def save_artifact(dir_path, obj, metadata=None):
+    '''
+    Write obj as a memory-mappable artifact directory:
+
+        object.pkl    pickle protocol 5 stream with every large numpy array
+                      taken out of band
+        buffers.bin   those arrays' bytes, concatenated and 64-byte aligned
+        manifest.json format version, class, content version, buffer
+                      offsets and caller metadata (e.g. a schema hash)
+
+    load_artifact maps buffers.bin read-only, so processes loading the same
+    artifact share its pages through the OS cache. Objects that copy their
+    arrays on unpickling (sklearn's Cython trees) still load, just unshared.
+    '''
+    try:
+        buffers = []
+        payload = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+
+        tmp_path = f"{dir_path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        digest = hashlib.sha256(payload)
+        spans, offset = [], 0
+        with open(os.path.join(tmp_path, "buffers.bin"), "wb") as file_obj:
+            for buffer in buffers:
+                raw = buffer.raw()
+                padding = -offset % _BUFFER_ALIGNMENT
+                file_obj.write(b"\0" * padding)
+                offset += padding
+                file_obj.write(raw)
+                digest.update(raw)
+                spans.append([offset, raw.nbytes])
+                offset += raw.nbytes
+        with open(os.path.join(tmp_path, "object.pkl"), "wb") as file_obj:
+            file_obj.write(payload)
+
+        manifest = {
+            "format_version": ARTIFACT_FORMAT_VERSION,
+            "class": f"{type(obj).__module__}.{type(obj).__qualname__}",
+            "version": digest.hexdigest()[:12],
+            "buffers": spans,
+            "metadata": metadata or {},
+        }
+        with open(os.path.join(tmp_path, ARTIFACT_MANIFEST), "w") as file_obj:
+            json.dump(manifest, file_obj)
+
+        _replace_dir(tmp_path, dir_path)
+        return manifest
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def read_artifact_manifest(dir_path):
+    with open(os.path.join(dir_path, ARTIFACT_MANIFEST)) as file_obj:
+        return json.load(file_obj)
+
+
+def load_artifact(dir_path, mmap=True):
+    """Load an artifact written by save_artifact; arrays are read-only views of the mapped buffers."""
+    try:
+        manifest = read_artifact_manifest(dir_path)
+        if manifest.get("format_version") != ARTIFACT_FORMAT_VERSION:
+            raise ValueError(f"unsupported artifact format {manifest.get('format_version')} in {dir_path}")
+
+        buffers_path = os.path.join(dir_path, "buffers.bin")
+        if not manifest["buffers"]:
+            blob = b""
+        elif mmap:
+            blob = np.memmap(buffers_path, dtype=np.uint8, mode="r")
+        else:
+            blob = np.fromfile(buffers_path, dtype=np.uint8)
+        buffers = [blob[start:start + size] for start, size in manifest["buffers"]]
+
+        with open(os.path.join(dir_path, "object.pkl"), "rb") as file_obj:
+            return pickle.loads(file_obj.read(), buffers=buffers)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+def file_digest(file_path, chunk_size=1 << 20):
+    """Return the sha256 hex digest of a file, read in chunks."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+COLUMNAR_MANIFEST = "manifest.json"
+
+
+def save_columnar(dir_path, df, metadata=None):
+    '''
+    Write a DataFrame as a directory of one .npy file per column plus a
+    manifest.json, so it can be memory-mapped back without parsing.
+
+    Categorical columns are stored as their integer codes with the category
+    list in the manifest; string columns as fixed-width unicode arrays. The
+    directory is written next to the target and swapped in at the end, so
+    readers never see a half-written table.
+    '''
+    try:
+        parent = os.path.dirname(os.path.abspath(dir_path))
+        os.makedirs(parent, exist_ok=True)
+        tmp_path = f"{dir_path}.tmp-{os.getpid()}"
+        if os.path.exists(tmp_path):
+            shutil.rmtree(tmp_path)
+        os.makedirs(tmp_path)
+
+        columns = []
+        for i, col in enumerate(df.columns):
+            series = df[col]
+            spec = {"name": str(col), "file": f"c{i:03d}.npy"}
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                values = series.cat.codes.to_numpy()
+                spec["kind"] = "category"
+                spec["categories"] = [_to_builtin(c) for c in series.cat.categories]
+            elif series.dtype.kind in "biuf":
+                values = series.to_numpy()
+                spec["kind"] = "numeric"
+            else:
+                values = series.astype(str).to_numpy(dtype=str)
+                spec["kind"] = "string"
+            np.save(os.path.join(tmp_path, spec["file"]), values, allow_pickle=False)
+            columns.append(spec)
+
+        manifest = {"n_rows": int(len(df)), "columns": columns, "metadata": metadata or {}}
+        with open(os.path.join(tmp_path, COLUMNAR_MANIFEST), "w") as file_obj:
+            json.dump(manifest, file_obj)
+
+        _replace_dir(tmp_path, dir_path)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def _replace_dir(tmp_path, dir_path):
+    """Swap a fully written directory into place."""
+    old_path = f"{dir_path}.old-{os.getpid()}"
+    if os.path.exists(dir_path):
+        os.replace(dir_path, old_path)
+    os.replace(tmp_path, dir_path)
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def read_columnar_manifest(dir_path):
+    with open(os.path.join(dir_path, COLUMNAR_MANIFEST)) as file_obj:
+        return json.load(file_obj)
+
+
+def load_columnar(dir_path, columns=None, mmap=True):
+    '''
+    Load a table written by save_columnar.
+
+    Numeric columns and category codes are memory-mapped (mmap=True) rather
+    than read, so pages are shared between processes through the OS cache.
+    Returns (DataFrame, metadata).
+    '''
+    try:
+        manifest = read_columnar_manifest(dir_path)
+        mmap_mode = "r" if mmap else None
+        data = {}
+        for spec in manifest["columns"]:
+            if columns is not None and spec["name"] not in columns:
+                continue
+            values = np.load(os.path.join(dir_path, spec["file"]), mmap_mode=mmap_mode, allow_pickle=False)
+            if spec["kind"] == "category":
+                values = pd.Categorical.from_codes(values, categories=spec["categories"])
+            data[spec["name"]] = values
+        return pd.DataFrame(data, copy=False), manifest["metadata"]
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def matrix_nbytes(X):
+    """Bytes held by a dense array or a scipy sparse matrix."""
+    if hasattr(X, "indptr"):
+        return int(X.data.nbytes + X.indices.nbytes + X.indptr.nbytes)
+    return int(np.asarray(X).nbytes)
+
+
+def save_feature_matrix(dir_path, X, y=None):
+    '''
+    Persist transformed features and the target side by side, without
+    gluing them into one array.
+
+    Dense X is stored as one float32 .npy; sparse X as its CSR data /
+    indices / indptr arrays, so both can be memory-mapped back. y goes to
+    y.npy in the smallest integer type that holds it.
+    '''
+    try:
+        tmp_path = f"{dir_path}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+
+        if hasattr(X, "tocsr"):
+            X = X.tocsr()
+            meta = {"format": "csr", "shape": list(X.shape)}
+            np.save(os.path.join(tmp_path, "X_data.npy"), X.data.astype(np.float32, copy=False))
+            np.save(os.path.join(tmp_path, "X_indices.npy"), X.indices)
+            np.save(os.path.join(tmp_path, "X_indptr.npy"), X.indptr)
+        else:
+            meta = {"format": "dense", "shape": list(np.shape(X))}
+            np.save(os.path.join(tmp_path, "X.npy"), np.asarray(X).astype(np.float32, copy=False))
+
+        if y is not None:
+            y = pd.to_numeric(pd.Series(np.asarray(y)), downcast="integer").to_numpy()
+            np.save(os.path.join(tmp_path, "y.npy"), y)
+        with open(os.path.join(tmp_path, "matrix.json"), "w") as file_obj:
+            json.dump(meta, file_obj)
+
+        _replace_dir(tmp_path, dir_path)
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def load_feature_matrix(dir_path, mmap=True):
+    """Return (X, y) written by save_feature_matrix; y is None if none was saved."""
+    try:
+        from scipy import sparse
+
+        mmap_mode = "r" if mmap else None
+        with open(os.path.join(dir_path, "matrix.json")) as file_obj:
+            meta = json.load(file_obj)
+
+        def load(name):
+            return np.load(os.path.join(dir_path, name), mmap_mode=mmap_mode)
+
+        if meta["format"] == "csr":
+            X = sparse.csr_matrix((load("X_data.npy"), load("X_indices.npy"), load("X_indptr.npy")),
+                                  shape=tuple(meta["shape"]), copy=False)
+        else:
+            X = load("X.npy")
+        y = load("y.npy") if os.path.exists(os.path.join(dir_path, "y.npy")) else None
+        return X, y
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+_json_cache = {}
+_json_cache_lock = threading.Lock()
+
+
+def read_json_cached(file_path, default=None):
+    '''
+    Parsed contents of a small JSON report, re-read only when its mtime or
+    size changes, so request handlers can call it on every request.
+    Returns default when the file does not exist.
+    '''
+    try:
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            return default
+        signature = (stat.st_mtime_ns, stat.st_size)
+        cached = _json_cache.get(file_path)
+        if cached is not None and cached[0] == signature:
+            return cached[1]
+        with open(file_path) as file_obj:
+            value = json.load(file_obj)
+        with _json_cache_lock:
+            _json_cache[file_path] = (signature, value)
+        return value
+
+    except Exception as e:
+        raise CustomException(e, sys)
+
+
+def _to_builtin(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+
+class LRUCache:
+    '''
+    Small thread-safe LRU mapping with a fixed number of entries.
+    With ttl (seconds), entries older than that count as misses.
+    '''
+    def __init__(self, max_entries=1024, ttl=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None, count_miss=True):
+        with self._lock:
+            if key in self._data:
+                value, expires = self._data[key]
+                if expires is None or expires > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += int(count_miss)
+            return default
+
+    def put(self, key, value):
+        expires = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
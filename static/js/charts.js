@@ -1007,6 +1007,121 @@ function getChartData(elementId, defaultData) {
     return defaultData;
 }
 
+// ============= COHORT ANALYSIS =============
+// Matrices come from /api/cohorts (src/analytics/cohorts.py), cached server-side per dataset version
+const COHORT_COLORS = ['#6366f1', '#8b5cf6', '#ec4899', '#f59e0b', '#10b981', '#0ea5e9'];
+const cohortState = { data: null, dimension: 'contract_type' };
+
+function retentionClass(value) {
+    if (value >= 0.97) return 'retention-high';
+    if (value >= 0.93) return 'retention-good';
+    if (value >= 0.88) return 'retention-medium';
+    return 'retention-low';
+}
+
+function formatPercent(value, digits = 1) {
+    return `${(value * 100).toFixed(digits)}%`;
+}
+
+function renderCohortTables(data, dimension) {
+    const dim = data.dimensions[dimension];
+    const retentionHead = document.getElementById('retentionMatrixHead');
+    const retentionBody = document.getElementById('retentionMatrixBody');
+    if (retentionHead && retentionBody) {
+        retentionHead.innerHTML = '<tr><th>Group</th><th>Size</th>'
+            + data.months.map(m => `<th>M${m}</th>`).join('') + '</tr>';
+        const rows = dim.values.map((value, i) => ({ label: value, size: dim.size[i], retention: dim.retention[i] }));
+        rows.push({ label: 'All customers', size: data.n_rows, retention: data.overall.retention });
+        retentionBody.innerHTML = rows.map(row => `<tr>
+            <td class="cohort-month">${row.label}</td>
+            <td class="cohort-size">${ChartUtils.formatNumber(row.size)}</td>
+            ${row.retention.map(v => `<td class="retention-cell ${retentionClass(v)}">${formatPercent(v)}</td>`).join('')}
+        </tr>`).join('');
+    }
+
+    const churnHead = document.getElementById('cohortChurnHead');
+    const churnBody = document.getElementById('cohortChurnBody');
+    if (churnHead && churnBody) {
+        churnHead.innerHTML = '<tr><th>Signup cohort</th><th>Size</th><th>Churn</th>'
+            + dim.values.map(v => `<th>${v}</th>`).join('') + '</tr>';
+        churnBody.innerHTML = data.cohorts.labels.map((label, i) => `<tr>
+            <td class="cohort-month">${label}</td>
+            <td class="cohort-size">${ChartUtils.formatNumber(data.cohorts.size[i])}</td>
+            <td class="retention-cell ${retentionClass(1 - data.cohorts.churn_rate[i])}">${formatPercent(data.cohorts.churn_rate[i])}</td>
+            ${dim.cohort_churn_rate[i].map((rate, j) => dim.cohort_size[i][j]
+                ? `<td class="retention-cell ${retentionClass(1 - rate)}">${formatPercent(rate)}</td>`
+                : '<td class="retention-cell">-</td>').join('')}
+        </tr>`).join('');
+    }
+}
+
+function renderCohortTrend(data, dimension) {
+    const dim = data.dimensions[dimension];
+    const months = data.overall.curve.map((_, m) => `M${m}`);
+    chartManager.createChart('cohortTrendChart', {
+        type: 'line',
+        ariaLabel: `Retention by months since signup, per ${dimension.replace(/_/g, ' ')}`,
+        data: {
+            labels: months,
+            datasets: dim.values.map((value, i) => ({
+                label: value,
+                data: dim.curve[i].map(v => +(v * 100).toFixed(2)),
+                borderColor: COHORT_COLORS[i % COHORT_COLORS.length],
+                backgroundColor: 'transparent',
+                borderWidth: 3,
+                pointRadius: 0,
+                pointHoverRadius: 5,
+                tension: 0.3,
+                fill: false
+            }))
+        },
+        options: {
+            animation: false,
+            plugins: { tooltip: { mode: 'index', intersect: false } },
+            scales: {
+                y: { title: { display: true, text: 'Retention Rate (%)' } },
+                x: { title: { display: true, text: 'Months Since Signup' } }
+            }
+        }
+    });
+}
+
+async function loadCohorts(cohortMonths) {
+    const query = cohortMonths ? `?cohort_months=${cohortMonths}` : '';
+    const response = await fetch(`/api/cohorts${query}`);
+    if (!response.ok) throw new Error(`/api/cohorts returned ${response.status}`);
+    cohortState.data = await response.json();
+    renderCohortTables(cohortState.data, cohortState.dimension);
+    renderCohortTrend(cohortState.data, cohortState.dimension);
+}
+
+function initCohortAnalysis() {
+    const root = document.getElementById('cohortAnalysis');
+    if (!root) return;
+    cohortState.dimension = root.dataset.dimension || cohortState.dimension;
+
+    root.querySelectorAll('[data-dimension-btn]').forEach(button => {
+        button.addEventListener('click', () => {
+            root.querySelectorAll('[data-dimension-btn]').forEach(b => b.classList.remove('active'));
+            button.classList.add('active');
+            cohortState.dimension = button.dataset.dimensionBtn;
+            if (cohortState.data) {
+                renderCohortTables(cohortState.data, cohortState.dimension);
+                renderCohortTrend(cohortState.data, cohortState.dimension);
+            }
+        });
+    });
+    root.querySelectorAll('[data-cohort-months]').forEach(button => {
+        button.addEventListener('click', () => {
+            root.querySelectorAll('[data-cohort-months]').forEach(b => b.classList.remove('active'));
+            button.classList.add('active');
+            loadCohorts(button.dataset.cohortMonths).catch(error => console.error('❌ Cohort data:', error));
+        });
+    });
+
+    loadCohorts(root.dataset.cohortMonths).catch(error => console.error('❌ Cohort data:', error));
+}
+
 // ============= API DATA INTEGRATION =============
 async function fetchRealChartData() {
     try {
@@ -1115,6 +1230,7 @@ document.addEventListener('DOMContentLoaded', () => {
     // Initialize charts
     initializeCharts();
     initializeModelInsightsCharts();
+    initCohortAnalysis();
     
     // Fetch real data
     updateChartsWithRealData();
@@ -461,8 +461,14 @@ function initConfusionMatrixChart() {
 function initFeatureImportanceChart() {
     const isDark = insightsManager.isDarkMode();
     
-    // Feature importance data from your model
-    const features = [
+    // Permutation importance from the train-time metrics artifact, when the page was rendered with it
+    const canvas = document.getElementById('featureChart');
+    const served = canvas && canvas.dataset.features ? JSON.parse(canvas.dataset.features) : [];
+    const features = served.length ? served.map(f => ({
+        name: f.feature.replace(/_/g, ' '),
+        value: f.share / 100,
+        description: `Drop in ROC-AUC when shuffled: ${(f.importance_mean || 0).toFixed(4)}`
+    })) : [
         { name: '📄 Contract Type', value: 0.35, description: 'Monthly vs Annual contracts - 3.2x higher churn for monthly' },
         { name: '⏱️ Customer Tenure', value: 0.28, description: 'First 6 months are highest risk period' },
         { name: '💰 Monthly Charges', value: 0.17, description: '+$50 increases churn probability by 23%' },
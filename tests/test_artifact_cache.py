@@ -0,0 +1,77 @@
+import os
+
+from src.pipeline.artifact_cache import ArtifactCache, ArtifactCacheConfig, fingerprint
+from src.pipeline.train_pipeline import DagRunner, Stage, TrainPipeline
+
+
+def _stages(tmp_path, builds, source="v1"):
+    '''Two chained main-process stages: "raw" writes source, "upper" upper-cases raw's file.'''
+    raw_path, upper_path = str(tmp_path / "raw.txt"), str(tmp_path / "upper.txt")
+
+    def raw(stage):
+        builds.append("raw")
+        with open(raw_path, "w") as file_obj:
+            file_obj.write(source)
+        return {"length": len(source)}
+
+    def upper(stage):
+        builds.append("upper")
+        with open(raw_path) as src, open(upper_path, "w") as dst:
+            dst.write(src.read().upper())
+        return {"length": stage.results["raw"]["length"]}
+
+    raw_key = fingerprint("raw", source)
+    return [
+        Stage("raw", raw_key, raw, outputs=(raw_path,)),
+        Stage("upper", fingerprint("upper", raw_key), upper, deps=("raw",), outputs=(upper_path,)),
+    ], upper_path
+
+
+def _run(tmp_path, builds, force=False, source="v1"):
+    cache = ArtifactCache(ArtifactCacheConfig(cache_dir=str(tmp_path / "cache")), force=force)
+    stages, upper_path = _stages(tmp_path, builds, source)
+    results = DagRunner(cache, n_workers=1).run(stages)
+    return results, cache, upper_path
+
+
+def test_second_run_is_served_from_the_cache(tmp_path):
+    builds = []
+    first, _, upper_path = _run(tmp_path, builds)
+    assert builds == ["raw", "upper"]
+
+    os.remove(upper_path)
+    second, cache, _ = _run(tmp_path, builds)
+    assert builds == ["raw", "upper"]
+    assert second == first
+    assert [row["cache_hit"] for row in cache.report] == [True, True]
+    # outputs come back from the cache even when the published copy is gone
+    with open(upper_path) as file_obj:
+        assert file_obj.read() == "V1"
+
+
+def test_force_rebuilds_every_stage(tmp_path):
+    builds = []
+    _run(tmp_path, builds)
+    _, cache, _ = _run(tmp_path, builds, force=True)
+    assert builds == ["raw", "upper", "raw", "upper"]
+    assert [row["cache_hit"] for row in cache.report] == [False, False]
+
+
+def test_upstream_change_rebuilds_downstream(tmp_path):
+    builds = []
+    _run(tmp_path, builds)
+    results, _, upper_path = _run(tmp_path, builds, source="v22")
+    assert builds == ["raw", "upper", "raw", "upper"]
+    assert results["upper"] == {"length": 3}
+    with open(upper_path) as file_obj:
+        assert file_obj.read() == "V22"
+
+
+def test_fingerprint_ignores_dict_order():
+    assert fingerprint("train", {"a": 1, "b": [1, 2]}) == fingerprint("train", {"b": [1, 2], "a": 1})
+    assert fingerprint("train", {"a": 1}) != fingerprint("train", {"a": 2})
+
+
+def test_force_flag_reaches_the_cache():
+    assert TrainPipeline(force=True).cache.force
+    assert not TrainPipeline().cache.force
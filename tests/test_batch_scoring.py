@@ -0,0 +1,56 @@
+import io
+
+import numpy as np
+import pytest
+
+from src.exception import root_cause
+from src.pipeline.batch_scoring import (ERROR_MARKER, OUTPUT_COLUMNS, iter_csv_chunks, iter_ndjson_chunks,
+                                        iter_record_chunks, score_chunks, stream_scored_csv)
+from src.pipeline.compiled_preprocessor import FeatureValueError
+
+
+class _Pipeline:
+    '''PredictPipeline stand-in: probability = age / 100, text ages fail like the compiled preprocessor does.'''
+    def predict_proba(self, chunk):
+        ages = chunk["age"].to_numpy() if "age" in chunk.columns else np.full(len(chunk), 50)
+        for age in ages:
+            if isinstance(age, str):
+                raise FeatureValueError("age", f"column 'age': cannot convert {age!r} to a number")
+        probability = np.asarray(ages, dtype=float) / 100
+        return probability, (probability >= 0.5).astype(int), "test"
+
+
+def _csv(ages):
+    return io.BytesIO(("customer_id,age\n" + "".join(f"CUST_{i:05d},{age}\n" for i, age in enumerate(ages))).encode())
+
+
+def test_every_record_gets_a_result():
+    records = [{}, {"age": 30}, {}]
+    results = [result for result, _ in score_chunks(_Pipeline(), iter_record_chunks(records, chunk_size=2))]
+    assert sum(len(result) for result in results) == len(records)
+    assert [len(result) for result in results] == [2, 1]
+
+
+def test_empty_ndjson_objects_are_kept():
+    chunks = list(iter_ndjson_chunks(io.BytesIO(b'{}\n\n{"age": 30}\n{}\n'), chunk_size=10))
+    assert [len(chunk) for chunk in chunks] == [3]
+
+
+def test_streamed_csv_matches_input_rows():
+    lines = "".join(stream_scored_csv(_Pipeline(), iter_csv_chunks(_csv([20, 60, 40]), chunk_size=2))).splitlines()
+    assert lines[0] == ",".join(OUTPUT_COLUMNS)
+    assert lines[1:] == ["CUST_00000,0.2,0", "CUST_00001,0.6,1", "CUST_00002,0.4,0"]
+
+
+def test_bad_first_chunk_raises_before_streaming():
+    with pytest.raises(Exception) as excinfo:
+        stream_scored_csv(_Pipeline(), iter_csv_chunks(_csv([20, "abc", 40]), chunk_size=2))
+    assert root_cause(excinfo.value).column == "age"
+
+
+def test_later_failure_ends_with_error_marker():
+    body = stream_scored_csv(_Pipeline(), iter_csv_chunks(_csv([20, 60, 40, "abc"]), chunk_size=2))
+    lines = "".join(body).splitlines()
+    assert lines[1:3] == ["CUST_00000,0.2,0", "CUST_00001,0.6,1"]
+    assert lines[-1].startswith(ERROR_MARKER) and "'age'" in lines[-1]
+    assert len(lines) == 4
@@ -0,0 +1,126 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.impute import SimpleImputer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from src.pipeline.compiled_preprocessor import compile_preprocessor
+
+NUMERICAL = ["age", "monthly_fee", "csat_score"]
+CATEGORICAL = ["gender", "contract_type", "payment_method"]
+TOLERANCE = 1e-12
+
+
+def _frame(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "age": rng.integers(18, 80, n_rows).astype(float),
+        "monthly_fee": rng.choice([10.0, 30.0, 50.0, 70.0], n_rows),
+        "csat_score": rng.normal(3.5, 1.0, n_rows),
+        "gender": rng.choice(["Female", "Male"], n_rows).astype(object),
+        "contract_type": rng.choice(["Monthly", "Quarterly", "Yearly"], n_rows).astype(object),
+        "payment_method": rng.choice(["Card", "PayPal", "Bank Transfer"], n_rows).astype(object),
+    })
+    # a few missing values in every column, so the imputers have work to do
+    for col in df.columns:
+        df.loc[rng.choice(n_rows, 3, replace=False), col] = np.nan
+    return df
+
+
+@pytest.fixture(scope="module")
+def fitted():
+    '''Same layout as DataTransformation.get_data_transformer_object, on fewer columns.'''
+    preprocessor = ColumnTransformer([
+        ("num_pipeline", Pipeline([("imputer", SimpleImputer(strategy="median")),
+                                   ("scaler", StandardScaler())]), NUMERICAL),
+        ("cat_pipeline", Pipeline([("imputer", SimpleImputer(strategy="most_frequent")),
+                                   ("one_hot_encoder", OneHotEncoder(handle_unknown="ignore")),
+                                   ("scaler", StandardScaler(with_mean=False))]), CATEGORICAL),
+    ])
+    preprocessor.fit(_frame(200, seed=0))
+    return preprocessor, compile_preprocessor(preprocessor)
+
+
+def _expected(preprocessor, df):
+    out = preprocessor.transform(df)
+    return np.asarray(out.toarray() if hasattr(out, "toarray") else out, dtype=np.float64)
+
+
+def _records(df):
+    return df.astype(object).where(df.notna(), None).to_dict("records")
+
+
+def test_batch_records_match_sklearn(fitted):
+    preprocessor, compiled = fitted
+    df = _frame(50, seed=1)
+    np.testing.assert_allclose(compiled.transform_records(_records(df)), _expected(preprocessor, df),
+                               rtol=0, atol=TOLERANCE)
+
+
+def test_dataframe_input_matches_sklearn(fitted):
+    preprocessor, compiled = fitted
+    df = _frame(50, seed=2)
+    np.testing.assert_allclose(compiled.transform(df), _expected(preprocessor, df), rtol=0, atol=TOLERANCE)
+
+
+def test_unknown_categories_are_all_zero(fitted):
+    preprocessor, compiled = fitted
+    df = _frame(5, seed=3)
+    df["contract_type"] = "Lifetime"
+    df["payment_method"] = "Crypto"
+    np.testing.assert_allclose(compiled.transform_records(_records(df)), _expected(preprocessor, df),
+                               rtol=0, atol=TOLERANCE)
+
+
+def test_missing_values_are_imputed(fitted):
+    preprocessor, compiled = fitted
+    df = pd.DataFrame([{col: np.nan for col in NUMERICAL + CATEGORICAL}]).astype(
+        {col: object for col in CATEGORICAL})
+    expected = _expected(preprocessor, df)
+    # None, NaN and absent keys are all missing
+    for record in ({col: None for col in NUMERICAL + CATEGORICAL},
+                   {col: float("nan") for col in NUMERICAL + CATEGORICAL},
+                   {}):
+        np.testing.assert_allclose(compiled.transform_records(record), expected, rtol=0, atol=TOLERANCE)
+
+
+def test_single_record_matches_batch_row(fitted):
+    _, compiled = fitted
+    records = _records(_frame(20, seed=4))
+    batch = compiled.transform_records(records)
+    for i, record in enumerate(records):
+        np.testing.assert_allclose(compiled.transform_records(record), batch[i:i + 1], rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize("as_records", [False, True])
+def test_non_numeric_value_raises_naming_the_column(fitted, as_records):
+    preprocessor, compiled = fitted
+    df = _frame(3, seed=5)
+    df["age"] = df["age"].astype(object)
+    df.loc[1, "age"] = "notanumber"
+    with pytest.raises(ValueError):
+        preprocessor.transform(df)
+    with pytest.raises(Exception) as excinfo:
+        compiled.transform_records(_records(df)) if as_records else compiled.transform(df)
+    # CustomException wraps the ValueError
+    error = excinfo.value.args[0]
+    assert isinstance(error, ValueError) and "'age'" in str(error)
+
+
+def test_blank_and_missing_numbers_are_imputed_in_frames(fitted):
+    preprocessor, compiled = fitted
+    df = _frame(4, seed=6)
+    df["age"] = df["age"].astype(object)
+    df.loc[0, "age"], df.loc[1, "age"] = None, ""
+    expected = _expected(preprocessor, df.replace({"age": {"": np.nan}}).astype({"age": float}))
+    np.testing.assert_allclose(compiled.transform(df), expected, rtol=0, atol=TOLERANCE)
+
+
+def test_rows_without_columns_are_fully_imputed(fitted):
+    _, compiled = fitted
+    # what pd.DataFrame([{}, {}]) looks like: two rows, no columns
+    out = compiled.transform(pd.DataFrame(index=range(2)))
+    assert out.shape == (2, compiled.n_features_out)
+    np.testing.assert_allclose(out, compiled.transform_records([{}, {}]), rtol=0, atol=TOLERANCE)
@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics import dashboard
+from src.analytics.dashboard import DashboardAggregates, DashboardAggregatesConfig, aggregate
+
+
+class _Store:
+    '''Dataset store stand-in: load() returns whatever frame was set last, with a new version each time.'''
+    def __init__(self, df):
+        self.set(df)
+
+    def set(self, df):
+        self.df = df
+        self.version = getattr(self, "version", 0) + 1
+
+    def load(self):
+        return self.df, {"version": str(self.version)}
+
+
+def _frame(n_rows, seed, start_id=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "customer_id": [f"CUST_{i:05d}" for i in range(start_id, start_id + n_rows)],
+        "contract_type": pd.Categorical(rng.choice(["Monthly", "Quarterly", "Yearly"], n_rows)),
+        "payment_method": rng.choice(["Card", "PayPal", "Bank Transfer"], n_rows),
+        "monthly_fee": rng.choice([10.0, 30.0, 50.0], n_rows),
+        "tenure_months": rng.integers(0, 60, n_rows),
+        "support_tickets": rng.integers(0, 5, n_rows),
+        "churn": rng.integers(0, 2, n_rows),
+    })
+
+
+@pytest.fixture
+def aggregated_rows(monkeypatch):
+    '''Row counts of every aggregate() call, to tell a merge from a full recompute.'''
+    calls = []
+
+    def counting(df):
+        calls.append(len(df))
+        return aggregate(df)
+
+    monkeypatch.setattr(dashboard, "aggregate", counting)
+    return calls
+
+
+def _aggregates(tmp_path, store):
+    return DashboardAggregates(DashboardAggregatesConfig(str(tmp_path / "summary.json")), store)
+
+
+def _numbers(summary):
+    return {k: v for k, v in summary.items() if k not in ("schema", "dataset_version", "fingerprint")}
+
+
+def test_true_append_merges_only_new_rows(tmp_path, aggregated_rows):
+    base = _frame(100, seed=0)
+    store = _Store(base)
+    aggregates = _aggregates(tmp_path, store)
+    aggregates.summary()
+
+    grown = pd.concat([base, _frame(20, seed=1, start_id=100)], ignore_index=True)
+    store.set(grown)
+    assert _numbers(aggregates.summary()) == _numbers(aggregate(grown))
+    assert aggregated_rows == [100, 20]
+
+
+def test_in_place_edit_is_recomputed(tmp_path, aggregated_rows):
+    base = _frame(100, seed=0)
+    store = _Store(base)
+    aggregates = _aggregates(tmp_path, store)
+    aggregates.summary()
+
+    # same length, same first and last customer_id, one value changed
+    edited = base.copy()
+    edited.loc[50, "monthly_fee"] = 999.0
+    store.set(edited)
+    assert _numbers(aggregates.summary()) == _numbers(aggregate(edited))
+    assert aggregated_rows == [100, 100]
+
+
+def test_edit_plus_append_without_customer_id_is_recomputed(tmp_path, aggregated_rows):
+    base = _frame(100, seed=0).drop(columns="customer_id")
+    store = _Store(base)
+    aggregates = _aggregates(tmp_path, store)
+    aggregates.summary()
+
+    edited = base.copy()
+    edited.loc[0, "churn"] = 1 - edited.loc[0, "churn"]
+    grown = pd.concat([edited, _frame(10, seed=1).drop(columns="customer_id")], ignore_index=True)
+    store.set(grown)
+    assert _numbers(aggregates.summary()) == _numbers(aggregate(grown))
+    assert aggregated_rows == [100, 110]
+
+
+def test_appended_rows_are_not_counted_twice(tmp_path, aggregated_rows):
+    base = _frame(100, seed=0)
+    new_rows = _frame(20, seed=1, start_id=100)
+    store = _Store(base)
+    aggregates = _aggregates(tmp_path, store)
+    aggregates.append(new_rows)
+
+    # the store catches up with the streamed rows, then grows further
+    grown = pd.concat([base, new_rows, _frame(5, seed=2, start_id=120)], ignore_index=True)
+    store.set(grown)
+    assert _numbers(aggregates.summary()) == _numbers(aggregate(grown))
+    assert aggregated_rows == [100, 20, 5]
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.components.data_ingestion import DataIngestion, iter_partitions, is_test_row
+
+
+def _source(tmp_path, n_rows=200):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "customer_id": [f"CUST_{i:05d}" for i in range(n_rows)],
+        "age": rng.integers(18, 80, n_rows),
+        "monthly_fee": rng.choice([10.0, 30.0, 50.0], n_rows),
+        "contract_type": np.where(np.arange(n_rows) < n_rows - 10, "Monthly", "Yearly"),
+        "churn": rng.integers(0, 2, n_rows),
+    })
+    # larger values and a missing fee only in the last rows: later chunks need wider dtypes
+    df.loc[n_rows - 1, "age"] = 40_000
+    df.loc[n_rows - 2, "monthly_fee"] = np.nan
+    path = tmp_path / "source.csv"
+    df.to_csv(path, index=False)
+    return df, str(path)
+
+
+def _ingestion(tmp_path, chunk_size):
+    ingestion = DataIngestion()
+    config = ingestion.ingestion_config
+    config.partitions_path = str(tmp_path / f"partitions-{chunk_size}")
+    config.train_data_path = str(tmp_path / "train.csv")
+    config.test_data_path = str(tmp_path / "test.csv")
+    config.chunk_size = chunk_size
+    return ingestion
+
+
+def _partition_ids(ingestion, split):
+    parts = iter_partitions(split, ingestion.ingestion_config.partitions_path, columns=["customer_id"])
+    return sorted(str(i) for part in parts for i in part["customer_id"])
+
+
+def test_is_test_row_is_stable_across_chunkings():
+    ids = np.array([f"CUST_{i:05d}" for i in range(5000)], dtype=object)
+    whole = is_test_row(ids, 0.2)
+    for chunk_size in (1, 7, 1000):
+        chunked = np.concatenate([is_test_row(ids[i:i + chunk_size], 0.2) for i in range(0, len(ids), chunk_size)])
+        np.testing.assert_array_equal(chunked, whole)
+    # a rough 20% split, independent of row order
+    assert 0.17 < whole.mean() < 0.23
+    np.testing.assert_array_equal(is_test_row(ids[::-1], 0.2), whole[::-1])
+
+
+@pytest.mark.parametrize("chunk_size", [7, 50, 1000])
+def test_streamed_and_in_memory_splits_agree(tmp_path, chunk_size):
+    df, source = _source(tmp_path)
+    ingestion = _ingestion(tmp_path, chunk_size)
+    ingestion.initiate_streaming_ingestion(source)
+    train_path, test_path = ingestion.split_train_test(source)
+
+    expected_test = sorted(df["customer_id"][is_test_row(df["customer_id"].to_numpy(), 0.2)])
+    assert _partition_ids(ingestion, "test") == expected_test
+    assert sorted(pd.read_csv(test_path)["customer_id"]) == expected_test
+    assert _partition_ids(ingestion, "train") == sorted(pd.read_csv(train_path)["customer_id"])
+
+
+def test_partitions_share_one_schema(tmp_path):
+    df, source = _source(tmp_path)
+    ingestion = _ingestion(tmp_path, chunk_size=20)
+    ingestion.initiate_streaming_ingestion(source)
+
+    parts = [part for split in ("train", "test") for part in iter_partitions(split, ingestion.ingestion_config.partitions_path)]
+    assert len(parts) > 2
+    for part in parts:
+        assert part.dtypes.to_dict() == parts[0].dtypes.to_dict()
+    assert list(parts[0]["contract_type"].cat.categories) == ["Monthly", "Yearly"]
+    streamed = pd.concat(parts).set_index("customer_id").sort_index()
+    assert streamed.loc["CUST_00199", "age"] == 40_000
+    assert np.isnan(streamed.loc["CUST_00198", "monthly_fee"])
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import ExtraTreesClassifier, RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+
+from src.pipeline.forest_engine import export_forest
+
+TOLERANCE = 1e-12
+# float32 leaf values: routing stays exact, probabilities are rounded
+FLOAT32_TOLERANCE = 1e-6
+
+
+def _dataset(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, 8))
+    X[:, 5:] = rng.integers(0, 2, size=(n_rows, 3))  # one-hot-like columns
+    y = ((X[:, 0] + X[:, 5] + rng.normal(scale=0.5, size=n_rows)) > 0.5).astype(int)
+    return X.astype(np.float32), y
+
+
+@pytest.fixture(scope="module", params=[RandomForestClassifier, ExtraTreesClassifier])
+def fitted(request):
+    X, y = _dataset(400, seed=0)
+    model = request.param(n_estimators=25, max_depth=6, random_state=0).fit(X, y)
+    return model, _dataset(200, seed=1)[0]
+
+
+def test_float64_engine_matches_sklearn(fitted):
+    model, X = fitted
+    engine = export_forest(model)
+    np.testing.assert_allclose(engine.predict_proba(X), model.predict_proba(X), rtol=0, atol=TOLERANCE)
+    np.testing.assert_array_equal(engine.predict(X), model.predict(X))
+
+
+def test_float32_engine_matches_sklearn(fitted):
+    model, X = fitted
+    engine = export_forest(model, float32=True)
+    np.testing.assert_allclose(engine.predict_proba(X), model.predict_proba(X), rtol=0, atol=FLOAT32_TOLERANCE)
+    # rounded-down thresholds keep every row on sklearn's leaves
+    np.testing.assert_array_equal(engine.apply(X), export_forest(model).apply(X))
+
+
+def test_single_row_matches_batch_row(fitted):
+    model, X = fitted
+    engine = export_forest(model)
+    batch = engine.predict_proba(X[:20])
+    for i in range(20):
+        np.testing.assert_allclose(engine.predict_proba(X[i:i + 1]), batch[i:i + 1], rtol=0, atol=TOLERANCE)
+
+
+def test_contributions_add_up_to_probability(fitted):
+    model, X = fitted
+    engine = export_forest(model)
+    bias, contributions = engine.contributions(X)
+    assert contributions.shape == X.shape
+    np.testing.assert_allclose(bias + contributions.sum(axis=1), model.predict_proba(X)[:, 1],
+                               rtol=0, atol=1e-9)
+
+
+def test_non_forest_models_are_rejected():
+    X, y = _dataset(100, seed=2)
+    # the registry falls back to model.predict_proba on any export error
+    with pytest.raises(Exception):
+        export_forest(LogisticRegression().fit(X, y))
@@ -0,0 +1,21 @@
+import os
+
+from src.metrics import MetricsRegistry, format_counters, format_gauges
+
+
+def test_counters_and_gauges_carry_the_worker_pid():
+    pid = os.getpid()
+    assert f'churn_x_total{{pid="{pid}",event="miss"}} 3.0' in format_counters("churn_x", {"miss": 3}, "event")
+    assert f'churn_y{{pid="{pid}"}} 2.0' in format_gauges("churn_y", 2)
+    # values every worker reads from the same file are not per process
+    assert 'churn_z{stage="train"} 1.5' in format_gauges("churn_z", {"train": 1.5}, "stage", per_process=False)
+    assert "churn_w 1.0" in format_gauges("churn_w", 1, per_process=False)
+
+
+def test_histograms_carry_the_worker_pid():
+    registry = MetricsRegistry()
+    registry.observe("churn_latency_seconds", "stage", "predict", 0.003)
+    lines = registry.render_prometheus().splitlines()
+    pid = os.getpid()
+    assert f'churn_latency_seconds_bucket{{pid="{pid}",stage="predict",le="0.005"}} 1' in lines
+    assert f'churn_latency_seconds_count{{pid="{pid}",stage="predict"}} 1' in lines
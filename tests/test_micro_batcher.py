@@ -0,0 +1,59 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from src.pipeline.micro_batcher import MicroBatcher, MicroBatcherConfig
+
+
+class _Pipeline:
+    '''PredictPipeline stand-in: probability = x / 1000, so every result says which record it came from.'''
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.batch_sizes = []
+
+    def predict_proba(self, records):
+        self.batch_sizes.append(len(records))
+        # slow enough for the next callers to queue up behind this batch
+        time.sleep(0.005)
+        if any(record["x"] == self.fail_on for record in records):
+            raise ValueError("bad record")
+        probability = np.array([record["x"] / 1000 for record in records])
+        return probability, (probability >= 0.5).astype(int), "v1"
+
+
+def _predict_concurrently(batcher, xs):
+    barrier = threading.Barrier(len(xs))
+
+    def call(x):
+        barrier.wait()
+        return batcher.predict({"x": x})
+
+    with ThreadPoolExecutor(max_workers=len(xs)) as pool:
+        return list(pool.map(call, xs))
+
+
+def test_every_caller_gets_its_own_result():
+    pipeline = _Pipeline()
+    batcher = MicroBatcher(pipeline, MicroBatcherConfig(window_ms=20, max_batch_size=8))
+    xs = list(range(0, 1000, 25))
+    results = _predict_concurrently(batcher, xs)
+
+    assert results == [(x / 1000, int(x >= 500), "v1") for x in xs]
+    # rows were actually coalesced, and no batch went over the cap
+    assert len(pipeline.batch_sizes) < len(xs)
+    assert max(pipeline.batch_sizes) <= 8
+    assert sum(pipeline.batch_sizes) == len(xs)
+    assert batcher.metrics.snapshot()["requests"] == len(xs)
+
+
+def test_failed_batch_fails_only_its_callers():
+    pipeline = _Pipeline(fail_on=7)
+    batcher = MicroBatcher(pipeline, MicroBatcherConfig(window_ms=20, max_batch_size=64))
+    with pytest.raises(Exception):
+        _predict_concurrently(batcher, [3, 7, 9])
+    # the batcher thread survives and serves the next caller
+    assert batcher.predict({"x": 900}) == (0.9, 1, "v1")
+    assert batcher.metrics.snapshot()["errors"] == 1
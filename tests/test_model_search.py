@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+import scipy.sparse
+from sklearn.tree import DecisionTreeClassifier
+
+from src.utils import evaluate_models
+
+PARAMS = {"Tree": {"max_depth": [1, 2, 3, 4]}}
+
+
+def _dataset(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    X = (rng.random((n_rows, 12)) < 0.1).astype(np.float32)
+    y = ((X[:, 0] + X[:, 1] + rng.random(n_rows) * 0.5) > 0.6).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize("sparse", [False, True])
+def test_winner_is_refit_on_all_training_rows(sparse):
+    X_train, y_train = _dataset(300, seed=0)
+    X_test, y_test = _dataset(100, seed=1)
+    if sparse:
+        X_train, X_test = scipy.sparse.csr_matrix(X_train), scipy.sparse.csr_matrix(X_test)
+
+    report = evaluate_models(X_train, y_train, X_test, y_test,
+                             {"Tree": DecisionTreeClassifier(random_state=0)}, PARAMS, n_jobs=1)["Tree"]
+    model = report["model"]
+    # the root of the refit tree saw every training row, validation split included
+    assert model.tree_.n_node_samples[0] == X_train.shape[0]
+    assert model.get_params()["max_depth"] == report["best_params"]["max_depth"]
+    assert "roc_auc" in report["test_metrics"]
+    assert len(report["candidates"]) >= len(PARAMS["Tree"]["max_depth"])
+
+
+def test_sparse_and_dense_search_agree():
+    X_train, y_train = _dataset(300, seed=2)
+    X_test, y_test = _dataset(100, seed=3)
+    models = {"Tree": DecisionTreeClassifier(random_state=0)}
+    dense = evaluate_models(X_train, y_train, X_test, y_test, models, PARAMS, n_jobs=1)["Tree"]
+    sparse = evaluate_models(scipy.sparse.csr_matrix(X_train), y_train, scipy.sparse.csr_matrix(X_test), y_test,
+                             models, PARAMS, n_jobs=1)["Tree"]
+    assert sparse["best_params"] == dense["best_params"]
+    assert sparse["test_metrics"] == dense["test_metrics"]
@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.pipeline.prediction_cache import PredictionCache, PredictionCacheConfig, cached_predict_proba
+
+
+def _handle(version):
+    '''ModelVersion stand-in: only what the cache reads.'''
+    compiled = SimpleNamespace(numerical_columns=["age", "monthly_fee"], categorical_columns=["gender"])
+    return SimpleNamespace(version=version, compiled_preprocessor=compiled, model=SimpleNamespace(classes_=[0, 1]))
+
+
+class _Scorer:
+    '''score() for cached_predict_proba: probability = age / 100, counting the records it scores.'''
+    def __init__(self):
+        self.scored = []
+
+    def __call__(self, records):
+        self.scored.extend(records)
+        probability = np.array([float(r["age"]) / 100 for r in records])
+        return probability, (probability >= 0.5).astype(int)
+
+
+def test_equivalent_records_share_a_key():
+    cache = PredictionCache()
+    handle = _handle("v1")
+    equivalent = [
+        {"age": 30, "monthly_fee": 0.0, "gender": "Male"},
+        {"age": 30.0, "monthly_fee": -0.0, "gender": "Male"},
+        {"age": "30", "monthly_fee": "0", "gender": "Male", "customer_id": "CUST_00001"},
+    ]
+    assert len(set(cache.keys(equivalent, handle))) == 1
+    # every spelling of a missing value imputes the same way
+    missing = [{"age": None, "gender": None}, {"age": float("nan"), "monthly_fee": "", "gender": float("nan")}, {}]
+    assert len(set(cache.keys(missing, handle))) == 1
+
+
+def test_different_records_get_different_keys():
+    cache = PredictionCache()
+    handle = _handle("v1")
+    records = [
+        {"age": 30, "gender": "Male"},
+        {"age": 31, "gender": "Male"},
+        # a trailing space is a different one-hot column
+        {"age": 30, "gender": "Male "},
+        {"age": 30, "gender": "Male", "monthly_fee": 10},
+    ]
+    assert len(set(cache.keys(records, handle))) == len(records)
+
+
+def test_model_version_change_invalidates_entries():
+    cache = PredictionCache()
+    score = _Scorer()
+    records = [{"age": 20, "gender": "Male"}, {"age": 70, "gender": "Female"}]
+
+    cached_predict_proba(cache, records, _handle("v1"), score)
+    probability, labels = cached_predict_proba(cache, records, _handle("v1"), score)
+    assert len(score.scored) == 2
+    np.testing.assert_allclose(probability, [0.2, 0.7])
+    assert labels.tolist() == [0, 1]
+
+    cached_predict_proba(cache, records, _handle("v2"), score)
+    assert len(score.scored) == 4
+    assert set(cache.keys(records, _handle("v1"))).isdisjoint(cache.keys(records, _handle("v2")))
+
+
+def test_hits_and_misses_keep_record_order():
+    cache = PredictionCache()
+    score = _Scorer()
+    handle = _handle("v1")
+    cached_predict_proba(cache, [{"age": 40}], handle, score)
+    probability, _ = cached_predict_proba(cache, [{"age": 10}, {"age": 40}, {"age": 90}], handle, score)
+    np.testing.assert_allclose(probability, [0.1, 0.4, 0.9])
+    assert [r["age"] for r in score.scored] == [40, 10, 90]
+
+
+def test_shared_store_serves_other_processes_entries(tmp_path):
+    config = PredictionCacheConfig(shared_path=str(tmp_path / "predictions.sqlite"))
+    score = _Scorer()
+    records = [{"age": 25, "gender": "Male"}]
+    cached_predict_proba(PredictionCache(config), records, _handle("v1"), score)
+
+    # a second cache with an empty local LRU, like another worker
+    other = PredictionCache(config)
+    probability, _ = cached_predict_proba(other, records, _handle("v1"), score)
+    assert len(score.scored) == 1
+    np.testing.assert_allclose(probability, [0.25])
+    assert other.stats()["shared_hits"] == 1
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.analytics import retention
+from src.analytics.retention import RetentionConfig, RetentionEngine, top_k_order
+
+
+class _Store:
+    def __init__(self, df):
+        self.df = df
+
+    def load(self):
+        return self.df, {"version": "1"}
+
+
+def _frame(n_rows, seed):
+    rng = np.random.default_rng(seed)
+    # ids shuffled, so customer_id order differs from row order
+    ids = rng.permutation([f"CUST_{i:05d}" for i in range(n_rows)])
+    return pd.DataFrame({
+        "customer_id": ids,
+        "monthly_fee": rng.choice([10.0, 30.0, 50.0], n_rows),
+        "tenure_months": rng.integers(0, 60, n_rows),
+        "customer_segment": rng.choice(["Consumer", "SMB", "Enterprise"], n_rows),
+        "contract_type": rng.choice(["Monthly", "Yearly"], n_rows),
+    })
+
+
+@pytest.fixture
+def scores(monkeypatch):
+    '''The risk table as a dict customer_id -> probability, read by the engine in place of the bulk job's file.'''
+    table = {}
+    frozen = object()
+    monkeypatch.setattr(retention, "load_risk_table", lambda: (frozen, {}))
+    monkeypatch.setattr(retention, "risk_scores_for",
+                        lambda ids: np.array([table.get(i, np.nan) for i in ids], dtype=np.float64))
+    return table
+
+
+def _engine(df, scores, probability):
+    scores.clear()
+    scores.update(zip(df["customer_id"], probability))
+    return RetentionEngine(RetentionConfig(top_k=5, candidate_factor=2), _Store(df))
+
+
+def _full_sort(df, probability, k):
+    '''Reference ranking: every row sorted by probability desc, then customer_id asc.'''
+    ranked = sorted(zip(-np.asarray(probability), df["customer_id"]))
+    return [customer_id for _, customer_id in ranked[:k]]
+
+
+@pytest.mark.parametrize("k", [1, 5, 17, 100, 250])
+def test_top_k_order_matches_full_sort(k):
+    rng = np.random.default_rng(k)
+    ids = rng.permutation([f"CUST_{i:05d}" for i in range(200)])
+    # few distinct values: most of the ranking is decided by tie-breaks
+    values = rng.choice([0.1, 0.5, 0.5, 0.9], len(ids))
+    rank = np.empty(len(ids), dtype=np.int64)
+    rank[np.argsort(ids)] = np.arange(len(ids))
+
+    order = top_k_order(values, k, rank)
+    expected = sorted(range(len(ids)), key=lambda i: (-values[i], ids[i]))[:k]
+    assert order.tolist() == expected
+
+
+def test_top_k_after_rescores_matches_full_sort(scores):
+    df = _frame(300, seed=0)
+    rng = np.random.default_rng(1)
+    probability = rng.choice([0.2, 0.7, 0.95], len(df))
+    engine = _engine(df, scores, probability)
+    assert [row["customer_id"] for row in engine.top_k(20)] == _full_sort(df, probability, 20)
+
+    # push most top candidates down, so the candidate set has to be rebuilt
+    for _ in range(3):
+        rows = rng.choice(len(df), 40, replace=False)
+        probability[rows] = rng.choice([0.1, 0.7, 0.95], len(rows))
+        engine.rescore(df["customer_id"].to_numpy()[rows], probability[rows])
+        assert [row["customer_id"] for row in engine.top_k(20)] == _full_sort(df, probability, 20)
+
+
+def test_repeated_id_is_applied_once_with_its_last_probability(scores):
+    df = _frame(50, seed=2)
+    probability = np.full(len(df), 0.1)
+    engine = _engine(df, scores, probability)
+    customer_id = df["customer_id"].iat[0]
+
+    assert engine.rescore([customer_id, customer_id, customer_id], [0.9, 0.5, 0.95]) == 3
+    probability[0] = 0.95
+    expected = _engine(df, scores, probability).summary()
+    assert engine.summary() == expected
+    assert expected["tier_counts"] == {"Low": 49, "Medium": 0, "High": 1}
+
+
+def test_filters_ignore_case(scores):
+    df = _frame(100, seed=3)
+    engine = _engine(df, scores, np.random.default_rng(4).random(len(df)))
+    expected = engine.page(tier="High", segment="SMB", contract="Monthly")
+    assert expected["total"] > 0
+    assert engine.page(tier="high", segment="smb", contract="MONTHLY")["rows"] == expected["rows"]
+    assert engine.page(tier="Critical")["total"] == 0